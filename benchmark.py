@@ -0,0 +1,333 @@
+"""
+benchmark.py
+Benchmarks reproducibles de los caminos críticos del pipeline MOS
+
+Mide las funciones calcular_* sobre archivos de ping chicos y muy grandes,
+la importación de un log grande de iputils, el throughput de calcular_mos,
+analizar_ip de punta a punta contra la red simulada de red_simulada.py (sin
+red ni root) y el armado de la pantalla de resultados de MonitorMOS con
+cientos y miles de tarjetas (se omite si no hay display).
+
+    python benchmark.py --guardar-base        # medir y guardar la línea base
+    python benchmark.py                       # medir y comparar con la línea base
+    python benchmark.py --umbral 0.10 --solo calcular_mos
+
+Termina con código 1 si algún benchmark es más lento que la línea base en
+más del umbral indicado.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import mos_functions
+from importador_ping import importar_archivo
+from motor_icmp import establecer_motor
+from red_simulada import MotorSimulado, RedSimulada
+
+
+RUTA_BASE = 'benchmark_base.json'
+
+# Fracción de empeoramiento tolerada respecto de la línea base
+UMBRAL = 0.20
+
+SEMILLA = 1234
+
+
+class _RelojVirtual:
+    """Sustituto del módulo time para mos_functions: sleep no espera"""
+
+    def __init__(self):
+        self._desfase = 0.0
+
+    def time(self):
+        return time.time() + self._desfase
+
+    def monotonic(self):
+        return time.monotonic() + self._desfase
+
+    def monotonic_ns(self):
+        return time.monotonic_ns() + int(self._desfase * 1e9)
+
+    def sleep(self, segundos):
+        self._desfase += max(segundos, 0)
+
+
+def _archivo_ping(directorio, cantidad, semilla=SEMILLA):
+    """Escribir un log de ping con el formato de hacer_ping y retornar su ruta"""
+    aleatorio = random.Random(semilla)
+    muestras = mos_functions.ResultadoPing('192.0.2.1')
+    for i in range(cantidad):
+        latencia = None if aleatorio.random() < 0.02 else aleatorio.gauss(40.0, 4.0)
+        muestras.agregar(latencia, i)
+    muestras.archivo = os.path.join(directorio, f'ping-{cantidad}.txt')
+    mos_functions._escribir_archivo_ping(muestras)
+    return muestras.archivo
+
+
+def _archivo_iputils(directorio, cantidad, semilla=SEMILLA):
+    """Escribir un log de ping de Linux (iputils) con pérdidas y retornar su ruta"""
+    aleatorio = random.Random(semilla)
+    ruta = os.path.join(directorio, f'iputils-{cantidad}.txt')
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.write("PING 192.0.2.1 (192.0.2.1) 56(84) bytes of data.\n")
+        recibidos = 0
+        for secuencia in range(1, cantidad + 1):
+            if aleatorio.random() < 0.01:
+                continue
+            recibidos += 1
+            f.write(f"64 bytes from 192.0.2.1: icmp_seq={secuencia} ttl=57 "
+                    f"time={aleatorio.gauss(40.0, 4.0):.3f} ms\n")
+        f.write("\n--- 192.0.2.1 ping statistics ---\n")
+        f.write(f"{cantidad} packets transmitted, {recibidos} received, "
+                f"{(cantidad - recibidos) / cantidad:.0%} packet loss, time {cantidad}ms\n")
+    return ruta
+
+
+def _bench_importar(archivo):
+    def ejecutar():
+        importar_archivo(archivo)
+    return ejecutar
+
+
+def _bench_calcular(archivo):
+    def ejecutar():
+        mos_functions.calcular_latencia_promedio(archivo)
+        mos_functions.calcular_jitter(archivo)
+        mos_functions.calcular_paquetes_perdidos(archivo)
+    return ejecutar
+
+
+def _bench_calcular_mos(cantidad):
+    aleatorio = random.Random(SEMILLA)
+    entradas = [(aleatorio.uniform(5, 400), aleatorio.uniform(0, 60), aleatorio.uniform(0, 20))
+                for _ in range(cantidad)]
+    calcular_mos = mos_functions.calcular_mos
+
+    def ejecutar():
+        for latencia, jitter, perdida in entradas:
+            calcular_mos(latencia, jitter, perdida)
+    return ejecutar
+
+
+def _bench_analizar_ip(objetivos, cantidad_pings):
+    def ejecutar():
+        establecer_motor(MotorSimulado(RedSimulada(SEMILLA, proporcion_degradados=0), escala_tiempo=0))
+        reloj = mos_functions.time
+        mos_functions.time = _RelojVirtual()
+        try:
+            for i in range(objetivos):
+                mos_functions.analizar_ip(f'198.51.100.{i % 250 + 1}', cantidad_pings)
+        finally:
+            mos_functions.time = reloj
+            establecer_motor(None)
+    return ejecutar
+
+
+def _resultados_simulados(cantidad):
+    aleatorio = random.Random(SEMILLA)
+    resultados = []
+    for i in range(cantidad):
+        ip = f'10.{i // 250}.{i % 250}.1'
+        if i % 17 == 0:
+            resultado = {'ip': ip, 'error': True, 'mensaje': 'Conexión inestable o sin respuesta'}
+        else:
+            resultado = mos_functions.evaluar_metricas(ip, aleatorio.uniform(5, 300),
+                                                       aleatorio.uniform(0, 40), aleatorio.uniform(0, 10))
+        resultado['nombre'] = f'Objetivo {i}'
+        resultados.append(resultado)
+    return resultados
+
+
+def _bench_mostrar_resultados(tarjetas):
+    """Retorna None si Tk no está disponible (sin display)"""
+    try:
+        import tkinter as tk
+        from main import MonitorMOS
+        root = tk.Tk()
+    except Exception:
+        return None
+    root.withdraw()
+
+    # Evitar __init__: no leer config.json ni abrir el historial
+    app = MonitorMOS.__new__(MonitorMOS)
+    app.root = root
+    app.config = {'cantidad_pings': 10, 'ips': []}
+    app.historial = None
+    app.resultados = _resultados_simulados(tarjetas)
+
+    def ejecutar():
+        app.mostrar_resultados()
+        root.update_idletasks()
+    ejecutar.cerrar = root.destroy
+    return ejecutar
+
+
+def definir_benchmarks(directorio, escala):
+    """
+    Benchmarks disponibles.
+
+    Retorna:
+    - list de tuplas (nombre, fábrica, unidades); la fábrica retorna la función a medir
+      o None si el benchmark no se puede ejecutar en este sistema
+    """
+    return [
+        ('calcular_archivo_chico', lambda: _bench_calcular(_archivo_ping(directorio, 10)), 1),
+        ('calcular_archivo_grande', lambda: _bench_calcular(_archivo_ping(directorio, escala)), escala),
+        ('importar_iputils', lambda: _bench_importar(_archivo_iputils(directorio, escala)), escala),
+        ('calcular_mos', lambda: _bench_calcular_mos(100000), 100000),
+        ('analizar_ip_simulado', lambda: _bench_analizar_ip(50, 20), 50),
+        ('mostrar_resultados_300', lambda: _bench_mostrar_resultados(300), 300),
+        ('mostrar_resultados_5000', lambda: _bench_mostrar_resultados(5000), 5000),
+    ]
+
+
+def medir(funcion, repeticiones):
+    """Ejecutar una vez de calentamiento y 'repeticiones' veces medidas (segundos)"""
+    funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def ejecutar_benchmarks(repeticiones=5, escala=200000, solo=None, al_progreso=None):
+    """
+    Ejecutar los benchmarks en un directorio temporal (el registro de pings
+    y los archivos generados no tocan el directorio actual).
+
+    Parámetros:
+    - repeticiones: Mediciones por benchmark (default: 5)
+    - escala: Pings del archivo grande (default: 200000)
+    - solo: Lista de nombres a ejecutar (default: todos)
+    - al_progreso: Callback opcional con (nombre, resultado o None)
+
+    Retorna:
+    - dict: nombre -> {'segundos', 'mediana', 'unidades', 'por_segundo'}
+    """
+    resultados = {}
+    anterior = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='mos-bench-') as directorio:
+        os.chdir(directorio)
+        try:
+            for nombre, fabrica, unidades in definir_benchmarks(directorio, escala):
+                if solo and nombre not in solo:
+                    continue
+                funcion = fabrica()
+                if funcion is None:
+                    if al_progreso:
+                        al_progreso(nombre, None)
+                    continue
+                try:
+                    tiempos = medir(funcion, repeticiones)
+                finally:
+                    if hasattr(funcion, 'cerrar'):
+                        funcion.cerrar()
+                mejor = min(tiempos)
+                resultados[nombre] = {
+                    'segundos': mejor,
+                    'mediana': statistics.median(tiempos),
+                    'unidades': unidades,
+                    'por_segundo': unidades / mejor if mejor > 0 else None
+                }
+                if al_progreso:
+                    al_progreso(nombre, resultados[nombre])
+        finally:
+            mos_functions._escritor.vaciar()
+            os.chdir(anterior)
+    return resultados
+
+
+def comparar(resultados, base, umbral=UMBRAL):
+    """
+    Comparar contra la línea base usando el mejor tiempo de cada benchmark.
+
+    Retorna:
+    - list de tuplas (nombre, segundos_base, segundos_actual, variación) de las regresiones
+    """
+    regresiones = []
+    for nombre, actual in resultados.items():
+        anterior = base.get(nombre)
+        if not anterior:
+            continue
+        variacion = actual['segundos'] / anterior['segundos'] - 1
+        if variacion > umbral:
+            regresiones.append((nombre, anterior['segundos'], actual['segundos'], variacion))
+    return regresiones
+
+
+def leer_base(ruta):
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return json.load(f)['resultados']
+
+
+def guardar_base(ruta, resultados, escala):
+    datos = {
+        'fecha': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'escala': escala,
+        'resultados': resultados
+    }
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del pipeline MOS")
+    parser.add_argument('-b', '--base', default=RUTA_BASE,
+                        help="Archivo JSON de línea base (default: benchmark_base.json)")
+    parser.add_argument('--guardar-base', action='store_true',
+                        help="Guardar los resultados como nueva línea base")
+    parser.add_argument('-u', '--umbral', type=float, default=UMBRAL,
+                        help="Empeoramiento tolerado, 0.20 = 20%% (default: 0.20)")
+    parser.add_argument('-r', '--repeticiones', type=int, default=5,
+                        help="Mediciones por benchmark (default: 5)")
+    parser.add_argument('-e', '--escala', type=int, default=200000,
+                        help="Pings del archivo grande (default: 200000)")
+    parser.add_argument('-s', '--solo', action='append',
+                        help="Ejecutar solo este benchmark (se puede repetir)")
+    args = parser.parse_args()
+
+    base = None
+    if not args.guardar_base and os.path.exists(args.base):
+        base = leer_base(args.base)
+
+    def al_progreso(nombre, resultado):
+        if resultado is None:
+            print(f"{nombre:<26} omitido (no disponible en este sistema)")
+            return
+        linea = f"{nombre:<26} {resultado['segundos'] * 1000:10.2f} ms"
+        if resultado['por_segundo']:
+            linea += f"  {resultado['por_segundo']:14,.0f} /s"
+        if base and nombre in base:
+            linea += f"  ({resultado['segundos'] / base[nombre]['segundos'] - 1:+.1%} vs base)"
+        print(linea, flush=True)
+
+    resultados = ejecutar_benchmarks(args.repeticiones, args.escala, args.solo, al_progreso)
+
+    if args.guardar_base:
+        guardar_base(args.base, resultados, args.escala)
+        print(f"Línea base guardada en {args.base}")
+        return 0
+    if base is None:
+        print(f"Sin línea base ({args.base}); ejecute con --guardar-base para crearla")
+        return 0
+
+    regresiones = comparar(resultados, base, args.umbral)
+    for nombre, anterior, actual, variacion in regresiones:
+        print(f"REGRESIÓN {nombre}: {anterior * 1000:.2f} ms -> {actual * 1000:.2f} ms ({variacion:+.1%})",
+              file=sys.stderr)
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
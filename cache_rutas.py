@@ -0,0 +1,198 @@
+"""
+cache_rutas.py
+Caché de rutas por objetivo con huella barata (TTL de los echo replies) para
+ejecutar el traceroute solo cuando la ruta pudo haber cambiado
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from mos_functions import obtener_traceroute
+
+
+# Segundos que una ruta se considera vigente aunque la huella no cambie
+VIGENCIA_RUTA = 3600
+
+# TTL iniciales habituales (Linux/macOS, Windows, equipos de red)
+_TTL_INICIALES = (64, 128, 255)
+
+
+def saltos_por_ttl(ttl):
+    """
+    Estimar la cantidad de saltos a partir del TTL de un echo reply,
+    suponiendo el menor TTL inicial habitual que no sea menor al recibido.
+
+    Retorna:
+    - int o None si el TTL no se conoce
+    """
+    if ttl is None:
+        return None
+    for inicial in _TTL_INICIALES:
+        if ttl <= inicial:
+            return inicial - ttl + 1
+    return None
+
+
+def _ruta_distinta(anteriores, nuevos):
+    """Comparar dos listas de IPs de saltos tratando '*' como comodín"""
+    if len(anteriores) != len(nuevos):
+        return True
+    return any(a != b for a, b in zip(anteriores, nuevos) if a != '*' and b != '*')
+
+
+class EntradaRuta:
+    __slots__ = ('saltos', 'ttl_respuesta', 'actualizada', 'vence')
+
+    def __init__(self, saltos, ttl_respuesta, vigencia):
+        self.saltos = saltos
+        self.ttl_respuesta = ttl_respuesta
+        self.actualizada = time.time()
+        self.vence = time.monotonic() + vigencia
+
+    @property
+    def saltos_estimados(self):
+        return saltos_por_ttl(self.ttl_respuesta)
+
+
+class CacheRutas:
+    """
+    Guarda la última lista de saltos de cada destino junto con el TTL de sus
+    echo replies. El traceroute completo se ejecuta solo si el destino es
+    nuevo, si la entrada venció o si el TTL observado en los pings normales
+    cambió; si no, se reutiliza la ruta guardada.
+
+    Cada vez que un traceroute devuelve saltos distintos a los guardados se
+    registra un evento de cambio de ruta con su timestamp (en memoria, en el
+    historial SQLite si se indica y mediante el callback al_cambio).
+    """
+
+    def __init__(self, vigencia=VIGENCIA_RUTA, max_hops=30, timeout=2, historial=None,
+                 al_cambio=None, max_eventos=1000):
+        """
+        Parámetros:
+        - vigencia: Segundos antes de repetir el traceroute sin cambios de huella (default: 3600)
+        - max_hops: Máximo de saltos del traceroute (default: 30)
+        - timeout: Timeout del traceroute en segundos (default: 2)
+        - historial: HistorialResultados donde guardar los cambios de ruta (default: None)
+        - al_cambio: Callback opcional con el dict de cada cambio de ruta
+        - max_eventos: Cambios de ruta conservados en memoria (default: 1000)
+        """
+        self.vigencia = vigencia
+        self.max_hops = max_hops
+        self.timeout = timeout
+        self.historial = historial
+        self.al_cambio = al_cambio
+        self.eventos = deque(maxlen=max_eventos)
+        self.aciertos = 0
+        self.traceroutes = 0
+        self._entradas = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def entrada(self, destino):
+        with self._lock:
+            return self._entradas.get(destino)
+
+    def motivo_traceroute(self, destino, ttl_respuesta=None):
+        """
+        Motivo por el que hay que repetir el traceroute de un destino.
+
+        Retorna:
+        - 'nueva', 'vencida', 'huella' o None si la ruta guardada sigue vigente
+        """
+        entrada = self.entrada(destino)
+        if entrada is None:
+            return 'nueva'
+        if entrada.vence <= time.monotonic():
+            return 'vencida'
+        if ttl_respuesta is not None and ttl_respuesta != entrada.ttl_respuesta:
+            return 'huella'
+        return None
+
+    def obtener(self, destino, ttl_respuesta=None, forzar=False):
+        """
+        Ruta de un destino, desde la caché o con un traceroute nuevo.
+
+        Parámetros:
+        - destino: IP o hostname de destino
+        - ttl_respuesta: TTL de los echo replies recientes (ResultadoPing.ttl_respuesta
+                         o 'ttl_respuesta' del resultado de analizar_ip)
+        - forzar: Ejecutar el traceroute aunque la ruta siga vigente (default: False)
+
+        Retorna:
+        - list de saltos en el formato de obtener_traceroute o None si no hay ruta
+        """
+        motivo = 'forzado' if forzar else self.motivo_traceroute(destino, ttl_respuesta)
+        anterior = self.entrada(destino)
+        if motivo is None:
+            self.aciertos += 1
+            return anterior.saltos
+
+        self.traceroutes += 1
+        saltos = obtener_traceroute(destino, max_hops=self.max_hops, timeout=self.timeout)
+        if not saltos:
+            # Mantener la ruta anterior: un traceroute fallido no es un cambio de ruta
+            return anterior.saltos if anterior else None
+
+        with self._lock:
+            self._entradas[destino] = EntradaRuta(saltos, ttl_respuesta, self.vigencia)
+
+        if anterior is not None:
+            ips_anteriores = [salto['ip'] for salto in anterior.saltos]
+            ips_nuevas = [salto['ip'] for salto in saltos]
+            if _ruta_distinta(ips_anteriores, ips_nuevas):
+                self._registrar_cambio({
+                    'destino': destino,
+                    'timestamp': time.time(),
+                    'motivo': motivo,
+                    'ttl_anterior': anterior.ttl_respuesta,
+                    'ttl_nuevo': ttl_respuesta,
+                    'saltos_anteriores': ips_anteriores,
+                    'saltos_nuevos': ips_nuevas
+                })
+        return saltos
+
+    def _registrar_cambio(self, evento):
+        self.eventos.append(evento)
+        if self.historial is not None:
+            try:
+                self.historial.guardar_cambio_ruta(evento)
+            except Exception:
+                pass
+        if self.al_cambio:
+            try:
+                self.al_cambio(evento)
+            except Exception:
+                pass
+
+    def actualizar(self, resultados, max_concurrencia=4):
+        """
+        Revisar las rutas de un barrido de analizar_ips: solo se ejecuta el
+        traceroute de los destinos cuya huella cambió o cuya entrada venció.
+
+        Parámetros:
+        - resultados: Lista de dicts de analizar_ip/analizar_ips
+        - max_concurrencia: Traceroutes simultáneos (default: 4)
+
+        Retorna:
+        - int: Cantidad de traceroutes ejecutados
+        """
+        pendientes = []
+        for resultado in resultados:
+            if not resultado or resultado.get('error') or not resultado.get('ip'):
+                continue
+            ttl_respuesta = resultado.get('ttl_respuesta')
+            if self.motivo_traceroute(resultado['ip'], ttl_respuesta) is None:
+                self.aciertos += 1
+            else:
+                pendientes.append((resultado['ip'], ttl_respuesta))
+
+        if not pendientes:
+            return 0
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrencia, len(pendientes)))) as executor:
+            list(executor.map(lambda pendiente: self.obtener(*pendiente), pendientes))
+        return len(pendientes)
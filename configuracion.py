@@ -0,0 +1,63 @@
+"""
+configuracion.py
+Lectura de config.json sin dependencias de interfaz gráfica
+"""
+
+import json
+import copy
+
+
+RUTA_CONFIGURACION = 'config.json'
+
+CONFIG_EJEMPLO = {
+    "cantidad_pings": 20,
+    "max_concurrencia": 32,
+    "intervalo_barrido": 300,
+    "pps_max": 1000,
+    "historial": "historial.db",
+    "monitor_ruta": False,
+    "retencion": {
+        "intervalo": 3600,
+        "dias_crudos": 7,
+        "dias_archivo": 90,
+        "dias_minuto": 30,
+        "dias_hora": 730,
+        "max_mb": 1024
+    },
+    "ips": [
+        {"ip": "8.8.8.8", "nombre": "Google DNS", "grupo": "DNS públicos"},
+        {"ip": "1.1.1.1", "nombre": "Cloudflare DNS", "grupo": "DNS públicos"}
+    ]
+}
+
+
+def leer_configuracion(ruta=RUTA_CONFIGURACION):
+    """
+    Leer la configuración desde un archivo JSON.
+    
+    Parámetros:
+    - ruta: Ruta del archivo (default: config.json)
+    
+    Retorna:
+    - dict con la configuración
+    
+    Lanza FileNotFoundError si no existe y ValueError si está vacío o es inválido
+    """
+    with open(ruta, 'r', encoding='utf-8-sig') as f:
+        contenido = f.read().strip()
+    if not contenido:
+        raise ValueError("Archivo vacío")
+    return json.loads(contenido)
+
+
+def crear_configuracion_ejemplo(ruta=RUTA_CONFIGURACION):
+    """
+    Crear un archivo de configuración con valores de ejemplo.
+    
+    Retorna:
+    - dict con la configuración creada
+    """
+    config = copy.deepcopy(CONFIG_EJEMPLO)
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=4)
+    return config
@@ -0,0 +1,110 @@
+"""
+dns_inverso.py
+Caché compartida de DNS inverso con TTL, desalojo LRU y caché negativa;
+las consultas se hacen en un pool de hilos fuera del camino de las sondas
+"""
+
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+
+
+class CacheDNSInverso:
+    """
+    Resuelve IP -> hostname con socket.gethostbyaddr en segundo plano.
+    Los aciertos se guardan 'ttl' segundos y los fallos 'ttl_negativo'
+    segundos; al superar 'capacidad' entradas se descarta la menos usada.
+    Varias consultas simultáneas por la misma IP comparten una sola búsqueda.
+    """
+
+    def __init__(self, capacidad=4096, ttl=3600, ttl_negativo=300, max_hilos=8):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self._entradas = OrderedDict()
+        self._en_curso = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix='dns-inverso')
+
+    def obtener(self, ip):
+        """
+        Consultar solo la caché.
+
+        Retorna:
+        - tupla (encontrado, hostname); hostname es None si la IP no tiene nombre
+        """
+        with self._lock:
+            entrada = self._entradas.get(ip)
+            if entrada is None:
+                return False, None
+            hostname, expira = entrada
+            if expira <= time.monotonic():
+                del self._entradas[ip]
+                return False, None
+            self._entradas.move_to_end(ip)
+            return True, hostname
+
+    def resolver(self, ip, callback=None):
+        """
+        Resolver una IP sin bloquear.
+
+        Parámetros:
+        - ip: Dirección IP
+        - callback: Función opcional llamada con el hostname (o None) al terminar
+
+        Retorna:
+        - Future con el hostname (ya resuelto si estaba en caché)
+        """
+        encontrado, hostname = self.obtener(ip)
+        if encontrado:
+            futuro = Future()
+            futuro.set_result(hostname)
+            if callback:
+                callback(hostname)
+            return futuro
+
+        with self._lock:
+            futuro = self._en_curso.get(ip)
+            if futuro is None:
+                futuro = self._executor.submit(self._consultar, ip)
+                self._en_curso[ip] = futuro
+        if callback:
+            futuro.add_done_callback(lambda f: callback(f.result()))
+        return futuro
+
+    def _consultar(self, ip):
+        try:
+            hostname = socket.gethostbyaddr(ip)[0]
+        except (OSError, UnicodeError):
+            hostname = None
+        vigencia = self.ttl if hostname is not None else self.ttl_negativo
+        with self._lock:
+            self._entradas[ip] = (hostname, time.monotonic() + vigencia)
+            self._entradas.move_to_end(ip)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+            self._en_curso.pop(ip, None)
+        return hostname
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def obtener_cache_dns():
+    """Caché de DNS inverso compartida por todo el proceso"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CacheDNSInverso()
+    return _cache
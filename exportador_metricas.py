@@ -0,0 +1,248 @@
+"""
+exportador_metricas.py
+Exportador HTTP de métricas MOS en formato OpenMetrics/Prometheus
+
+El texto se arma una sola vez cuando llegan resultados nuevos (como mucho
+una vez por 'intervalo' segundos) y se guarda ya codificado, con y sin gzip;
+cada scrape solo copia ese buffer, sin recorrer los objetivos:
+
+    python servicio.py --continuo --metricas 9105
+    curl http://localhost:9105/metrics
+"""
+
+import gzip
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+TIPO_CONTENIDO = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# Límites superiores de los histogramas
+BUCKETS_MOS = (1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 3.6, 4.0, 4.3, 4.5)
+BUCKETS_LATENCIA = (5, 10, 20, 50, 100, 150, 200, 300, 500, 1000)
+
+# Familias por objetivo: (nombre, clave del resultado, ayuda)
+_GAUGES = (
+    ('mos_latencia_ms', 'latencia', 'Latencia promedio en ms'),
+    ('mos_jitter_ms', 'jitter', 'Jitter en ms (PingPlotter)'),
+    ('mos_perdida_porcentaje', 'perdida', 'Porcentaje de paquetes perdidos'),
+    ('mos_valor', 'mos', 'MOS estimado (1 a 5)'),
+    ('mos_r_factor', 'r_factor', 'Factor R del modelo E'),
+)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _numero(valor):
+    return repr(float(valor))
+
+
+class _Histograma:
+    """Histograma acumulado desde el inicio del exportador"""
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.conteos = [0] * len(limites)
+        self.cantidad = 0
+        self.suma = 0.0
+
+    def observar(self, valor):
+        self.cantidad += 1
+        self.suma += valor
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.conteos[i] += 1
+
+    def lineas(self, nombre, ayuda):
+        lineas = [f"# TYPE {nombre} histogram", f"# HELP {nombre} {ayuda}"]
+        for limite, conteo in zip(self.limites, self.conteos):
+            lineas.append(f'{nombre}_bucket{{le="{_numero(limite)}"}} {conteo}')
+        lineas.append(f'{nombre}_bucket{{le="+Inf"}} {self.cantidad}')
+        lineas.append(f"{nombre}_count {self.cantidad}")
+        lineas.append(f"{nombre}_sum {_numero(self.suma)}")
+        return lineas
+
+
+class SnapshotMetricas:
+    """
+    Último resultado de cada objetivo más histogramas de MOS y latencia.
+    Las líneas de cada objetivo se generan cuando llega su resultado, y el
+    documento completo se arma solo si hubo cambios desde el último armado.
+    """
+
+    def __init__(self):
+        self._lineas = {}
+        self._mos = _Histograma(BUCKETS_MOS)
+        self._latencia = _Histograma(BUCKETS_LATENCIA)
+        self._resultados = 0
+        self._errores = 0
+        self._lock = threading.Lock()
+        self._sucio = True
+        self.cuerpo = b''
+        self.cuerpo_gzip = b''
+        self.renderizar()
+
+    def __len__(self):
+        return len(self._lineas)
+
+    def actualizar(self, resultados):
+        """Incorporar una lista de resultados de analizar_ip/analizar_ips"""
+        with self._lock:
+            for resultado in resultados:
+                self._incorporar(resultado)
+            self._sucio = True
+
+    def agregar(self, resultado):
+        """Incorporar un resultado (por ejemplo desde el callback al_progreso)"""
+        self.actualizar([resultado])
+
+    def conservar(self, ips):
+        """Quitar las series de los objetivos que ya no están entre ips"""
+        ips = set(ips)
+        with self._lock:
+            quitadas = self._lineas.keys() - ips
+            for ip in quitadas:
+                del self._lineas[ip]
+            if quitadas:
+                self._sucio = True
+        return len(quitadas)
+
+    def _incorporar(self, resultado):
+        ip = resultado.get('ip') if resultado else None
+        if not ip:
+            return
+        self._resultados += 1
+        etiquetas = f'ip="{_escapar(ip)}",nombre="{_escapar(resultado.get("nombre") or ip)}"'
+        error = 1 if resultado.get('error') else 0
+        lineas = {'mos_error': f"mos_error{{{etiquetas}}} {error}"}
+        if error:
+            self._errores += 1
+        else:
+            for nombre, clave, _ayuda in _GAUGES:
+                valor = resultado.get(clave)
+                if valor is not None:
+                    lineas[nombre] = f"{nombre}{{{etiquetas}}} {_numero(valor)}"
+            if resultado.get('mos') is not None:
+                self._mos.observar(resultado['mos'])
+            if resultado.get('latencia') is not None:
+                self._latencia.observar(resultado['latencia'])
+            timestamp = resultado.get('timestamp')
+            if timestamp is not None:
+                lineas['mos_ultima_medicion_segundos'] = (
+                    f"mos_ultima_medicion_segundos{{{etiquetas}}} {_numero(timestamp)}")
+        self._lineas[ip] = lineas
+
+    def renderizar(self):
+        """Armar el documento OpenMetrics si hubo cambios"""
+        with self._lock:
+            if not self._sucio:
+                return
+            self._sucio = False
+            familias = [(nombre, 'gauge', ayuda) for nombre, _clave, ayuda in _GAUGES]
+            familias.append(('mos_ultima_medicion_segundos', 'gauge', 'Epoch de la última medición'))
+            familias.append(('mos_error', 'gauge', '1 si la última medición falló'))
+
+            salida = []
+            for nombre, tipo, ayuda in familias:
+                salida.append(f"# TYPE {nombre} {tipo}")
+                salida.append(f"# HELP {nombre} {ayuda}")
+                salida.extend(lineas[nombre] for lineas in self._lineas.values() if nombre in lineas)
+            salida.extend(self._mos.lineas('mos_distribucion', 'Distribución de MOS medidos'))
+            salida.extend(self._latencia.lineas('mos_latencia_distribucion_ms',
+                                                'Distribución de latencias promedio en ms'))
+            salida.append("# TYPE mos_resultados counter")
+            salida.append("# HELP mos_resultados Resultados recibidos")
+            salida.append(f"mos_resultados_total {self._resultados}")
+            salida.append("# TYPE mos_resultados_error counter")
+            salida.append("# HELP mos_resultados_error Resultados con error")
+            salida.append(f"mos_resultados_error_total {self._errores}")
+            salida.append("# EOF\n")
+
+        cuerpo = '\n'.join(salida).encode('utf-8')
+        cuerpo_gzip = gzip.compress(cuerpo, compresslevel=5)
+        # Reemplazo atómico: un scrape en curso sigue usando el buffer anterior
+        self.cuerpo, self.cuerpo_gzip = cuerpo, cuerpo_gzip
+
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    snapshot = None
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            cuerpo = self.snapshot.cuerpo_gzip
+            codificacion = 'gzip'
+        else:
+            cuerpo = self.snapshot.cuerpo
+            codificacion = None
+        self.send_response(200)
+        self.send_header('Content-Type', TIPO_CONTENIDO)
+        if codificacion:
+            self.send_header('Content-Encoding', codificacion)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+class ExportadorMetricas:
+    """Servidor HTTP de /metrics con un hilo que rearma el snapshot cada 'intervalo' segundos"""
+
+    def __init__(self, puerto=9105, direccion='', intervalo=1.0, snapshot=None):
+        """
+        Parámetros:
+        - puerto: Puerto TCP (default: 9105)
+        - direccion: Dirección de escucha (default: '' = todas)
+        - intervalo: Segundos mínimos entre armados del documento (default: 1.0)
+        - snapshot: SnapshotMetricas a servir (default: uno nuevo)
+        """
+        self.snapshot = snapshot if snapshot is not None else SnapshotMetricas()
+        self.intervalo = intervalo
+        manejador = type('ManejadorMetricas', (_ManejadorMetricas,), {'snapshot': self.snapshot})
+        self.servidor = ThreadingHTTPServer((direccion, puerto), manejador)
+        self.servidor.daemon_threads = True
+        self._detener = threading.Event()
+        self._hilos = []
+
+    @property
+    def puerto(self):
+        return self.servidor.server_address[1]
+
+    def actualizar(self, resultados):
+        self.snapshot.actualizar(resultados)
+
+    def agregar(self, resultado):
+        self.snapshot.agregar(resultado)
+
+    def conservar(self, ips):
+        return self.snapshot.conservar(ips)
+
+    def iniciar(self):
+        self._detener.clear()
+        self._hilos = [
+            threading.Thread(target=self.servidor.serve_forever, name='metricas-http', daemon=True),
+            threading.Thread(target=self._renderizar, name='metricas-render', daemon=True),
+        ]
+        for hilo in self._hilos:
+            hilo.start()
+        return self
+
+    def _renderizar(self):
+        while not self._detener.wait(self.intervalo):
+            try:
+                self.snapshot.renderizar()
+            except Exception:
+                pass
+
+    def detener(self):
+        self._detener.set()
+        self.servidor.shutdown()
+        self.servidor.server_close()
+        for hilo in self._hilos:
+            hilo.join(timeout=2)
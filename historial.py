@@ -0,0 +1,216 @@
+"""
+historial.py
+Historial de resultados MOS en SQLite (modo WAL) con consultas por objetivo y tiempo
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS resultados (
+    id INTEGER PRIMARY KEY,
+    ip TEXT NOT NULL,
+    nombre TEXT,
+    timestamp REAL NOT NULL,
+    latencia REAL,
+    jitter REAL,
+    perdida REAL,
+    mos REAL,
+    r_factor REAL,
+    latencia_efectiva REAL,
+    calidad TEXT,
+    error INTEGER NOT NULL DEFAULT 0,
+    mensaje TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_resultados_ip_timestamp ON resultados (ip, timestamp);
+CREATE INDEX IF NOT EXISTS idx_resultados_timestamp ON resultados (timestamp);
+CREATE TABLE IF NOT EXISTS cambios_ruta (
+    id INTEGER PRIMARY KEY,
+    destino TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    motivo TEXT,
+    ttl_anterior INTEGER,
+    ttl_nuevo INTEGER,
+    saltos_anteriores TEXT,
+    saltos_nuevos TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_cambios_ruta_destino_timestamp ON cambios_ruta (destino, timestamp);
+"""
+
+_COLUMNAS = ('ip', 'nombre', 'timestamp', 'latencia', 'jitter', 'perdida', 'mos',
+             'r_factor', 'latencia_efectiva', 'calidad', 'error', 'mensaje')
+
+_INSERTAR = (f"INSERT INTO resultados ({', '.join(_COLUMNAS)}) "
+             f"VALUES ({', '.join('?' for _ in _COLUMNAS)})")
+
+
+class HistorialResultados:
+    """
+    Almacén indexado de resultados de analizar_ip.
+    Cada hilo usa su propia conexión: gracias a WAL las consultas no bloquean
+    a los hilos de sondeo que insertan, y cada lote de resultados se guarda en
+    una sola transacción.
+    """
+
+    def __init__(self, ruta='historial.db'):
+        self.ruta = ruta
+        self._local = threading.local()
+        self._conexiones = []
+        self._lock = threading.Lock()
+        conexion = self._conexion()
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.executescript(ESQUEMA)
+        conexion.commit()
+
+    def _conexion(self):
+        """Conexión del hilo actual, creándola la primera vez"""
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=30, check_same_thread=False)
+            conexion.row_factory = sqlite3.Row
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+            with self._lock:
+                self._conexiones.append(conexion)
+        return conexion
+
+    def guardar(self, resultados, timestamp=None):
+        """
+        Insertar un lote de resultados en una sola transacción.
+
+        Parámetros:
+        - resultados: Lista de dicts retornados por analizar_ip/analizar_ips
+        - timestamp: Instante (epoch) a usar si el resultado no trae 'timestamp'
+                     (default: ahora)
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        filas = []
+        for resultado in resultados:
+            if not resultado or not resultado.get('ip'):
+                continue
+            fila = dict(resultado)
+            fila.setdefault('timestamp', timestamp)
+            fila['error'] = 1 if fila.get('error') else 0
+            filas.append(tuple(fila.get(columna) for columna in _COLUMNAS))
+        if not filas:
+            return
+        conexion = self._conexion()
+        with conexion:
+            conexion.executemany(_INSERTAR, filas)
+
+    def consultar(self, ip, desde=None, hasta=None, incluir_errores=False):
+        """
+        Resultados de un objetivo en un rango de tiempo, en orden cronológico.
+
+        Parámetros:
+        - ip: Dirección IP del objetivo
+        - desde: Epoch inicial inclusive (default: sin límite)
+        - hasta: Epoch final inclusive (default: sin límite)
+        - incluir_errores: Incluir mediciones fallidas (default: False)
+
+        Retorna:
+        - list de dicts con las columnas de la tabla resultados
+        """
+        sql = "SELECT * FROM resultados WHERE ip = ?"
+        parametros = [ip]
+        if desde is not None:
+            sql += " AND timestamp >= ?"
+            parametros.append(desde)
+        if hasta is not None:
+            sql += " AND timestamp <= ?"
+            parametros.append(hasta)
+        if not incluir_errores:
+            sql += " AND error = 0"
+        sql += " ORDER BY timestamp"
+        filas = self._conexion().execute(sql, parametros).fetchall()
+        return [dict(fila) for fila in filas]
+
+    def mos_ultimos_dias(self, ip, dias=7):
+        """
+        Serie de MOS de un objetivo en los últimos días.
+
+        Retorna:
+        - list de tuplas (timestamp, mos)
+        """
+        desde = time.time() - dias * 86400
+        filas = self._conexion().execute(
+            "SELECT timestamp, mos FROM resultados "
+            "WHERE ip = ? AND timestamp >= ? AND error = 0 ORDER BY timestamp",
+            (ip, desde)).fetchall()
+        return [(fila['timestamp'], fila['mos']) for fila in filas]
+
+    def resumen(self, ip, desde=None, hasta=None):
+        """
+        Promedios y extremos de un objetivo en un rango, calculados por SQLite.
+
+        Retorna:
+        - dict con muestras, mos_promedio, mos_minimo, latencia_promedio,
+          jitter_promedio y perdida_promedio
+        """
+        sql = ("SELECT COUNT(*) AS muestras, AVG(mos) AS mos_promedio, MIN(mos) AS mos_minimo, "
+               "AVG(latencia) AS latencia_promedio, AVG(jitter) AS jitter_promedio, "
+               "AVG(perdida) AS perdida_promedio FROM resultados WHERE ip = ? AND error = 0")
+        parametros = [ip]
+        if desde is not None:
+            sql += " AND timestamp >= ?"
+            parametros.append(desde)
+        if hasta is not None:
+            sql += " AND timestamp <= ?"
+            parametros.append(hasta)
+        fila = self._conexion().execute(sql, parametros).fetchone()
+        return dict(fila)
+
+    def guardar_cambio_ruta(self, evento):
+        """
+        Guardar un cambio de ruta detectado por CacheRutas.
+
+        Parámetros:
+        - evento: dict con destino, timestamp, motivo, ttl_anterior, ttl_nuevo,
+                  saltos_anteriores y saltos_nuevos (listas de IPs)
+        """
+        conexion = self._conexion()
+        with conexion:
+            conexion.execute(
+                "INSERT INTO cambios_ruta (destino, timestamp, motivo, ttl_anterior, ttl_nuevo, "
+                "saltos_anteriores, saltos_nuevos) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (evento['destino'], evento['timestamp'], evento.get('motivo'),
+                 evento.get('ttl_anterior'), evento.get('ttl_nuevo'),
+                 json.dumps(evento.get('saltos_anteriores')), json.dumps(evento.get('saltos_nuevos'))))
+
+    def consultar_cambios_ruta(self, destino=None, desde=None, hasta=None):
+        """
+        Cambios de ruta registrados, en orden cronológico.
+
+        Retorna:
+        - list de dicts con las columnas de cambios_ruta (saltos como listas de IPs)
+        """
+        sql = "SELECT * FROM cambios_ruta WHERE 1 = 1"
+        parametros = []
+        if destino is not None:
+            sql += " AND destino = ?"
+            parametros.append(destino)
+        if desde is not None:
+            sql += " AND timestamp >= ?"
+            parametros.append(desde)
+        if hasta is not None:
+            sql += " AND timestamp <= ?"
+            parametros.append(hasta)
+        sql += " ORDER BY timestamp"
+        cambios = []
+        for fila in self._conexion().execute(sql, parametros).fetchall():
+            cambio = dict(fila)
+            cambio['saltos_anteriores'] = json.loads(cambio['saltos_anteriores'] or 'null')
+            cambio['saltos_nuevos'] = json.loads(cambio['saltos_nuevos'] or 'null')
+            cambios.append(cambio)
+        return cambios
+
+    def cerrar(self):
+        with self._lock:
+            for conexion in self._conexiones:
+                conexion.close()
+            self._conexiones = []
+        self._local = threading.local()
@@ -0,0 +1,489 @@
+"""
+importador_ping.py
+Importador único de salidas de ping: iputils (Linux), BSD/macOS, Windows en
+inglés y español, el formato propio de pings/ y las formas "time<1ms".
+
+Lee en binario (sin decodificar) por bloques, con memoria constante: solo se
+acumulan sumas y los rangos de secuencias perdidas, por lo que sirve para
+logs de varios GB capturados por sondas de terceros. Dentro de cada bloque
+las líneas especiales (encabezados, pérdidas, resúmenes) se ubican con
+búsquedas de subcadenas y las tiradas de respuestas comunes se procesan en
+lote, sin pasar línea por línea por Python.
+
+    python importador_ping.py captura-sonda.log otra-captura.txt
+"""
+
+import argparse
+import re
+import sys
+from itertools import compress, count, repeat
+from operator import mul, sub
+
+
+# Respuesta: "icmp_seq=3 ttl=117 time=12.3 ms", "bytes=32 time<1ms TTL=128",
+# "tiempo=12ms", "tiempo<1m", "Ping 4: time=12.34 ms"
+_RESPUESTA = re.compile(rb'^(?:[^\n]*?\bicmp_seq[= ](\d+))?[^\n]*?\b(?:time|tiempo)\s*([=<])\s*(\d+(?:[.,]\d+)?)\s*m',
+                        re.IGNORECASE | re.MULTILINE)
+# Sin respuesta con número de secuencia (BSD/macOS, iputils -O, inaccesible en iputils)
+_SIN_RESPUESTA_SECUENCIA = re.compile(
+    rb'(?:request timeout for icmp_seq|no answer yet for icmp_seq=|icmp_seq=)\s*(\d+)', re.IGNORECASE)
+_SIN_RESPUESTA = re.compile(rb'request timed out|tiempo de espera agotado|'
+                            rb'destination host unreachable|host de destino inaccesible|'
+                            rb'destination net unreachable|red de destino inaccesible', re.IGNORECASE)
+# Resumen: "5 packets transmitted, 4 (packets) received", "Sent = 4, Received = 3",
+# "enviados = 4, recibidos = 3"
+_RESUMEN = re.compile(rb'(\d+) packets transmitted, (\d+) (?:packets )?received|'
+                      rb'sent = (\d+), received = (\d+)|enviados = (\d+), recibidos = (\d+)',
+                      re.IGNORECASE)
+_PORCENTAJE = re.compile(rb'(\d+(?:[.,]\d+)?)\s*%\s*(?:packet loss|perdidos|loss)', re.IGNORECASE)
+# Promedios precalculados: "rtt min/avg/max/mdev = 1/2/3/4 ms", "Average = 12ms",
+# "Media = 12ms", "Latencia promedio: 12.34 ms", "Jitter (desv. estándar): 1.2 ms"
+_PROMEDIO_RTT = re.compile(rb'(?:rtt|round-trip) min/avg/max/(?:mdev|stddev) = '
+                           rb'[\d.]+/([\d.]+)/[\d.]+/([\d.]+)', re.IGNORECASE)
+_PROMEDIO = re.compile(rb'(?:average|media|latencia promedio)\s*[=:]\s*(\d+(?:[.,]\d+)?)\s*ms', re.IGNORECASE)
+_JITTER = re.compile(rb'jitter[^:\n]*:\s*(\d+(?:[.,]\d+)?)\s*ms', re.IGNORECASE)
+# Comienzo de una corrida: "PING host", "Pinging host", "Haciendo ping a", "Ping a host - fecha"
+# (sensible a mayúsculas: "Ping statistics for" no abre una corrida)
+_ENCABEZADO = re.compile(rb'^\s*(?:PING |Pinging |Haciendo ping a |Ping a )')
+
+
+# Camino rápido de procesar_bloque: un tramo donde cada línea es una respuesta
+# común se resuelve con estas dos búsquedas sobre el tramo completo
+_TIEMPO = re.compile(rb'(?:time|tiempo)[=<]([\d.,]+)')
+_SECUENCIA = re.compile(rb'icmp_seq=(\d+)')
+# Subcadenas de las líneas que no son respuestas comunes; en un tramo con
+# líneas especiales solo esas pasan por procesar_linea. Los encabezados se
+# buscan respetando mayúsculas ("Ping 4: time=" del formato propio es una
+# respuesta); el resto, en minúsculas.
+_MARCAS_ENCABEZADO = (b'PING ', b'Pinging ', b'Ping a ', b'Haciendo ping a ')
+_MARCAS = (b'%', b'dup!', b'out', b'answer', b'agot', b'ble', b'packets', b'enviados',
+           b'avg', b'ms,', b'promedio', b'jitter', b'detalles')
+
+# Rangos de secuencias perdidas conservados (los siguientes solo se cuentan)
+MAX_RANGOS_PERDIDOS = 100000
+
+# Bytes por lectura de importar_archivo y por tramo de procesar_bloque
+TAMANO_BLOQUE = 4 << 20
+TAMANO_TRAMO = 256 << 10
+
+
+def _numero(texto):
+    return float(texto.replace(b',', b'.'))
+
+
+def _numeros(valores):
+    try:
+        return list(map(float, valores))
+    except ValueError:
+        # Decimales con coma (configuración regional en español)
+        return list(map(_numero, valores))
+
+
+class ImportadorPing:
+    """
+    Acumulador incremental de una o más corridas de ping.
+
+    Cada corrida (separada por un encabezado, un resumen o un reinicio de la
+    secuencia) aporta sus respuestas y sus perdidos: los explícitos
+    (timeouts), los huecos de icmp_seq y los que el resumen indica al final
+    sin línea propia. Así el resumen nunca se suma dos veces con las líneas.
+
+    Métricas: latencia promedio, jitter según PingPlotter (diferencia media
+    entre respuestas consecutivas), desviación estándar, mínimo, máximo,
+    pérdida y rangos de secuencias perdidas.
+    """
+
+    def __init__(self):
+        self.recibidos = 0
+        self.perdidos = 0
+        self.suma = 0.0
+        self.suma_diferencias = 0.0
+        self.anterior = None
+        self.minimo = None
+        self.maximo = None
+        self.acotadas = 0
+        self._media = 0.0
+        self._m2 = 0.0
+        self.corrida = 0
+        self.rangos_perdidos = []
+        self.rangos_omitidos = 0
+        self.porcentaje_resumen = None
+        self.latencia_resumen = None
+        self.jitter_resumen = None
+        # Opcional: objeto con agregar(latencia) y agregar_lote(latencias)
+        # que recibe cada respuesta (p. ej. retencion.HistogramaLatencias)
+        self.histograma = None
+        self._nueva_corrida()
+
+    def _nueva_corrida(self):
+        self.corrida += 1
+        self._ultima_secuencia = None
+        self._recibidos_corrida = 0
+        self._perdidos_corrida = 0
+        self._enviados_resumen = None
+
+    def _cerrar_corrida(self):
+        """
+        Aplicar el resumen de la corrida (si lo tuvo): los enviados que no
+        aparecieron como respuesta ni como pérdida se perdieron al final.
+        El resumen puede estar antes (formato propio) o después de las líneas.
+        """
+        if self._enviados_resumen is not None:
+            faltantes = self._enviados_resumen - self._recibidos_corrida - self._perdidos_corrida
+            if faltantes > 0:
+                if self._ultima_secuencia is not None:
+                    self._perder(self._ultima_secuencia + 1, self._ultima_secuencia + faltantes)
+                else:
+                    # Sin números de secuencia solo se conoce la cantidad
+                    self.perdidos += faltantes
+        self._nueva_corrida()
+
+    def _perder(self, desde, hasta):
+        """Registrar como perdidas las secuencias desde..hasta (inclusive)"""
+        cantidad = hasta - desde + 1
+        if cantidad <= 0:
+            return
+        self.perdidos += cantidad
+        self._perdidos_corrida += cantidad
+        rangos = self.rangos_perdidos
+        if rangos and rangos[-1][0] == self.corrida and rangos[-1][2] == desde - 1:
+            rangos[-1][2] = hasta
+        elif len(rangos) < MAX_RANGOS_PERDIDOS:
+            rangos.append([self.corrida, desde, hasta])
+        else:
+            self.rangos_omitidos += 1
+
+    def _secuencia(self, secuencia):
+        """Avanzar la secuencia de la corrida y registrar los huecos"""
+        ultima = self._ultima_secuencia
+        if ultima is not None:
+            if secuencia > ultima:
+                self._perder(ultima + 1, secuencia - 1)
+            elif secuencia <= 1:
+                # La secuencia volvió a empezar (0 en BSD, 1 en iputils): corrida nueva sin encabezado
+                self._cerrar_corrida()
+            else:
+                # Respuesta tardía o fuera de orden: no mueve la secuencia
+                return
+        self._ultima_secuencia = secuencia
+
+    def _respuesta(self, latencia):
+        if self.anterior is not None:
+            self.suma_diferencias += abs(latencia - self.anterior)
+        self.anterior = latencia
+        self.recibidos += 1
+        self._recibidos_corrida += 1
+        self.suma += latencia
+        delta = latencia - self._media
+        self._media += delta / self.recibidos
+        self._m2 += delta * (latencia - self._media)
+        if self.minimo is None or latencia < self.minimo:
+            self.minimo = latencia
+        if self.maximo is None or latencia > self.maximo:
+            self.maximo = latencia
+        if self.histograma is not None:
+            self.histograma.agregar(latencia)
+
+    def _respuestas(self, secuencias, valores):
+        """
+        Incorporar en lote respuestas consecutivas: icmp_seq (bytes, b'' si
+        la línea no lo tiene) o None si ninguna lo tiene, y latencias (bytes).
+        """
+        latencias = _numeros(valores)
+        if secuencias is None or not any(secuencias):
+            self._latencias(latencias)
+            return
+        if b'' in secuencias:
+            for secuencia, latencia in zip(secuencias, latencias):
+                if secuencia:
+                    self._secuencia(int(secuencia))
+                self._respuesta(latencia)
+            return
+
+        # Los huecos, reinicios y respuestas tardías solo se evalúan donde la
+        # secuencia no avanza de a uno; las latencias se acumulan en un solo lote
+        numeros = list(map(int, secuencias))
+        saltos = map(sub, numeros[1:], numeros[:-1])
+        inicios = [0]
+        inicios.extend(compress(count(1), map((1).__ne__, saltos)))
+        inicios.append(len(numeros))
+        for desde, hasta in zip(inicios, inicios[1:]):
+            primera = numeros[desde]
+            self._secuencia(primera)
+            if self._ultima_secuencia == primera:
+                self._ultima_secuencia = numeros[hasta - 1]
+            else:
+                # Respuesta tardía: no mueve la secuencia
+                for secuencia in numeros[desde + 1:hasta]:
+                    self._secuencia(secuencia)
+            self._recibidos_corrida += hasta - desde
+        self._latencias(latencias, por_corrida=False)
+
+    def _latencias(self, latencias, por_corrida=True):
+        """Incorporar en lote una tirada de latencias"""
+        # Suma, jitter (diferencias consecutivas), mínimo, máximo y combinación
+        # de varianzas (Chan et al.) sin recorrer las latencias en Python
+        cantidad = len(latencias)
+        suma = sum(latencias)
+        media = suma / cantidad
+        desvios = list(map(sub, latencias, repeat(media)))
+        m2 = sum(map(mul, desvios, desvios))
+        diferencias = sum(map(abs, map(sub, latencias[1:], latencias[:-1])))
+        if self.anterior is not None:
+            diferencias += abs(latencias[0] - self.anterior)
+        self.suma_diferencias += diferencias
+        self.anterior = latencias[-1]
+
+        previos = self.recibidos
+        total = previos + cantidad
+        delta = media - self._media
+        self._m2 += m2 + delta * delta * previos * cantidad / total
+        self._media += delta * cantidad / total
+        self.recibidos = total
+        if por_corrida:
+            self._recibidos_corrida += cantidad
+        self.suma += suma
+        minimo, maximo = min(latencias), max(latencias)
+        if self.minimo is None or minimo < self.minimo:
+            self.minimo = minimo
+        if self.maximo is None or maximo > self.maximo:
+            self.maximo = maximo
+        if self.histograma is not None:
+            self.histograma.agregar_lote(latencias)
+
+    def procesar_bloque(self, bloque):
+        """
+        Incorporar un bloque (bytes) de líneas completas. Equivale a llamar a
+        procesar_linea por cada línea, pero las respuestas comunes se
+        procesan en lote por tramos de TAMANO_TRAMO bytes.
+        """
+        largo = len(bloque)
+        desde = 0
+        while desde < largo:
+            hasta = bloque.find(b'\n', desde + TAMANO_TRAMO) + 1
+            if hasta == 0:
+                hasta = largo
+            self._procesar_tramo(bloque, desde, hasta)
+            desde = hasta
+
+    def _procesar_tramo(self, bloque, desde, hasta):
+        if self._respuestas_comunes(bloque, desde, hasta):
+            return
+
+        # Tramo con líneas especiales: ubicarlas y procesar en lote lo que hay entre ellas
+        tramo = bloque[desde:hasta]
+        minusculas = tramo.lower()
+        especiales = set()
+        for texto, marcas in ((tramo, _MARCAS_ENCABEZADO), (minusculas, _MARCAS)):
+            for marca in marcas:
+                posicion = texto.find(marca)
+                while posicion >= 0:
+                    especiales.add(texto.rfind(b'\n', 0, posicion) + 1)
+                    fin = texto.find(b'\n', posicion)
+                    if fin < 0:
+                        break
+                    posicion = texto.find(marca, fin)
+
+        desde = 0
+        for inicio in sorted(especiales):
+            if inicio > desde:
+                self._respuestas_tramo(tramo, desde, inicio)
+            fin = tramo.find(b'\n', inicio) + 1 or len(tramo)
+            self.procesar_linea(tramo[inicio:fin])
+            desde = fin
+        if desde < len(tramo):
+            self._respuestas_tramo(tramo, desde, len(tramo))
+
+    def _respuestas_comunes(self, bloque, desde, hasta):
+        """
+        Camino rápido: si cada línea del tramo es una respuesta (sin
+        duplicados), procesarlo en lote y retornar True.
+        """
+        valores = _TIEMPO.findall(bloque, desde, hasta)
+        if not valores:
+            return False
+        # Líneas no vacías (una línea vacía al comienzo del tramo cuenta como no vacía
+        # y manda el tramo al camino lento, que da el mismo resultado)
+        lineas = (bloque.count(b'\n', desde, hasta) + (bloque[hasta - 1:hasta] != b'\n')
+                  - bloque.count(b'\n\n', desde, hasta) - bloque.count(b'\n\r\n', desde, hasta))
+        if len(valores) != lineas or bloque.find(b'DUP!', desde, hasta) >= 0:
+            return False
+        secuencias = _SECUENCIA.findall(bloque, desde, hasta)
+        if secuencias and len(secuencias) != len(valores):
+            return False
+        if bloque.find(b'<', desde, hasta) >= 0:
+            self.acotadas += bloque.count(b'e<', desde, hasta) + bloque.count(b'o<', desde, hasta)
+        self._respuestas(secuencias or None, valores)
+        return True
+
+    def _respuestas_tramo(self, tramo, desde, hasta):
+        """Respuestas entre dos líneas especiales (puede haber líneas vacías o ajenas)"""
+        if self._respuestas_comunes(tramo, desde, hasta):
+            return
+        coincidencias = _RESPUESTA.findall(tramo, desde, hasta)
+        if coincidencias:
+            secuencias, operadores, valores = zip(*coincidencias)
+            self.acotadas += operadores.count(b'<')
+            self._respuestas(secuencias, valores)
+
+    def procesar_linea(self, linea):
+        """
+        Incorporar una línea (bytes) de salida de ping.
+
+        Retorna:
+        - True si la línea era una respuesta o un paquete sin respuesta
+        """
+        match = _RESPUESTA.search(linea)
+        if match:
+            if b'DUP!' in linea:
+                return False
+            secuencia, operador, latencia = match.groups()
+            if secuencia is not None:
+                self._secuencia(int(secuencia))
+            if operador == b'<':
+                self.acotadas += 1
+            self._respuesta(_numero(latencia))
+            return True
+
+        if _SIN_RESPUESTA.search(linea) or b'timeout for' in linea or b'no answer yet' in linea:
+            match = _SIN_RESPUESTA_SECUENCIA.search(linea)
+            if match:
+                secuencia = int(match.group(1))
+                self._secuencia(secuencia)
+                self._perder(secuencia, secuencia)
+            else:
+                self.perdidos += 1
+                self._perdidos_corrida += 1
+            return True
+
+        match = _RESUMEN.search(linea)
+        if match:
+            self._enviados_resumen = int(next(valor for valor in match.groups() if valor is not None))
+        match = _PORCENTAJE.search(linea)
+        if match:
+            self.porcentaje_resumen = _numero(match.group(1))
+        if _ENCABEZADO.search(linea):
+            self._cerrar_corrida()
+            return False
+
+        if self.latencia_resumen is None or self.jitter_resumen is None:
+            match = _PROMEDIO_RTT.search(linea)
+            if match:
+                self.latencia_resumen = _numero(match.group(1))
+                self.jitter_resumen = _numero(match.group(2))
+                return False
+            match = _PROMEDIO.search(linea)
+            if match and self.latencia_resumen is None:
+                self.latencia_resumen = _numero(match.group(1))
+            match = _JITTER.search(linea)
+            if match and self.jitter_resumen is None:
+                self.jitter_resumen = _numero(match.group(1))
+        return False
+
+    def procesar_texto(self, linea):
+        """Igual que procesar_linea para una línea ya decodificada (str)"""
+        return self.procesar_linea(linea.encode('utf-8', 'replace'))
+
+    def finalizar(self):
+        """Cerrar la última corrida; llamar al terminar de leer"""
+        self._cerrar_corrida()
+        return self
+
+    @property
+    def enviados(self):
+        return self.recibidos + self.perdidos
+
+    @property
+    def latencia(self):
+        """Latencia promedio en ms (la del resumen si no hubo respuestas) o None"""
+        if self.recibidos == 0:
+            return self.latencia_resumen
+        return self.suma / self.recibidos
+
+    @property
+    def jitter(self):
+        """Jitter según PingPlotter en ms (el del resumen si no hubo respuestas) o None"""
+        if self.recibidos == 0:
+            return self.jitter_resumen
+        if self.recibidos < 2:
+            return None
+        return self.suma_diferencias / (self.recibidos - 1)
+
+    @property
+    def desviacion(self):
+        """Desviación estándar de las latencias en ms o None"""
+        if self.recibidos < 2:
+            return None
+        return (self._m2 / (self.recibidos - 1)) ** 0.5
+
+    @property
+    def perdida(self):
+        """Porcentaje de pérdida o None si no hay datos"""
+        if self.enviados > 0:
+            return (self.perdidos / self.enviados) * 100
+        return self.porcentaje_resumen
+
+    def secuencias_perdidas(self):
+        """Generador de tuplas (corrida, icmp_seq) de los paquetes perdidos con secuencia conocida"""
+        for corrida, desde, hasta in self.rangos_perdidos:
+            for secuencia in range(desde, hasta + 1):
+                yield corrida, secuencia
+
+
+def importar_archivo(ruta, tamano_bloque=TAMANO_BLOQUE, histograma=None):
+    """
+    Importar un log de ping de cualquier formato soportado.
+
+    Parámetros:
+    - ruta: Ruta del archivo
+    - tamano_bloque: Bytes por lectura (default: 4 MiB)
+    - histograma: Acumulador opcional de las latencias recibidas (default: None)
+
+    Retorna:
+    - ImportadorPing con las métricas acumuladas
+    """
+    importador = ImportadorPing()
+    importador.histograma = histograma
+    resto = b''
+    with open(ruta, 'rb', buffering=0) as f:
+        while True:
+            datos = f.read(tamano_bloque)
+            if not datos:
+                break
+            datos = resto + datos
+            corte = datos.rfind(b'\n') + 1
+            if corte == 0:
+                resto = datos
+                continue
+            resto = datos[corte:]
+            importador.procesar_bloque(datos[:corte])
+    if resto:
+        importador.procesar_bloque(resto)
+    return importador.finalizar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importar logs de ping (Linux, macOS, Windows)")
+    parser.add_argument('archivos', nargs='+', help="Archivos de salida de ping")
+    args = parser.parse_args()
+
+    codigo = 0
+    for ruta in args.archivos:
+        try:
+            resultado = importar_archivo(ruta)
+        except OSError as e:
+            print(f"{ruta}: {e}", file=sys.stderr)
+            codigo = 1
+            continue
+        print(f"{ruta}: enviados={resultado.enviados} recibidos={resultado.recibidos} "
+              f"perdidos={resultado.perdidos}")
+        for etiqueta, valor in (('latencia', resultado.latencia), ('jitter', resultado.jitter),
+                                ('desviacion', resultado.desviacion), ('perdida', resultado.perdida)):
+            if valor is not None:
+                unidad = '%' if etiqueta == 'perdida' else ' ms'
+                print(f"  {etiqueta}: {valor:.2f}{unidad}")
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
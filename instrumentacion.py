@@ -0,0 +1,216 @@
+"""
+instrumentacion.py
+Spans de tiempo y contadores de las etapas de sondeo y análisis, con
+resumen por barrido y exportación en formato Chrome trace (chrome://tracing,
+Perfetto)
+
+Desactivada por defecto: span() devuelve un objeto vacío compartido y
+contar() retorna de inmediato, por lo que el costo en el camino crítico es
+una llamada y una comparación. Se activa con activar() o con la variable de
+entorno MOS_TRAZA=1.
+
+    from instrumentacion import span, contar
+
+    with span('parseo'):
+        ...
+    contar('bytes_escritos', len(datos))
+"""
+
+import json
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+
+
+# Eventos conservados para la exportación (los más viejos se descartan)
+MAX_EVENTOS = 1000000
+
+# Duraciones conservadas por etapa para estimar percentiles (muestreo de reservorio)
+MAX_MUESTRAS_ETAPA = 10000
+
+_activa = os.environ.get('MOS_TRAZA') == '1'
+_eventos = deque(maxlen=MAX_EVENTOS)
+_duraciones = {}
+_contadores = {}
+_contadores_barrido = {}
+_inicio_barrido = time.perf_counter_ns()
+_lock = threading.Lock()
+
+
+class _SpanNulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_SPAN_NULO = _SpanNulo()
+
+
+class _Etapa:
+    """
+    Cantidad y total exactos de una etapa más un reservorio uniforme de
+    hasta MAX_MUESTRAS_ETAPA duraciones para los percentiles, de modo que la
+    memoria no crece con la duración del barrido.
+    """
+    __slots__ = ('cantidad', 'total', 'muestras')
+
+    def __init__(self):
+        self.cantidad = 0
+        self.total = 0
+        self.muestras = []
+
+    def agregar(self, duracion_ns):
+        self.cantidad += 1
+        self.total += duracion_ns
+        if len(self.muestras) < MAX_MUESTRAS_ETAPA:
+            self.muestras.append(duracion_ns)
+        else:
+            indice = random.randrange(self.cantidad)
+            if indice < MAX_MUESTRAS_ETAPA:
+                self.muestras[indice] = duracion_ns
+
+
+class _Span:
+    __slots__ = ('nombre', 'inicio')
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *args):
+        registrar(self.nombre, self.inicio, time.perf_counter_ns() - self.inicio)
+        return False
+
+
+def activa():
+    return _activa
+
+
+def activar(estado=True):
+    """Activar o desactivar la instrumentación (los datos ya tomados se conservan)"""
+    global _activa
+    _activa = estado
+
+
+def span(nombre):
+    """Context manager que mide la duración de una etapa"""
+    if not _activa:
+        return _SPAN_NULO
+    return _Span(nombre)
+
+
+def registrar(nombre, inicio_ns, duracion_ns):
+    """Registrar una duración medida por fuera de span() (perf_counter_ns)"""
+    if not _activa:
+        return
+    _eventos.append((nombre, threading.get_ident(), inicio_ns, duracion_ns))
+    with _lock:
+        etapa = _duraciones.get(nombre)
+        if etapa is None:
+            etapa = _duraciones[nombre] = _Etapa()
+        etapa.agregar(duracion_ns)
+
+
+def contar(nombre, cantidad=1):
+    """Sumar a un contador (por ejemplo 'sondeos' o 'bytes_escritos')"""
+    if not _activa:
+        return
+    with _lock:
+        _contadores[nombre] = _contadores.get(nombre, 0) + cantidad
+
+
+def contadores():
+    with _lock:
+        return dict(_contadores)
+
+
+def iniciar_barrido():
+    """Marcar el comienzo de un barrido: el resumen cuenta desde aquí"""
+    global _inicio_barrido, _contadores_barrido
+    with _lock:
+        _inicio_barrido = time.perf_counter_ns()
+        _contadores_barrido = dict(_contadores)
+        _duraciones.clear()
+
+
+def _percentil(ordenados, fraccion):
+    """Percentil por rango más cercano sobre una lista ordenada"""
+    indice = max(0, min(len(ordenados) - 1, math.ceil(fraccion * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def resumen_barrido():
+    """
+    Resumen desde el último iniciar_barrido().
+
+    Retorna:
+    - dict con duracion_s, sondeos_por_segundo, bytes_escritos, contadores
+      (diferencia en el barrido) y etapas: nombre -> {cantidad, total_ms, p50_ms, p99_ms};
+      con más de MAX_MUESTRAS_ETAPA duraciones los percentiles se estiman
+      sobre una muestra uniforme
+    """
+    with _lock:
+        duracion_s = (time.perf_counter_ns() - _inicio_barrido) / 1e9
+        diferencias = {nombre: valor - _contadores_barrido.get(nombre, 0)
+                       for nombre, valor in _contadores.items()}
+        etapas = {nombre: (etapa.cantidad, etapa.total, sorted(etapa.muestras))
+                  for nombre, etapa in _duraciones.items()}
+
+    resumen_etapas = {}
+    for nombre, (cantidad, total, ordenadas) in etapas.items():
+        if not ordenadas:
+            continue
+        resumen_etapas[nombre] = {
+            'cantidad': cantidad,
+            'total_ms': total / 1e6,
+            'p50_ms': _percentil(ordenadas, 0.50) / 1e6,
+            'p99_ms': _percentil(ordenadas, 0.99) / 1e6,
+        }
+    return {
+        'duracion_s': duracion_s,
+        'sondeos_por_segundo': diferencias.get('sondeos', 0) / duracion_s if duracion_s > 0 else None,
+        'bytes_escritos': diferencias.get('bytes_escritos', 0),
+        'contadores': diferencias,
+        'etapas': resumen_etapas,
+    }
+
+
+def exportar_chrome_trace(ruta):
+    """
+    Escribir los spans y contadores en formato Chrome trace (JSON).
+
+    Retorna:
+    - int: Cantidad de eventos exportados
+    """
+    pid = os.getpid()
+    eventos = list(_eventos)
+    traza = [{'name': nombre, 'cat': 'mos', 'ph': 'X', 'pid': pid, 'tid': tid,
+              'ts': inicio / 1000, 'dur': duracion / 1000}
+             for nombre, tid, inicio, duracion in eventos]
+    ahora = time.perf_counter_ns() / 1000
+    for nombre, valor in contadores().items():
+        traza.append({'name': nombre, 'cat': 'mos', 'ph': 'C', 'pid': pid, 'ts': ahora,
+                      'args': {nombre: valor}})
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': traza, 'displayTimeUnit': 'ms'}, f)
+    return len(traza)
+
+
+def reiniciar():
+    """Descartar eventos, duraciones y contadores"""
+    global _contadores_barrido
+    with _lock:
+        _eventos.clear()
+        _duraciones.clear()
+        _contadores.clear()
+        _contadores_barrido = {}
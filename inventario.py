@@ -0,0 +1,342 @@
+"""
+inventario.py
+Inventario de objetivos: lectura en streaming de archivos JSON/CSV grandes
+con grupo y etiquetas por objetivo, y vigilancia de cambios para recargar
+
+El inventario puede estar en config.json ("ips") o, para miles de
+objetivos, en un archivo aparte indicado con "inventario" (ruta relativa a
+config.json):
+
+    {"cantidad_pings": 20, "inventario": "objetivos.csv"}
+
+Formatos aceptados:
+- .csv con encabezado: ip,nombre,grupo,etiquetas,intervalo (etiquetas
+  separadas por ';'; solo ip es obligatoria)
+- .jsonl / .ndjson: un objeto por línea
+- .json: un arreglo de objetos o un objeto con el arreglo en "ips"
+
+Los JSON se recorren elemento por elemento sin cargar el documento
+completo, de modo que la memoria depende de la cantidad de objetivos y no
+del tamaño del texto.
+
+    python inventario.py objetivos.csv
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+
+# Caracteres leídos por vez al recorrer un JSON
+TAMANO_BLOQUE = 1 << 20
+
+SEPARADOR_ETIQUETAS = ';'
+
+# Segundos mínimos entre revisiones del archivo vigilado
+INTERVALO_VIGILANCIA = 2.0
+
+
+def normalizar_objetivo(item):
+    """
+    Objetivo en el formato de config.json a partir de un dict del inventario.
+
+    Retorna:
+    - dict con 'ip', 'nombre', 'grupo', 'etiquetas' (tupla) y 'intervalo'
+      si estaba indicado, o None si el elemento no tiene IP
+    """
+    if not isinstance(item, dict):
+        return None
+    ip = str(item.get('ip') or '').strip()
+    if not ip:
+        return None
+    etiquetas = item.get('etiquetas') or ()
+    if isinstance(etiquetas, str):
+        etiquetas = etiquetas.split(SEPARADOR_ETIQUETAS)
+    elif not isinstance(etiquetas, (list, tuple)):
+        etiquetas = (etiquetas,)
+    # Etiquetas numéricas se toman como texto y las nulas se descartan
+    etiquetas = (str(etiqueta).strip() for etiqueta in etiquetas if etiqueta is not None)
+    objetivo = {
+        'ip': ip,
+        'nombre': str(item.get('nombre') or '').strip() or ip,
+        'grupo': str(item.get('grupo') or '').strip() or None,
+        'etiquetas': tuple(etiqueta for etiqueta in etiquetas if etiqueta),
+    }
+    intervalo = item.get('intervalo')
+    if intervalo not in (None, ''):
+        try:
+            objetivo['intervalo'] = float(intervalo)
+        except (TypeError, ValueError):
+            pass
+    return objetivo
+
+
+class _LectorJSON:
+    """Recorrido incremental de un documento JSON leído por bloques"""
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self.decodificador = json.JSONDecoder()
+        self.texto = ''
+        self.posicion = 0
+        self.agotado = False
+
+    def _leer(self, minimo=TAMANO_BLOQUE):
+        """Agregar texto al buffer descartando lo ya consumido; False al final del archivo"""
+        if self.agotado:
+            return False
+        bloque = self.archivo.read(max(minimo, TAMANO_BLOQUE))
+        if not bloque:
+            self.agotado = True
+            return False
+        self.texto = self.texto[self.posicion:] + bloque
+        self.posicion = 0
+        return True
+
+    def caracter(self):
+        """Próximo carácter significativo sin consumirlo ('' al final)"""
+        while True:
+            texto = self.texto
+            posicion = self.posicion
+            while posicion < len(texto) and texto[posicion] in ' \t\r\n':
+                posicion += 1
+            self.posicion = posicion
+            if posicion < len(texto):
+                return texto[posicion]
+            if not self._leer():
+                return ''
+
+    def consumir(self, esperado):
+        if self.caracter() != esperado:
+            raise ValueError(f"JSON inválido: se esperaba '{esperado}'")
+        self.posicion += 1
+
+    def valor(self):
+        """Decodificar el próximo valor completo, leyendo más si está cortado"""
+        self.caracter()
+        while True:
+            try:
+                valor, fin = self.decodificador.raw_decode(self.texto, self.posicion)
+                # Un número o literal al borde del buffer puede seguir en el próximo bloque
+                if fin < len(self.texto) or self.agotado:
+                    self.posicion = fin
+                    return valor
+            except json.JSONDecodeError:
+                if self.agotado:
+                    raise ValueError("JSON inválido o incompleto")
+            # Valor más largo que el buffer: leer al menos otro tanto (costo lineal)
+            self._leer(len(self.texto) - self.posicion)
+
+    def arreglo(self):
+        """Generador de los elementos del arreglo que empieza en la posición actual"""
+        self.consumir('[')
+        if self.caracter() == ']':
+            self.posicion += 1
+            return
+        while True:
+            yield self.valor()
+            separador = self.caracter()
+            self.posicion += 1
+            if separador == ']':
+                return
+            if separador != ',':
+                raise ValueError("JSON inválido: se esperaba ',' o ']'")
+
+
+def _elementos_json(archivo, clave):
+    """Elementos del arreglo raíz o del arreglo en clave del objeto raíz"""
+    lector = _LectorJSON(archivo)
+    inicio = lector.caracter()
+    if inicio == '[':
+        yield from lector.arreglo()
+        return
+    lector.consumir('{')
+    while True:
+        siguiente = lector.caracter()
+        if siguiente == '}' or siguiente == '':
+            return
+        if siguiente == ',':
+            lector.posicion += 1
+            continue
+        nombre = lector.valor()
+        lector.consumir(':')
+        if nombre == clave and lector.caracter() == '[':
+            yield from lector.arreglo()
+            return
+        # Otras claves (configuración) se saltean
+        lector.valor()
+
+
+def _elementos(ruta, clave):
+    extension = os.path.splitext(ruta)[1].lower()
+    with open(ruta, 'r', encoding='utf-8-sig', newline='') as f:
+        if extension == '.csv':
+            yield from csv.DictReader(f)
+        elif extension in ('.jsonl', '.ndjson'):
+            for linea in f:
+                if linea.strip():
+                    try:
+                        yield json.loads(linea)
+                    except ValueError:
+                        continue
+        else:
+            yield from _elementos_json(f, clave)
+
+
+def leer_inventario(ruta, clave='ips'):
+    """
+    Generador de objetivos de un inventario CSV, JSON Lines o JSON, leído
+    en streaming. Los elementos sin IP se ignoran.
+
+    Parámetros:
+    - ruta: Ruta del inventario
+    - clave: Clave del arreglo si el JSON es un objeto (default: 'ips')
+
+    Lanza FileNotFoundError si no existe y ValueError si el JSON es inválido
+    """
+    for item in _elementos(ruta, clave):
+        objetivo = normalizar_objetivo(item)
+        if objetivo is not None:
+            yield objetivo
+
+
+def ruta_inventario(config, ruta_config):
+    """Ruta del inventario externo de la configuración o None si las IPs están en config.json"""
+    inventario = config.get('inventario')
+    if not inventario:
+        return None
+    return os.path.join(os.path.dirname(os.path.abspath(ruta_config)), inventario)
+
+
+def cargar_objetivos(config, ruta_config):
+    """
+    Objetivos de la configuración (del inventario externo o de "ips").
+
+    Una IP repetida se conserva tantas veces como aparece, como en "ips":
+    el análisis trata cada par (ip, nombre) por separado. El monitor
+    continuo, en cambio, sondea cada IP una sola vez con los datos de su
+    última aparición (ver ips_repetidas para advertirlo).
+
+    Retorna:
+    - list de objetivos normalizados en el orden del inventario
+
+    Lanza ValueError si el inventario no existe o es inválido (un
+    FileNotFoundError queda reservado para config.json)
+    """
+    ruta = ruta_inventario(config, ruta_config)
+    elementos = leer_inventario(ruta) if ruta else \
+        filter(None, map(normalizar_objetivo, config.get('ips', [])))
+    try:
+        return list(elementos)
+    except OSError as e:
+        raise ValueError(f"No se pudo leer el inventario {ruta}: {e}")
+
+
+def ips_repetidas(objetivos):
+    """Counter ip -> apariciones de las IPs que figuran más de una vez"""
+    apariciones = Counter(objetivo['ip'] for objetivo in objetivos)
+    return Counter({ip: cantidad for ip, cantidad in apariciones.items() if cantidad > 1})
+
+
+def filtrar_objetivos(objetivos, grupos=None, etiquetas=None):
+    """
+    Objetivos de alguno de los grupos y con todas las etiquetas indicadas.
+
+    Parámetros:
+    - objetivos: Iterable de objetivos normalizados
+    - grupos: Grupos aceptados (default: None = todos)
+    - etiquetas: Etiquetas requeridas (default: None = ninguna)
+    """
+    grupos = set(grupos) if grupos else None
+    etiquetas = set(etiquetas or ())
+    for objetivo in objetivos:
+        if grupos is not None and objetivo.get('grupo') not in grupos:
+            continue
+        if etiquetas and not etiquetas.issubset(objetivo.get('etiquetas', ())):
+            continue
+        yield objetivo
+
+
+def contar_grupos(objetivos):
+    """Counter grupo -> cantidad de objetivos (None = sin grupo)"""
+    return Counter(objetivo.get('grupo') for objetivo in objetivos)
+
+
+class VigilanteArchivos:
+    """
+    Detecta cambios en config.json y el inventario comparando fecha de
+    modificación y tamaño, sin dependencias ni hilos propios: se consulta
+    con cambio() desde el bucle del servicio o de la interfaz. Un cambio se
+    informa recién cuando el archivo dejó de cambiar entre dos revisiones,
+    para no leer un inventario a medio escribir.
+    """
+
+    def __init__(self, rutas, intervalo=INTERVALO_VIGILANCIA):
+        self.intervalo = intervalo
+        self._ultima_revision = 0.0
+        self._candidata = None
+        self.establecer(rutas)
+
+    def establecer(self, rutas):
+        """Vigilar otras rutas tomando su estado actual como base"""
+        self.rutas = [ruta for ruta in rutas if ruta]
+        self._firma = self._firmar()
+        self._candidata = None
+
+    def _firmar(self):
+        firma = []
+        for ruta in self.rutas:
+            try:
+                estado = os.stat(ruta)
+                firma.append((ruta, estado.st_mtime_ns, estado.st_size))
+            except OSError:
+                firma.append((ruta, None, None))
+        return tuple(firma)
+
+    def cambio(self):
+        """True una vez por cada cambio estable de los archivos vigilados"""
+        ahora = time.monotonic()
+        if ahora - self._ultima_revision < self.intervalo:
+            return False
+        self._ultima_revision = ahora
+        firma = self._firmar()
+        if firma == self._firma:
+            self._candidata = None
+            return False
+        if firma != self._candidata:
+            self._candidata = firma
+            return False
+        self._firma = firma
+        self._candidata = None
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validar y resumir un inventario de objetivos")
+    parser.add_argument('ruta', help="Inventario .csv, .json o .jsonl (o config.json)")
+    parser.add_argument('--grupo', action='append', default=None,
+                        help="Mostrar solo este grupo (se puede repetir)")
+    parser.add_argument('--etiqueta', action='append', default=None,
+                        help="Mostrar solo objetivos con esta etiqueta (se puede repetir)")
+    args = parser.parse_args()
+
+    try:
+        objetivos = list(filtrar_objetivos(leer_inventario(args.ruta), args.grupo, args.etiqueta))
+    except (OSError, ValueError) as e:
+        print(f"Error al leer {args.ruta}: {e}", file=sys.stderr)
+        return 1
+    print(f"Objetivos: {len(objetivos)} ({len({objetivo['ip'] for objetivo in objetivos})} IPs distintas)")
+    repetidas = ips_repetidas(objetivos)
+    if repetidas:
+        print(f"IPs repetidas: {', '.join(f'{ip} ({cantidad})' for ip, cantidad in repetidas.most_common())}")
+    for grupo, cantidad in contar_grupos(objetivos).most_common():
+        print(f"  {grupo or '(sin grupo)'}: {cantidad}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,9 +5,27 @@ Sistema de Monitoreo MOS para VoIP
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-import json
 import threading
-from mos_functions import analizar_ip, clasificar_mos
+import queue
+from mos_functions import analizar_ips, clasificar_mos, MAX_CONCURRENCIA, PPS_MAX
+from historial import HistorialResultados
+from configuracion import leer_configuracion, crear_configuracion_ejemplo, RUTA_CONFIGURACION
+from inventario import cargar_objetivos, ruta_inventario, contar_grupos, VigilanteArchivos
+from instrumentacion import span, contar
+from vista_resultados import VistaResultados, PASO
+
+
+# Cuadros por segundo máximos del tablero en vivo y resultados aplicados por cuadro
+FPS_MAXIMO = 20
+INTERVALO_CUADRO_MS = 1000 // FPS_MAXIMO
+MAX_RESULTADOS_CUADRO = 2000
+
+# Resumen de objetivos en la pantalla inicial
+MAX_GRUPOS_INICIO = 8
+MAX_IPS_INICIO = 10
+
+# Cada cuánto se revisa si config.json o el inventario cambiaron
+INTERVALO_VIGILANCIA_MS = 2000
 
 
 class MonitorMOS:
@@ -18,6 +36,15 @@ class MonitorMOS:
         
         self.config = None
         self.resultados = []
+        self.historial = None
+        self.vista = None
+        self.lbl_titulo = None
+        self.lbl_estado = None
+        self.progress = None
+        self._cola = None
+        self._error_analisis = None
+        self._en_inicio = False
+        self.vigilante = None
         
         # Cargar configuración
         if not self.cargar_configuracion():
@@ -25,33 +52,31 @@ class MonitorMOS:
             root.destroy()
             return
         
+        # Historial de resultados (opcional si la base no se puede abrir)
+        try:
+            self.historial = HistorialResultados(self.config.get('historial', 'historial.db'))
+        except Exception:
+            self.historial = None
+        
         self.crear_pantalla_inicial()
+        
+        # Recargar objetivos al editar config.json o el inventario
+        self.vigilante = VigilanteArchivos(self._rutas_vigiladas())
+        self.root.after(INTERVALO_VIGILANCIA_MS, self._vigilar_configuracion)
     
     def cargar_configuracion(self):
-        """Cargar configuración desde config.json"""
+        """Cargar configuración desde config.json y los objetivos de su inventario"""
         try:
-            with open('config.json', 'r', encoding='utf-8-sig') as f:
-                contenido = f.read().strip()
-                if not contenido:
-                    raise ValueError("Archivo vacío")
-                self.config = json.loads(contenido)
+            self.config = self._leer_configuracion()
             return True
         except FileNotFoundError:
             # Crear archivo de ejemplo si no existe
-            config_ejemplo = {
-                "cantidad_pings": 20,
-                "ips": [
-                    {"ip": "8.8.8.8", "nombre": "Google DNS"},
-                    {"ip": "1.1.1.1", "nombre": "Cloudflare DNS"}
-                ]
-            }
             try:
-                with open('config.json', 'w', encoding='utf-8') as f:
-                    json.dump(config_ejemplo, f, indent=4)
+                self.config = crear_configuracion_ejemplo()
+                self.config['ips'] = cargar_objetivos(self.config, RUTA_CONFIGURACION)
                 messagebox.showinfo("Información", 
                     "Se ha creado config.json con valores de ejemplo.\n" +
                     "Puede modificarlo y reiniciar la aplicación.")
-                self.config = config_ejemplo
                 return True
             except:
                 return False
@@ -59,11 +84,36 @@ class MonitorMOS:
             messagebox.showerror("Error", f"Error al leer config.json: {e}")
             return False
     
+    def _leer_configuracion(self):
+        config = leer_configuracion()
+        config['ips'] = cargar_objetivos(config, RUTA_CONFIGURACION)
+        return config
+    
+    def _rutas_vigiladas(self):
+        return [RUTA_CONFIGURACION, ruta_inventario(self.config, RUTA_CONFIGURACION)]
+    
+    def _vigilar_configuracion(self):
+        """
+        Recargar la configuración si cambió en disco. Un barrido en curso
+        sigue con la lista con la que empezó; el próximo usa la nueva.
+        """
+        if self.vigilante.cambio():
+            try:
+                self.config = self._leer_configuracion()
+                self.vigilante.establecer(self._rutas_vigiladas())
+                if self._en_inicio:
+                    self.crear_pantalla_inicial()
+            except Exception:
+                # Archivo inválido o a medio editar: se mantiene la configuración anterior
+                pass
+        self.root.after(INTERVALO_VIGILANCIA_MS, self._vigilar_configuracion)
+    
     def crear_pantalla_inicial(self):
         """Crear pantalla inicial con botón de inicio"""
         # Limpiar ventana
         for widget in self.root.winfo_children():
             widget.destroy()
+        self._en_inicio = True
 
         # Ajustar tamaño de ventana inicial
         self.root.geometry("")  # Resetear geometría
@@ -92,10 +142,8 @@ class MonitorMOS:
         ttk.Label(info_frame, text=f"IPs a monitorear: {len(self.config['ips'])}", 
                  font=('Arial', 10)).pack(anchor=tk.W, pady=5)
         
-        # Lista de IPs
-        ips_text = "\n".join([f"  • {item['nombre']} ({item['ip']})" 
-                              for item in self.config['ips']])
-        ttk.Label(info_frame, text=ips_text, 
+        # Resumen de IPs (por grupo si el inventario los tiene)
+        ttk.Label(info_frame, text=self._resumen_objetivos(), 
                  font=('Arial', 9), foreground='gray').pack(anchor=tk.W, pady=5)
         
         # Botón de inicio (más grande y visible)
@@ -110,204 +158,197 @@ class MonitorMOS:
                                cursor='hand2')
         btn_iniciar.pack(pady=30)
     
-    def crear_pantalla_cargando(self):
-        """Crear pantalla de carga"""
-        # Limpiar ventana
-        for widget in self.root.winfo_children():
-            widget.destroy()
-        
-        # Frame principal
-        main_frame = ttk.Frame(self.root, padding="20")
-        main_frame.pack(expand=True, fill=tk.BOTH)
-        
-        # Mensaje de carga
-        ttk.Label(main_frame, text="Cargando: Espere un momento...", 
-                 font=('Arial', 14)).pack(pady=30)
-        
-        # Barra de progreso
-        self.progress = ttk.Progressbar(main_frame, mode='indeterminate', length=300)
-        self.progress.pack(pady=20)
-        self.progress.start(10)
-        
-        # Label de estado
-        self.lbl_estado = ttk.Label(main_frame, text="Iniciando análisis...", 
-                                    font=('Arial', 10), foreground='gray')
-        self.lbl_estado.pack(pady=10)
+    def _resumen_objetivos(self):
+        """Texto corto con los objetivos: cantidades por grupo o las primeras IPs"""
+        objetivos = self.config['ips']
+        grupos = contar_grupos(objetivos)
+        if grupos.keys() - {None}:
+            lineas = [f"  • {grupo or 'Sin grupo'}: {cantidad} IPs"
+                      for grupo, cantidad in grupos.most_common(MAX_GRUPOS_INICIO)]
+            restantes = len(grupos) - MAX_GRUPOS_INICIO
+            if restantes > 0:
+                lineas.append(f"  … y {restantes} grupos más")
+        else:
+            lineas = [f"  • {item['nombre']} ({item['ip']})"
+                      for item in objetivos[:MAX_IPS_INICIO]]
+            restantes = len(objetivos) - MAX_IPS_INICIO
+            if restantes > 0:
+                lineas.append(f"  … y {restantes} más")
+        return "\n".join(lineas)
+    
+    def crear_tablero(self):
+        """Pantalla de resultados en vivo: una tarjeta en espera por objetivo"""
+        pendientes = [{'ip': item['ip'], 'nombre': item['nombre'], 'pendiente': True}
+                      for item in self.config['ips']]
+        self._crear_pantalla_resultados("Monitoreo en curso", pendientes, en_curso=True)
+        self.actualizar_estado(f"Analizando {len(pendientes)} IPs en paralelo...")
     
     def iniciar_monitoreo(self):
         """Iniciar el proceso de monitoreo"""
-        self.crear_pantalla_cargando()
+        self.crear_tablero()
         
-        # Ejecutar análisis en thread separado
-        thread = threading.Thread(target=self.ejecutar_analisis)
+        # El hilo de análisis solo encola; el loop de Tk drena la cola por lotes
+        self._cola = queue.Queue()
+        self._error_analisis = None
+        thread = threading.Thread(target=self.ejecutar_analisis, args=(self._cola,))
         thread.daemon = True
         thread.start()
+        self.root.after(INTERVALO_CUADRO_MS, self._drenar_cola, self._cola)
     
-    def ejecutar_analisis(self):
-        """Ejecutar análisis de todas las IPs"""
-        self.resultados = []
-        total = len(self.config['ips'])
+    def ejecutar_analisis(self, cola):
+        """
+        Ejecutar análisis de todas las IPs en paralelo. El fin siempre se
+        encola, precedido por el error si el análisis falló, para que el
+        tablero no quede esperando.
+        """
+        max_concurrencia = self.config.get('max_concurrencia', MAX_CONCURRENCIA)
+        recibidos = []
+        resultados = None
+        
+        def al_progreso(item, resultado, completados, total):
+            recibidos.append(resultado)
+            cola.put(('resultado', resultado, completados, total))
         
-        for i, item in enumerate(self.config['ips'], 1):
-            ip = item['ip']
-            nombre = item['nombre']
-            
-            # Actualizar estado
-            self.root.after(0, self.actualizar_estado, 
-                          f"Analizando {nombre} ({ip})... [{i}/{total}]")
+        try:
+            # Realizar análisis concurrente (mantiene el orden de config.json)
+            resultados = analizar_ips(self.config['ips'],
+                                      self.config['cantidad_pings'],
+                                      max_concurrencia=max_concurrencia,
+                                      pps_max=self.config.get('pps_max', PPS_MAX),
+                                      al_progreso=al_progreso)
             
-            # Realizar análisis
-            resultado = analizar_ip(ip, self.config['cantidad_pings'])
+            # Guardar el barrido completo en el historial
+            if self.historial:
+                try:
+                    self.historial.guardar(resultados)
+                except Exception:
+                    pass
+        except Exception as e:
+            cola.put(('error', str(e) or type(e).__name__, len(recibidos), len(self.config['ips'])))
+        finally:
+            # Si falló quedan los resultados que llegaron a completarse
+            if resultados is None:
+                resultados = list(recibidos)
+            cola.put(('fin', resultados, len(resultados), len(self.config['ips'])))
+    
+    def _drenar_cola(self, cola):
+        """
+        Aplicar en un solo cuadro los resultados acumulados desde el anterior
+        (como mucho MAX_RESULTADOS_CUADRO) y reprogramarse mientras no llegue
+        el fin del barrido.
+        """
+        if cola is not self._cola:
+            # Barrido reemplazado por uno nuevo
+            return
+        lote = []
+        fin = None
+        progreso = None
+        with span('tk_drenar_cola'):
+            while len(lote) < MAX_RESULTADOS_CUADRO:
+                try:
+                    tipo, dato, completados, total = cola.get_nowait()
+                except queue.Empty:
+                    break
+                progreso = (completados, total)
+                if tipo == 'error':
+                    self._error_analisis = dato
+                    continue
+                if tipo == 'fin':
+                    fin = dato
+                    break
+                lote.append(dato)
             
-            if resultado and not resultado.get('error'):
-                resultado['nombre'] = nombre
-                self.resultados.append(resultado)
-            else:
-                mensaje_error = resultado.get('mensaje', 'Error desconocido') if resultado else 'Sin respuesta'
-                self.resultados.append({
-                    'ip': ip,
-                    'nombre': nombre,
-                    'error': True,
-                    'mensaje': mensaje_error
-                })
-        
-        # Mostrar resultados
-        self.root.after(0, self.mostrar_resultados)
+            if lote:
+                contar('resultados_ui', len(lote))
+                self.actualizar_resultados(lote)
+            if progreso:
+                self._mostrar_progreso(*progreso)
+            if fin is not None:
+                self.resultados = fin
+                self._finalizar_tablero()
+                return
+        self.root.after(INTERVALO_CUADRO_MS, self._drenar_cola, cola)
+    
+    def _mostrar_progreso(self, completados, total):
+        if self.progress is not None and self.progress.winfo_exists():
+            self.progress.config(maximum=max(total, 1), value=completados)
+        self.actualizar_estado(f"Completados {completados}/{total}")
+    
+    def _finalizar_tablero(self):
+        if self.lbl_titulo is None or not self.lbl_titulo.winfo_exists():
+            return
+        self.lbl_titulo.config(text="Resultados del Monitoreo")
+        self.progress.pack_forget()
+        if self._error_analisis is not None:
+            self.actualizar_estado(f"Análisis interrumpido: {self._error_analisis}")
+            messagebox.showerror("Error", f"El análisis se interrumpió: {self._error_analisis}")
+            return
+        errores = sum(1 for resultado in self.resultados if resultado.get('error'))
+        self.actualizar_estado(f"{len(self.resultados)} IPs analizadas, {errores} con error")
     
     def actualizar_estado(self, texto):
         """Actualizar texto de estado"""
-        self.lbl_estado.config(text=texto)
+        with span('tk_actualizar_estado'):
+            if self.lbl_estado is not None and self.lbl_estado.winfo_exists():
+                self.lbl_estado.config(text=texto)
     
     def mostrar_resultados(self):
         """Mostrar pantalla de resultados"""
+        with span('tk_mostrar_resultados'):
+            self._mostrar_resultados()
+    
+    def _mostrar_resultados(self):
+        self._crear_pantalla_resultados("Resultados del Monitoreo", self.resultados)
+    
+    def _crear_pantalla_resultados(self, titulo, resultados, en_curso=False):
         # Limpiar ventana
         for widget in self.root.winfo_children():
             widget.destroy()
+        self._en_inicio = False
 
         # Calcular ancho necesario basado en número de tarjetas
-        num_tarjetas = len(self.resultados)
+        num_tarjetas = len(resultados)
         # Ancho por tarjeta (300) + padding (20) + margen extra
-        ancho_ventana = min(num_tarjetas * 320 + 60, 1600)
+        ancho_ventana = min(num_tarjetas * PASO + 60, 1600)
         ancho_ventana = max(ancho_ventana, 600)  # Mínimo 600px
-        alto_ventana = 550
+        alto_ventana = 600 if en_curso else 550
 
         self.root.geometry(f"{ancho_ventana}x{alto_ventana}")
         
-        # Frame principal con scroll horizontal
+        # Frame principal
         main_frame = ttk.Frame(self.root)
         main_frame.pack(fill=tk.BOTH, expand=True)
         
         # Título
-        ttk.Label(main_frame, text="Resultados del Monitoreo", 
-                 font=('Arial', 16, 'bold')).pack(pady=15)
-        
-        # Frame para canvas con scroll horizontal
-        canvas_frame = ttk.Frame(main_frame)
-        canvas_frame.pack(fill=tk.BOTH, expand=True, padx=10)
-        
-        # Canvas y scrollbar horizontal
-        canvas = tk.Canvas(canvas_frame)
-        scrollbar = ttk.Scrollbar(canvas_frame, orient="horizontal", command=canvas.xview)
-        scrollable_frame = ttk.Frame(canvas)
-        
-        def actualizar_scroll(e):
-            canvas.configure(scrollregion=canvas.bbox("all"))
-            # Centrar el contenido si es más pequeño que el canvas
-            canvas_width = canvas.winfo_width()
-            frame_width = scrollable_frame.winfo_reqwidth()
-            if frame_width < canvas_width:
-                x_pos = (canvas_width - frame_width) // 2
-                canvas.coords(canvas_window, x_pos, 0)
-            else:
-                canvas.coords(canvas_window, 0, 0)
-
-        scrollable_frame.bind("<Configure>", actualizar_scroll)
-
-        canvas_window = canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(xscrollcommand=scrollbar.set)
-
-        # También actualizar al redimensionar el canvas
-        canvas.bind("<Configure>", actualizar_scroll)
-
-        # Frame para las tarjetas en horizontal
-        tarjetas_frame = ttk.Frame(scrollable_frame)
-        tarjetas_frame.pack(padx=10, pady=10)
-        
-        # Mostrar cada resultado horizontalmente
-        for i, resultado in enumerate(self.resultados):
-            self.crear_tarjeta_resultado(tarjetas_frame, resultado, i)
-        
-        # Empaquetar canvas y scrollbar
-        canvas.pack(side="top", fill="both", expand=True)
-        scrollbar.pack(side="bottom", fill="x")
-        
-        # Botón volver
+        self.lbl_titulo = ttk.Label(main_frame, text=titulo, font=('Arial', 16, 'bold'))
+        self.lbl_titulo.pack(pady=15)
+        
+        # Estado y progreso del barrido en curso
+        self.lbl_estado = None
+        self.progress = None
+        if en_curso:
+            self.lbl_estado = ttk.Label(main_frame, text="Iniciando análisis...",
+                                        font=('Arial', 10), foreground='gray')
+            self.lbl_estado.pack()
+            self.progress = ttk.Progressbar(main_frame, mode='determinate', length=300,
+                                            maximum=max(num_tarjetas, 1))
+            self.progress.pack(pady=5)
+        
+        # Botón volver (se empaqueta antes que la vista para que no lo tape)
         btn_frame = ttk.Frame(main_frame)
-        btn_frame.pack(pady=15)
+        btn_frame.pack(side=tk.BOTTOM, pady=15)
         
         ttk.Button(btn_frame, text="⟲ Volver a Inicio", 
                   command=self.crear_pantalla_inicial).pack()
-    
-    def crear_tarjeta_resultado(self, parent, resultado, columna):
-        """Crear tarjeta con resultado de una IP"""
-        # Frame para la tarjeta (columna)
-        card = ttk.LabelFrame(parent, text=f"{resultado['nombre']}\n({resultado['ip']})", 
-                             padding="15", width=280)
-        card.grid(row=0, column=columna, padx=10, pady=10, sticky=(tk.N, tk.S))
-        card.grid_propagate(False)  # Mantener tamaño fijo
-        
-        if resultado.get('error'):
-            error_msg = resultado.get('mensaje', 'Error desconocido')
-            ttk.Label(card, text=f"❌ {error_msg}", 
-                     font=('Arial', 9), foreground='red', wraplength=250).pack(pady=20)
-            return
-        
-        # Métricas básicas
-        metricas_frame = ttk.Frame(card)
-        metricas_frame.pack(fill=tk.X, pady=5)
-        
-        self.agregar_metrica(metricas_frame, "Latencia:", f"{resultado['latencia']:.2f} ms")
-        self.agregar_metrica(metricas_frame, "Jitter:", f"{resultado['jitter']:.2f} ms")
-        self.agregar_metrica(metricas_frame, "Pérdida:", f"{resultado['perdida']:.2f}%")
-        
-        # Separador
-        ttk.Separator(card, orient='horizontal').pack(fill=tk.X, pady=10)
         
-        # Frame de resultados MOS
-        mos_frame = ttk.Frame(card)
-        mos_frame.pack(fill=tk.X, pady=5)
-        
-        # Determinar color según calidad
-        mos = resultado['mos']
-        if mos >= 4.3:
-            color = "green"
-        elif mos >= 4.0:
-            color = "blue"
-        elif mos >= 3.6:
-            color = "orange"
-        elif mos >= 3.1:
-            color = "dark orange"
-        else:
-            color = "red"
-        
-        # MOS y Calidad
-        ttk.Label(mos_frame, text=f"MOS: {resultado['mos']:.2f}", 
-                 font=('Arial', 14, 'bold'), foreground=color).pack()
-        
-        ttk.Label(mos_frame, text=f"Calidad: {resultado['calidad']}", 
-                 font=('Arial', 11), foreground=color).pack()
-        
-        ttk.Label(mos_frame, text=f"Lat. Efectiva:\n{resultado['latencia_efectiva']:.2f} ms", 
-                 font=('Arial', 9), foreground='gray').pack(pady=5)
+        # Tarjetas con scroll horizontal: solo se dibujan las visibles
+        self.vista = VistaResultados(main_frame, resultados)
+        self.vista.pack(fill=tk.BOTH, expand=True, padx=10)
     
-    def agregar_metrica(self, parent, label, valor):
-        """Agregar una métrica al frame"""
-        frame = ttk.Frame(parent)
-        frame.pack(fill=tk.X, pady=2)
-        
-        ttk.Label(frame, text=label, font=('Arial', 10, 'bold')).pack(side=tk.LEFT)
-        ttk.Label(frame, text=valor, font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
-
+    def actualizar_resultados(self, resultados):
+        """Actualizar en el lugar las tarjetas de los objetivos con resultado nuevo"""
+        if self.vista is not None and self.vista.winfo_exists():
+            self.vista.actualizar(resultados)
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,320 @@
+"""
+monitor_continuo.py
+Monitoreo continuo por objetivo con ventana deslizante y MOS incremental
+"""
+
+import threading
+import time
+from collections import deque
+
+from mos_functions import latencia_valida, evaluar_metricas
+from planificador import PlanificadorSondeos, PPS_MAX
+from registro_muestras import obtener_registro
+
+
+class VentanaMOS:
+    """
+    Ventana deslizante de muestras (por cantidad o por tiempo) con latencia
+    promedio, jitter PingPlotter y pérdida mantenidos en O(1) por muestra:
+    cada alta o baja solo ajusta sumas acumuladas, sin recorrer la ventana.
+    """
+
+    def __init__(self, tamano=60, duracion=None):
+        """
+        Parámetros:
+        - tamano: Máximo de muestras en la ventana (default: 60, None = sin límite)
+        - duracion: Antigüedad máxima de las muestras en segundos (default: None)
+        """
+        self.tamano = tamano
+        self.duracion = duracion
+        self._muestras = deque()
+        self._recibidas = deque()
+        self._suma = 0.0
+        self._suma_diferencias = 0.0
+        self._perdidas = 0
+        self._bajas = 0
+
+    def agregar(self, latencia_ms, timestamp=None):
+        """
+        Incorporar una muestra (latencia_ms None = paquete perdido) y descartar
+        las que quedan fuera de la ventana.
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        self._muestras.append((timestamp, latencia_ms))
+        if latencia_ms is None:
+            self._perdidas += 1
+        else:
+            if self._recibidas:
+                self._suma_diferencias += abs(latencia_ms - self._recibidas[-1])
+            self._recibidas.append(latencia_ms)
+            self._suma += latencia_ms
+
+        if self.tamano is not None:
+            while len(self._muestras) > self.tamano:
+                self._quitar_primera()
+        if self.duracion is not None:
+            limite = timestamp - self.duracion
+            while self._muestras and self._muestras[0][0] < limite:
+                self._quitar_primera()
+
+    def _quitar_primera(self):
+        _timestamp, latencia_ms = self._muestras.popleft()
+        if latencia_ms is None:
+            self._perdidas -= 1
+        else:
+            self._recibidas.popleft()
+            self._suma -= latencia_ms
+            if self._recibidas:
+                self._suma_diferencias -= abs(self._recibidas[0] - latencia_ms)
+
+        # Recalcular las sumas cada tantas bajas como muestras haya en la
+        # ventana evita que se acumule error de redondeo (sigue siendo O(1) amortizado)
+        self._bajas += 1
+        if self._bajas >= max(len(self._muestras), 1):
+            self._recalcular()
+
+    def _recalcular(self):
+        self._bajas = 0
+        self._suma = sum(self._recibidas)
+        self._suma_diferencias = 0.0
+        anterior = None
+        for latencia_ms in self._recibidas:
+            if anterior is not None:
+                self._suma_diferencias += abs(latencia_ms - anterior)
+            anterior = latencia_ms
+
+    def __len__(self):
+        return len(self._muestras)
+
+    @property
+    def recibidas(self):
+        return len(self._recibidas)
+
+    @property
+    def latencia(self):
+        """Latencia promedio en ms o None si no hay respuestas"""
+        return self._suma / len(self._recibidas) if self._recibidas else None
+
+    @property
+    def jitter(self):
+        """Jitter según PingPlotter en ms o None si hay menos de 2 respuestas"""
+        if len(self._recibidas) < 2:
+            return None
+        return self._suma_diferencias / (len(self._recibidas) - 1)
+
+    @property
+    def perdida(self):
+        """Porcentaje de pérdida en la ventana o None si está vacía"""
+        if not self._muestras:
+            return None
+        return (self._perdidas / len(self._muestras)) * 100
+
+    def resultado(self, ip):
+        """
+        MOS y calidad de la ventana actual.
+
+        Retorna:
+        - dict en el formato de analizar_ip o dict con error
+        """
+        if self.recibidas < 5:
+            return {'ip': ip, 'error': True, 'mensaje': 'Muestras insuficientes en la ventana'}
+        resultado = evaluar_metricas(ip, self.latencia, self.jitter, self.perdida)
+        resultado['ip'] = ip
+        resultado['muestras'] = len(self._muestras)
+        resultado['timestamp'] = time.time()
+        return resultado
+
+
+class _Secuencia:
+    """Reordenamiento de las respuestas de una programación de un objetivo"""
+
+    __slots__ = ('siguiente', 'llegadas')
+
+    def __init__(self):
+        self.siguiente = 0
+        self.llegadas = {}
+
+    def ordenar(self, indice, latencia_ms, timestamp_ns):
+        """
+        Incorporar la respuesta del sondeo indice.
+
+        Retorna:
+        - list de (secuencia, latencia_ms, timestamp_ns) que ya se pueden
+          entregar en orden (vacía si falta una respuesta anterior)
+        """
+        self.llegadas[indice] = (latencia_ms, timestamp_ns)
+        listas = []
+        while self.siguiente in self.llegadas:
+            latencia_ms, timestamp_ns = self.llegadas.pop(self.siguiente)
+            self.siguiente += 1
+            listas.append((self.siguiente, latencia_ms, timestamp_ns))
+        return listas
+
+
+class MonitorObjetivos:
+    """
+    Monitoreo continuo de muchos objetivos con un solo PlanificadorSondeos:
+    cada objetivo tiene su VentanaMOS y su propio intervalo, y el total de
+    paquetes queda limitado por pps_max. Los resultados se emiten por objetivo
+    en cada muestra o cada 'cadencia' segundos.
+    """
+
+    def __init__(self, al_resultado, tamano_ventana=60, duracion_ventana=None,
+                 cadencia=None, pps_max=PPS_MAX, registrar=True, planificador=None):
+        """
+        Parámetros:
+        - al_resultado: Callback llamado con el dict de resultado (incluye 'nombre')
+        - tamano_ventana: Muestras por ventana (default: 60)
+        - duracion_ventana: Segundos de ventana, alternativa a tamano_ventana (default: None)
+        - cadencia: Segundos entre resultados emitidos por objetivo (default: None = en cada muestra)
+        - pps_max: Paquetes por segundo máximos en total (default: 1000)
+        - registrar: Agregar las muestras al registro binario de pings/ (default: True)
+        - planificador: PlanificadorSondeos a compartir (default: uno nuevo)
+        """
+        self.al_resultado = al_resultado
+        self.tamano_ventana = tamano_ventana
+        self.duracion_ventana = duracion_ventana
+        self.cadencia = cadencia
+        self.planificador = planificador if planificador is not None else PlanificadorSondeos(pps_max=pps_max)
+        self.ventanas = {}
+        self._objetivos = {}
+        self._ultimo_envio = {}
+        self._secuencias = {}
+        self._lock = threading.Lock()
+        # Muestras ya ordenadas que esperan ir al registro, fuera de self._lock
+        self._por_registrar = deque()
+        self._lock_registro = threading.Lock()
+        self._registro = None
+        if registrar:
+            try:
+                self._registro = obtener_registro()
+            except OSError:
+                self._registro = None
+
+    def agregar(self, ip, nombre=None, intervalo=1.0, grupo=None, etiquetas=()):
+        """Comenzar a monitorear una IP con su propio intervalo entre pings"""
+        with self._lock:
+            self.ventanas[ip] = VentanaMOS(self.tamano_ventana, self.duracion_ventana)
+            self._objetivos[ip] = (nombre or ip, intervalo, grupo, tuple(etiquetas))
+            self._ultimo_envio[ip] = 0.0
+        self._programar(ip, intervalo)
+
+    def _programar(self, ip, intervalo):
+        """
+        Agendar los pings de una IP con un reordenamiento nuevo: las
+        respuestas en vuelo de una programación anterior se descartan.
+        """
+        secuencia = _Secuencia()
+        with self._lock:
+            self._secuencias[ip] = secuencia
+        self.planificador.agregar_objetivo(
+            ip, lambda *args: self._al_sondeo(secuencia, *args), intervalo=intervalo)
+
+    def agregar_desde_config(self, config):
+        """Agregar las IPs de config.json; 'intervalo' por IP es opcional (default: 1 s)"""
+        for item in config.get('ips', []):
+            self.agregar(item['ip'], item.get('nombre'), item.get('intervalo', 1.0),
+                         item.get('grupo'), item.get('etiquetas', ()))
+
+    def quitar(self, ip):
+        self.planificador.quitar_objetivo(ip)
+        with self._lock:
+            self.ventanas.pop(ip, None)
+            self._objetivos.pop(ip, None)
+            self._ultimo_envio.pop(ip, None)
+            self._secuencias.pop(ip, None)
+
+    def sincronizar(self, objetivos):
+        """
+        Ajustar los objetivos monitoreados a una lista nueva sin reiniciar:
+        se cancelan los que ya no están, se programan los nuevos y se
+        reprograman (conservando su ventana) los que cambiaron de intervalo.
+        Los demás no se tocan y sus sondeos en vuelo se entregan normalmente.
+        Una IP repetida en la lista se monitorea una vez con su última entrada.
+
+        Parámetros:
+        - objetivos: Lista de dicts en el formato de config.json
+
+        Retorna:
+        - tupla (agregados, quitados, modificados) con las cantidades
+        """
+        nuevos = {item['ip']: item for item in objetivos}
+        with self._lock:
+            actuales = dict(self._objetivos)
+
+        quitados = actuales.keys() - nuevos.keys()
+        for ip in quitados:
+            self.quitar(ip)
+
+        agregados = modificados = 0
+        for ip, item in nuevos.items():
+            datos = (item.get('nombre') or ip, item.get('intervalo', 1.0), item.get('grupo'),
+                     tuple(item.get('etiquetas', ())))
+            anteriores = actuales.get(ip)
+            if anteriores is None:
+                self.agregar(ip, *datos)
+                agregados += 1
+            elif anteriores != datos:
+                with self._lock:
+                    self._objetivos[ip] = datos
+                if anteriores[1] != datos[1]:
+                    # El cambio de generación en el planificador descarta los envíos ya agendados
+                    self.planificador.quitar_objetivo(ip)
+                    self._programar(ip, datos[1])
+                modificados += 1
+        return agregados, len(quitados), modificados
+
+    def iniciar(self):
+        self.planificador.iniciar()
+        return self
+
+    def detener(self):
+        self.planificador.detener()
+
+    def _al_sondeo(self, secuencia, ip, indice, rtt, timestamp, timestamp_ns):
+        with self._lock:
+            ventana = self.ventanas.get(ip)
+            if ventana is None or self._secuencias.get(ip) is not secuencia:
+                return
+            # Registrar y agregar a la ventana en orden de secuencia aunque
+            # las respuestas lleguen desordenadas (igual que hacer_ping_lote)
+            listas = secuencia.ordenar(indice, latencia_valida(rtt), timestamp_ns)
+            if not listas:
+                return
+            for numero, latencia_ms, instante_ns in listas:
+                ventana.agregar(latencia_ms, instante_ns / 1e9)
+                if self._registro is not None:
+                    self._por_registrar.append((ip, numero, instante_ns, latencia_ms))
+            resultado = None
+            ahora = time.monotonic()
+            if self.cadencia is None or ahora - self._ultimo_envio[ip] >= self.cadencia:
+                self._ultimo_envio[ip] = ahora
+                resultado = ventana.resultado(ip)
+                nombre, _intervalo, grupo, etiquetas = self._objetivos[ip]
+                resultado['nombre'] = nombre
+                if grupo:
+                    resultado['grupo'] = grupo
+                if etiquetas:
+                    resultado['etiquetas'] = list(etiquetas)
+
+        self._registrar()
+        if resultado is None:
+            return
+        try:
+            self.al_resultado(resultado)
+        except Exception:
+            pass
+
+    def _registrar(self):
+        """
+        Pasar al registro binario las muestras encoladas sin retener
+        self._lock; la cola conserva el orden en que se agregaron.
+        """
+        if self._registro is None:
+            return
+        with self._lock_registro:
+            while self._por_registrar:
+                ip, numero, instante_ns, latencia_ms = self._por_registrar.popleft()
+                self._registro.agregar(ip, numero, instante_ns, latencia_ms, latencia_ms is None)
+
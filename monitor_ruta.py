@@ -0,0 +1,256 @@
+"""
+monitor_ruta.py
+Monitoreo continuo de rutas estilo MTR: latencia, jitter, pérdida y MOS por salto
+"""
+
+import threading
+
+from mos_functions import obtener_traceroute, latencia_valida, calcular_mos, clasificar_mos
+from monitor_continuo import VentanaMOS, _Secuencia
+from planificador import PlanificadorSondeos
+
+
+# Presupuesto por defecto para sondear saltos (paquetes por segundo)
+PPS_RUTAS = 100
+
+# Diferencia de MOS tolerada al buscar el salto donde empieza la degradación
+TOLERANCIA_MOS = 0.1
+
+
+class MonitorRutas:
+    """
+    Descubre la ruta de cada destino una sola vez con obtener_traceroute y
+    luego sondea cada salto con un PlanificadorSondeos compartido. Un mismo
+    router que aparece en varias rutas (por ejemplo el gateway) se sondea una
+    sola vez y su VentanaMOS la comparten todas las rutas que lo incluyen.
+
+    El intervalo entre pings de cada salto se ajusta a la cantidad de saltos
+    distintos para que el total nunca supere pps_max: con 50 rutas y 600
+    saltos distintos a 100 pps cada salto se sondea cada 6 s.
+    """
+
+    def __init__(self, pps_max=PPS_RUTAS, intervalo=1.0, tamano_ventana=60,
+                 duracion_ventana=None, max_hops=30, timeout_traceroute=2, planificador=None):
+        """
+        Parámetros:
+        - pps_max: Paquetes por segundo máximos para todos los saltos (default: 100)
+        - intervalo: Segundos mínimos entre pings a un mismo salto (default: 1.0)
+        - tamano_ventana: Muestras por ventana de cada salto (default: 60)
+        - duracion_ventana: Segundos de ventana, alternativa a tamano_ventana (default: None)
+        - max_hops: Máximo de saltos del traceroute inicial (default: 30)
+        - timeout_traceroute: Timeout del traceroute inicial en segundos (default: 2)
+        - planificador: PlanificadorSondeos a compartir (default: uno nuevo)
+        """
+        self.pps_max = pps_max
+        self.intervalo_minimo = intervalo
+        self.tamano_ventana = tamano_ventana
+        self.duracion_ventana = duracion_ventana
+        self.max_hops = max_hops
+        self.timeout_traceroute = timeout_traceroute
+        self.planificador = planificador if planificador is not None else PlanificadorSondeos(pps_max=pps_max)
+        self.rutas = {}
+        self.ventanas = {}
+        self._referencias = {}
+        self._nombres = {}
+        self._secuencias = {}
+        self._intervalo = intervalo
+        self._lock = threading.Lock()
+
+    def _clave(self, ip):
+        # Clave propia para no chocar con otros objetivos del planificador compartido
+        return ('salto', ip)
+
+    def _programar(self, ip, intervalo):
+        """
+        Agendar los pings de un salto con un reordenamiento nuevo: las
+        respuestas en vuelo de una programación anterior se descartan.
+        """
+        secuencia = _Secuencia()
+        with self._lock:
+            self._secuencias[ip] = secuencia
+        self.planificador.agregar_objetivo(ip, lambda *args: self._al_sondeo(secuencia, *args),
+                                           intervalo=intervalo, clave=self._clave(ip))
+
+    @property
+    def intervalo(self):
+        """Segundos entre pings a cada salto con la cantidad actual de saltos"""
+        return self._intervalo
+
+    def agregar(self, destino, nombre=None, saltos=None):
+        """
+        Comenzar a monitorear la ruta hacia un destino.
+
+        Parámetros:
+        - destino: IP o hostname de destino
+        - nombre: Nombre descriptivo (default: destino)
+        - saltos: Lista de saltos ya conocida en el formato de obtener_traceroute
+                  (default: None = ejecutar el traceroute)
+
+        Retorna:
+        - list de saltos descubiertos o None si no se pudo obtener la ruta
+        """
+        if saltos is None:
+            saltos = obtener_traceroute(destino, max_hops=self.max_hops,
+                                        timeout=self.timeout_traceroute, espera_dns=0)
+        if not saltos:
+            return None
+
+        self.quitar(destino)
+        nuevos = []
+        with self._lock:
+            self.rutas[destino] = saltos
+            self._nombres[destino] = nombre or destino
+            for salto in saltos:
+                ip = salto['ip']
+                if ip == '*':
+                    continue
+                if ip not in self._referencias:
+                    self._referencias[ip] = 0
+                    self.ventanas[ip] = VentanaMOS(self.tamano_ventana, self.duracion_ventana)
+                    nuevos.append(ip)
+                self._referencias[ip] += 1
+
+        if not self._reprogramar():
+            for ip in nuevos:
+                self._programar(ip, self._intervalo)
+        return saltos
+
+    def quitar(self, destino):
+        """Dejar de monitorear una ruta; los saltos que no usa otra ruta se dejan de sondear"""
+        with self._lock:
+            saltos = self.rutas.pop(destino, None)
+            self._nombres.pop(destino, None)
+            if saltos is None:
+                return False
+            retirados = []
+            for salto in saltos:
+                ip = salto['ip']
+                if ip == '*' or ip not in self._referencias:
+                    continue
+                self._referencias[ip] -= 1
+                if self._referencias[ip] == 0:
+                    del self._referencias[ip]
+                    del self.ventanas[ip]
+                    self._secuencias.pop(ip, None)
+                    retirados.append(ip)
+
+        for ip in retirados:
+            self.planificador.quitar_objetivo(self._clave(ip))
+        self._reprogramar()
+        return True
+
+    def _reprogramar(self):
+        """
+        Recalcular el intervalo por salto según el presupuesto y, si cambió,
+        reprogramar todos los saltos.
+
+        Retorna:
+        - True si se reprogramaron los saltos
+        """
+        with self._lock:
+            ips = list(self._referencias)
+            intervalo = max(self.intervalo_minimo, len(ips) / self.pps_max)
+            if intervalo == self._intervalo:
+                return False
+            self._intervalo = intervalo
+
+        for ip in ips:
+            self.planificador.quitar_objetivo(self._clave(ip))
+            self._programar(ip, intervalo)
+        return True
+
+    def iniciar(self):
+        self.planificador.iniciar()
+        return self
+
+    def detener(self):
+        self.planificador.detener()
+
+    def _al_sondeo(self, secuencia, ip, indice, rtt, timestamp, timestamp_ns):
+        with self._lock:
+            ventana = self.ventanas.get(ip)
+            if ventana is None or self._secuencias.get(ip) is not secuencia:
+                return
+            # La ventana recibe las muestras en orden de secuencia aunque las
+            # respuestas lleguen desordenadas
+            for _numero, latencia_ms, instante_ns in secuencia.ordenar(indice, latencia_valida(rtt),
+                                                                         timestamp_ns):
+                ventana.agregar(latencia_ms, instante_ns / 1e9)
+
+    def _estado_salto(self, salto):
+        estado = {
+            'hop': salto['hop'],
+            'ip': salto['ip'],
+            'hostname': salto.get('hostname'),
+            'muestras': 0,
+            'latencia': None,
+            'jitter': None,
+            'perdida': None,
+            'mos': None,
+            'r_factor': None,
+            'calidad': None
+        }
+        ventana = self.ventanas.get(salto['ip'])
+        if ventana is None:
+            return estado
+
+        estado['muestras'] = len(ventana)
+        estado['latencia'] = ventana.latencia
+        estado['jitter'] = ventana.jitter
+        estado['perdida'] = ventana.perdida
+        if ventana.jitter is not None:
+            mos, r_factor, _lat_efectiva = calcular_mos(ventana.latencia, ventana.jitter, ventana.perdida)
+            estado['mos'] = mos
+            estado['r_factor'] = r_factor
+            estado['calidad'] = clasificar_mos(mos)
+        return estado
+
+    def estado(self, destino):
+        """
+        Métricas actuales de cada salto de una ruta.
+
+        Retorna:
+        - list de dicts (hop, ip, hostname, muestras, latencia, jitter, perdida,
+          mos, r_factor, calidad) o None si el destino no se monitorea
+        """
+        with self._lock:
+            saltos = self.rutas.get(destino)
+            if saltos is None:
+                return None
+            return [self._estado_salto(salto) for salto in saltos]
+
+    def salto_degradado(self, destino, tolerancia=TOLERANCIA_MOS):
+        """
+        Primer salto desde el cual el MOS se mantiene tan bajo como en el destino.
+
+        Un router intermedio que limita sus respuestas ICMP puede mostrar
+        pérdida que no se propaga a los saltos siguientes; por eso solo cuenta
+        la degradación que persiste hasta el final de la ruta.
+
+        Retorna:
+        - dict del salto (formato de estado()) o None si no hay degradación medible
+        """
+        saltos = [salto for salto in (self.estado(destino) or []) if salto['mos'] is not None]
+        if len(saltos) < 2:
+            return None
+        mos_destino = saltos[-1]['mos']
+        if max(salto['mos'] for salto in saltos) - mos_destino <= tolerancia:
+            return None
+
+        degradado = saltos[-1]
+        for salto in reversed(saltos[:-1]):
+            if salto['mos'] > mos_destino + tolerancia:
+                break
+            degradado = salto
+        return degradado
+
+    def resumen(self):
+        """Estado de todas las rutas: dict destino -> {'nombre', 'saltos'}"""
+        with self._lock:
+            destinos = list(self.rutas)
+        resumen = {}
+        for destino in destinos:
+            saltos = self.estado(destino)
+            if saltos is not None:
+                resumen[destino] = {'nombre': self._nombres.get(destino, destino), 'saltos': saltos}
+        return resumen
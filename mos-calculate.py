@@ -1,11 +1,16 @@
 import subprocess
-import re
-import statistics
 from datetime import datetime
 import platform
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import threading
+from itertools import islice
+
+from importador_ping import ImportadorPing, importar_archivo
+
+
+# Segundos sin ninguna línea de ping antes de darlo por colgado
+TIMEOUT_INACTIVIDAD = 10
 
 
 class MOSCalculatorGUI:
@@ -183,19 +188,46 @@ class MOSCalculatorGUI:
     
     def _hacer_ping_thread(self, ip, cantidad):
         """Thread para ejecutar ping"""
-        resultado = self.hacer_ping(ip, cantidad)
+        def al_progreso(estadisticas):
+            # Copiar los valores: el objeto sigue cambiando en este hilo
+            self.root.after(0, self._ping_progreso, estadisticas.latencia, estadisticas.desviacion,
+                            estadisticas.perdida, estadisticas.enviados, cantidad)
+        
+        archivo, estadisticas = self.hacer_ping(ip, cantidad, al_progreso)
         
         # Actualizar UI en el hilo principal
-        self.root.after(0, self._ping_completado, resultado)
+        self.root.after(0, self._ping_completado, archivo,
+                        estadisticas.latencia, estadisticas.desviacion, estadisticas.perdida)
+    
+    def _mostrar_metricas(self, latencia, jitter, perdida):
+        if latencia is not None:
+            self.lbl_latencia.config(text=f"Latencia: {latencia:.2f} ms")
+        if jitter is not None:
+            self.lbl_jitter.config(text=f"Jitter: {jitter:.2f} ms")
+        if perdida is not None:
+            self.lbl_perdida.config(text=f"Pérdida: {perdida:.2f} %")
     
-    def _ping_completado(self, archivo):
+    def _ping_progreso(self, latencia, jitter, perdida, procesados, cantidad):
+        """Actualizar las métricas con cada respuesta del ping en curso"""
+        self._mostrar_metricas(latencia, jitter, perdida)
+        self.actualizar_estado(f"Ping en curso: {procesados}/{cantidad}")
+        
+        # Con la última respuesta el resultado ya está disponible
+        if procesados >= cantidad:
+            self.latencia, self.jitter, self.perdida = latencia, jitter, perdida
+            self._verificar_datos_completos()
+    
+    def _ping_completado(self, archivo, latencia=None, jitter=None, perdida=None):
         """Callback cuando el ping se completa"""
         self.btn_ping.config(state='normal')
         
         if archivo:
             self.archivo_ping = archivo
+            self.latencia, self.jitter, self.perdida = latencia, jitter, perdida
+            self._mostrar_metricas(latencia, jitter, perdida)
             self.log(f"✓ Ping completado. Archivo: {archivo}")
             self.actualizar_estado("Ping completado")
+            self._verificar_datos_completos()
             
             # Habilitar botones de análisis
             self.btn_latencia.config(state='normal')
@@ -207,10 +239,25 @@ class MOSCalculatorGUI:
             self.actualizar_estado("Error en ping")
             messagebox.showerror("Error", "No se pudo completar el ping")
     
-    def hacer_ping(self, ip, cantidad):
-        """Realizar ping y guardar en archivo"""
+    def hacer_ping(self, ip, cantidad, al_progreso=None, timeout_inactividad=TIMEOUT_INACTIVIDAD):
+        """
+        Realizar ping leyendo la salida línea por línea a medida que llega.
+        Cada línea se guarda en el archivo en el momento y actualiza las
+        estadísticas; no hay timeout total: el proceso solo se termina si pasan
+        timeout_inactividad segundos sin ninguna línea, y lo recibido se conserva.
+        
+        Parámetros:
+        - ip: IP o host de destino
+        - cantidad: Número de pings
+        - al_progreso: Callback opcional con el ImportadorPing tras cada respuesta
+        - timeout_inactividad: Segundos sin salida antes de terminar el ping (default: 10)
+        
+        Retorna:
+        - tupla (nombre_archivo o None si hubo error, ImportadorPing)
+        """
         fecha_hora = datetime.now().strftime("%Y%m%d-%H%M%S")
         nombre_archivo = f"ping-{ip}-{fecha_hora}.txt"
+        estadisticas = ImportadorPing()
         
         sistema = platform.system().lower()
         
@@ -220,28 +267,57 @@ class MOSCalculatorGUI:
             else:
                 comando = ["ping", "-c", str(cantidad), ip]
             
-            self.log(f"Realizando {cantidad} pings a {ip}...")
+            self.root.after(0, self.log, f"Realizando {cantidad} pings a {ip}...")
             
-            resultado = subprocess.run(
+            proceso = subprocess.Popen(
                 comando,
-                capture_output=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
                 text=True,
-                timeout=cantidad * 2
+                errors='replace',
+                bufsize=1
             )
             
-            with open(nombre_archivo, 'w', encoding='utf-8') as f:
-                f.write(f"Ping a {ip} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write("=" * 60 + "\n\n")
-                f.write(resultado.stdout)
-                if resultado.stderr:
-                    f.write("\nErrores:\n")
-                    f.write(resultado.stderr)
+            # Vigilancia de inactividad: se reinicia con cada línea recibida
+            vigilancia = [None]
+            
+            def reiniciar_vigilancia():
+                if vigilancia[0] is not None:
+                    vigilancia[0].cancel()
+                vigilancia[0] = threading.Timer(timeout_inactividad, proceso.kill)
+                vigilancia[0].daemon = True
+                vigilancia[0].start()
             
-            return nombre_archivo
+            reiniciar_vigilancia()
+            try:
+                with open(nombre_archivo, 'w', encoding='utf-8') as f:
+                    f.write(f"Ping a {ip} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                    f.write("=" * 60 + "\n\n")
+                    for linea in proceso.stdout:
+                        reiniciar_vigilancia()
+                        f.write(linea)
+                        f.flush()
+                        if estadisticas.procesar_texto(linea) and al_progreso:
+                            al_progreso(estadisticas)
+                proceso.wait()
+                # Aplicar el resumen final (paquetes perdidos al final sin línea propia)
+                estadisticas.finalizar()
+            finally:
+                vigilancia[0].cancel()
+                if proceso.poll() is None:
+                    proceso.kill()
+            
+            if estadisticas.enviados == 0:
+                self.root.after(0, self.log, f"✗ ping terminó sin respuestas (código {proceso.returncode})")
+            return nombre_archivo, estadisticas
             
         except Exception as e:
-            self.log(f"✗ Error: {e}")
-            return None
+            self.root.after(0, self.log, f"✗ Error: {e}")
+            return None, estadisticas
+    
+    def _importar_archivo(self):
+        """Métricas del archivo de ping actual (cualquier formato de ping)"""
+        return importar_archivo(self.archivo_ping)
     
     def calcular_latencia_promedio(self):
         """Calcular latencia promedio del archivo"""
@@ -250,28 +326,16 @@ class MOSCalculatorGUI:
             return
         
         try:
-            with open(self.archivo_ping, 'r', encoding='utf-8') as f:
-                contenido = f.read()
-            
-            patrones = [
-                r'tiempo[=<](\d+\.?\d*)\s*ms',
-                r'time[=<](\d+\.?\d*)\s*ms',
-            ]
-            
-            latencias = []
-            for patron in patrones:
-                matches = re.findall(patron, contenido, re.IGNORECASE)
-                if matches:
-                    latencias.extend([float(m) for m in matches])
+            resultado = self._importar_archivo()
             
-            if not latencias:
+            if resultado.recibidos == 0:
                 self.log("✗ No se encontraron datos de latencia")
                 messagebox.showerror("Error", "No se encontraron datos de latencia en el archivo")
                 return
             
-            self.latencia = statistics.mean(latencias)
+            self.latencia = resultado.latencia
             self.lbl_latencia.config(text=f"Latencia: {self.latencia:.2f} ms")
-            self.log(f"✓ Latencia promedio: {self.latencia:.2f} ms ({len(latencias)} muestras)")
+            self.log(f"✓ Latencia promedio: {self.latencia:.2f} ms ({resultado.recibidos} muestras)")
             
             self._verificar_datos_completos()
             
@@ -286,28 +350,16 @@ class MOSCalculatorGUI:
             return
         
         try:
-            with open(self.archivo_ping, 'r', encoding='utf-8') as f:
-                contenido = f.read()
+            resultado = self._importar_archivo()
             
-            patrones = [
-                r'tiempo[=<](\d+\.?\d*)\s*ms',
-                r'time[=<](\d+\.?\d*)\s*ms',
-            ]
-            
-            latencias = []
-            for patron in patrones:
-                matches = re.findall(patron, contenido, re.IGNORECASE)
-                if matches:
-                    latencias.extend([float(m) for m in matches])
-            
-            if len(latencias) < 2:
+            if resultado.recibidos < 2:
                 self.log("✗ No hay suficientes datos para calcular jitter")
                 messagebox.showerror("Error", "No hay suficientes datos para calcular jitter")
                 return
             
-            self.jitter = statistics.stdev(latencias)
+            self.jitter = resultado.desviacion
             self.lbl_jitter.config(text=f"Jitter: {self.jitter:.2f} ms")
-            self.log(f"✓ Jitter: {self.jitter:.2f} ms (min: {min(latencias):.2f}, max: {max(latencias):.2f})")
+            self.log(f"✓ Jitter: {self.jitter:.2f} ms (min: {resultado.minimo:.2f}, max: {resultado.maximo:.2f})")
             
             self._verificar_datos_completos()
             
@@ -322,31 +374,22 @@ class MOSCalculatorGUI:
             return
         
         try:
-            with open(self.archivo_ping, 'r', encoding='utf-8') as f:
-                contenido = f.read()
+            resultado = self._importar_archivo()
             
-            match = re.search(r'enviados\s*=\s*(\d+).*?recibidos\s*=\s*(\d+)', contenido, re.IGNORECASE)
-            if match:
-                enviados = int(match.group(1))
-                recibidos = int(match.group(2))
-                perdidos = enviados - recibidos
-                porcentaje = (perdidos / enviados) * 100 if enviados > 0 else 0
-            else:
-                match = re.search(r'(\d+)\s+packets?\s+transmitted.*?(\d+)\s+received.*?(\d+\.?\d*)%\s+packet\s+loss', contenido, re.IGNORECASE)
-                if match:
-                    porcentaje = float(match.group(3))
-                else:
-                    match = re.search(r'(\d+\.?\d*)%\s+(perdidos|loss)', contenido, re.IGNORECASE)
-                    if match:
-                        porcentaje = float(match.group(1))
-                    else:
-                        self.log("✗ No se encontraron datos de pérdida de paquetes")
-                        messagebox.showerror("Error", "No se encontraron datos de pérdida de paquetes")
-                        return
+            if resultado.perdida is None:
+                self.log("✗ No se encontraron datos de pérdida de paquetes")
+                messagebox.showerror("Error", "No se encontraron datos de pérdida de paquetes")
+                return
             
-            self.perdida = porcentaje
+            self.perdida = resultado.perdida
             self.lbl_perdida.config(text=f"Pérdida: {self.perdida:.2f} %")
-            self.log(f"✓ Paquetes perdidos: {self.perdida:.2f}%")
+            mensaje = f"✓ Paquetes perdidos: {self.perdida:.2f}% ({resultado.perdidos} de {resultado.enviados})"
+            secuencias = [str(secuencia) for _corrida, secuencia in islice(resultado.secuencias_perdidas(), 21)]
+            if secuencias:
+                mensaje += f" - icmp_seq perdidos: {', '.join(secuencias[:20])}"
+                if len(secuencias) > 20:
+                    mensaje += ", ..."
+            self.log(mensaje)
             
             self._verificar_datos_completos()
             
@@ -8,175 +8,503 @@ import statistics
 from datetime import datetime
 import time
 import os
+import queue
+import atexit
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 
+from motor_icmp import obtener_motor
+from planificador import PlanificadorSondeos, PPS_MAX
+from registro_muestras import obtener_registro, LectorRegistro
+from dns_inverso import obtener_cache_dns
+from instrumentacion import span, contar
+from importador_ping import importar_archivo
 
-def hacer_ping(ip, cantidad=10):
+
+# Límite por defecto de objetivos analizados simultáneamente
+MAX_CONCURRENCIA = 32
+
+log = logging.getLogger('mos.funciones')
+
+
+def _sondear(ip, motor):
+    """Un ping con el motor ICMP compartido o, si no está disponible, con ping3"""
+    contar('sondeos')
+    with span('ping'):
+        if motor is not None:
+            return motor.ping(ip, timeout=1)
+        return ping3.ping(ip, timeout=1)
+
+
+def latencia_valida(resultado):
+    """
+    Convertir el resultado de un ping (segundos) a milisegundos.
+    Rechazamos latencias menores a 1ms ya que son probablemente errores o localhost.
+    """
+    if resultado is not None and resultado is not False and resultado > 0.001:
+        return resultado * 1000
+    return None
+
+
+def medir_latencia(ip, motor=None):
+    """
+    Un ping a una IP.
+    
+    Retorna:
+    - Latencia válida en ms o None si el paquete se perdió
+    """
+    try:
+        return latencia_valida(_sondear(ip, motor))
+    except Exception:
+        return None
+
+
+class ResultadoPing:
+    """
+    Serie de pings en memoria: una muestra por número de secuencia con su
+    latencia (None si se perdió) y el instante de envío.
+    Las funciones calcular_* aceptan este objeto directamente.
+    Si se indica un RegistroMuestras, cada muestra se agrega también al
+    registro binario en el momento en que llega.
+    ttl_respuesta guarda el TTL del último echo reply cuando el motor ICMP lo
+    conoce (sirve como huella barata de la ruta).
+    """
+    
+    def __init__(self, ip, registro=None, fecha=None):
+        self.ip = ip
+        self.fecha = fecha or datetime.now()
+        self.secuencias = []
+        self.latencias = []
+        self.timestamps = []
+        self.archivo = None
+        self.registro = registro
+        self.ttl_respuesta = None
+    
+    def agregar(self, latencia_ms, timestamp, timestamp_ns=None):
+        """
+        Registrar la siguiente muestra (latencia_ms None = paquete perdido).
+        timestamp es la hora de envío (time.time()) y timestamp_ns el instante
+        monotónico que se guarda en el registro binario.
+        """
+        secuencia = len(self.secuencias) + 1
+        self.secuencias.append(secuencia)
+        self.latencias.append(latencia_ms)
+        self.timestamps.append(timestamp)
+        if self.registro is not None:
+            if timestamp_ns is None:
+                timestamp_ns = time.monotonic_ns()
+            self.registro.agregar(self.ip, secuencia, timestamp_ns, latencia_ms, latencia_ms is None)
+    
+    @property
+    def perdidos(self):
+        """Lista de flags: True si la secuencia correspondiente se perdió"""
+        return [latencia is None for latencia in self.latencias]
+    
+    @property
+    def latencias_validas(self):
+        return [latencia for latencia in self.latencias if latencia is not None]
+    
+    @property
+    def enviados(self):
+        return len(self.latencias)
+    
+    @property
+    def recibidos(self):
+        return self.enviados - sum(self.perdidos)
+    
+    @property
+    def porcentaje_perdida(self):
+        enviados = self.enviados
+        return ((enviados - self.recibidos) / enviados) * 100 if enviados > 0 else 0
+    
+    def es_valido(self):
+        """
+        Hay al menos algunas respuestas válidas y la pérdida no es mayor
+        al 50% (VoIP no funciona con más pérdida)
+        """
+        return self.recibidos >= 5 and self.porcentaje_perdida <= 50
+
+
+class _EscritorArchivos:
+    """
+    Escribe los archivos de pings/ en un hilo de fondo para sacar la E/S del
+    camino de medición. Los pendientes se vacían al terminar el proceso.
+    """
+    
+    def __init__(self):
+        self.cola = queue.Queue()
+        self.hilo = None
+        self.lock = threading.Lock()
+        atexit.register(self.vaciar)
+    
+    def encolar(self, muestras):
+        with self.lock:
+            if self.hilo is None:
+                self.hilo = threading.Thread(target=self._procesar, name='mos-escritor', daemon=True)
+                self.hilo.start()
+        self.cola.put(muestras)
+    
+    def vaciar(self):
+        """Bloquear hasta que todos los archivos encolados estén escritos"""
+        if self.hilo is not None:
+            self.cola.join()
+    
+    def _procesar(self):
+        while True:
+            muestras = self.cola.get()
+            try:
+                _escribir_archivo_ping(muestras)
+            except Exception:
+                pass
+            finally:
+                self.cola.task_done()
+
+
+_escritor = _EscritorArchivos()
+
+
+def _nombre_archivo_ping(ip, fecha):
+    return f"pings/ping-{ip}-{fecha.strftime('%Y%m%d-%H%M%S')}.txt"
+
+
+def _escribir_archivo_ping(muestras):
+    """Guarda una serie de pings en pings/ con el formato de texto histórico"""
+    # Crear carpeta pings si no existe
+    if not os.path.exists('pings'):
+        os.makedirs('pings', exist_ok=True)
+    
+    latencias = muestras.latencias_validas
+    paquetes_enviados = muestras.enviados
+    paquetes_recibidos = len(latencias)
+    paquetes_perdidos = paquetes_enviados - paquetes_recibidos
+    porcentaje_perdida = muestras.porcentaje_perdida
+    
+    with span('escritura_archivo'), open(muestras.archivo, 'w', encoding='utf-8') as f:
+        f.write(f"Ping a {muestras.ip} - {muestras.fecha.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write("=" * 60 + "\n\n")
+        f.write(f"Paquetes: enviados = {paquetes_enviados}, recibidos = {paquetes_recibidos}, ")
+        f.write(f"perdidos = {paquetes_perdidos} ({porcentaje_perdida:.2f}% perdidos)\n\n")
+        
+        if latencias:
+            f.write("Estadísticas:\n")
+            f.write(f"  Latencia mínima: {min(latencias):.2f} ms\n")
+            f.write(f"  Latencia máxima: {max(latencias):.2f} ms\n")
+            f.write(f"  Latencia promedio: {statistics.mean(latencias):.2f} ms\n")
+            if len(latencias) > 1:
+                f.write(f"  Jitter (desv. estándar): {statistics.stdev(latencias):.2f} ms\n")
+            f.write("\nDetalles de cada ping:\n")
+            for i, lat in enumerate(latencias, 1):
+                f.write(f"  Ping {i}: time={lat:.2f} ms\n")
+        else:
+            f.write("No se recibieron respuestas válidas.\n")
+        contar('bytes_escritos', f.tell())
+
+
+def _finalizar_serie(muestras, guardar_archivo):
+    """
+    Encola la escritura opcional del archivo y aplica el criterio de validez.
+    
+    Retorna:
+    - muestras si la serie es utilizable, None en caso contrario
+    """
+    if guardar_archivo:
+        muestras.archivo = _nombre_archivo_ping(muestras.ip, muestras.fecha)
+        _escritor.encolar(muestras)
+    
+    return muestras if muestras.es_valido() else None
+
+
+def _registro_activo(registrar):
+    """RegistroMuestras compartido o None si no se debe registrar"""
+    if not registrar:
+        return None
+    try:
+        return obtener_registro()
+    except OSError:
+        return None
+
+
+def hacer_ping(ip, cantidad=10, guardar_archivo=False, registrar=True):
     """
-    Realiza ping a una IP y guarda los resultados en un archivo.
+    Realiza ping a una IP y retorna las muestras en memoria.
     Ejecuta 1 ping por segundo para simular tráfico real.
     
     Parámetros:
     - ip: Dirección IP a hacer ping
     - cantidad: Número de pings a realizar (default: 10)
+    - guardar_archivo: Escribir además pings/ping-{ip}-{fecha}.txt en segundo plano (default: False)
+    - registrar: Agregar cada muestra al registro binario de pings/ (default: True)
     
     Retorna:
-    - nombre_archivo: Ruta del archivo creado o None si hay error
+    - ResultadoPing con las muestras o None si hay error o la serie no es utilizable
     """
-    # Crear carpeta pings si no existe
-    if not os.path.exists('pings'):
-        os.makedirs('pings')
-    
-    fecha_hora = datetime.now().strftime("%Y%m%d-%H%M%S")
-    nombre_archivo = f"pings/ping-{ip}-{fecha_hora}.txt"
-    
     try:
-        latencias = []
-        paquetes_enviados = 0
-        paquetes_recibidos = 0
+        motor = obtener_motor()
+        muestras = ResultadoPing(ip, registro=_registro_activo(registrar))
         
         # Realizar pings con intervalo de 1 segundo
         for i in range(cantidad):
             inicio = time.time()
-            paquetes_enviados += 1
+            inicio_ns = time.monotonic_ns()
             
-            try:
-                # ping3 retorna el tiempo en segundos o None si falla
-                resultado = ping3.ping(ip, timeout=1)
-                # Validar que el resultado sea válido (mayor a 0.001 segundos = 1ms y no None)
-                # Rechazamos latencias menores a 1ms ya que son probablemente errores o localhost
-                if resultado is not None and resultado > 0.001:
-                    # Convertir a milisegundos
-                    latencia_ms = resultado * 1000
-                    latencias.append(latencia_ms)
-                    paquetes_recibidos += 1
-            except Exception:
-                pass  # Paquete perdido
+            # None = paquete perdido
+            latencia_ms = medir_latencia(ip, motor)
+            muestras.agregar(latencia_ms, inicio, inicio_ns)
             
             # Esperar para completar 1 segundo total
             tiempo_transcurrido = time.time() - inicio
             if tiempo_transcurrido < 1.0:
                 time.sleep(1.0 - tiempo_transcurrido)
         
-        # Calcular pérdida
-        paquetes_perdidos = paquetes_enviados - paquetes_recibidos
-        porcentaje_perdida = (paquetes_perdidos / paquetes_enviados) * 100 if paquetes_enviados > 0 else 0
-        
-        # Guardar resultados en archivo
-        with open(nombre_archivo, 'w', encoding='utf-8') as f:
-            f.write(f"Ping a {ip} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write("=" * 60 + "\n\n")
-            f.write(f"Paquetes: enviados = {paquetes_enviados}, recibidos = {paquetes_recibidos}, ")
-            f.write(f"perdidos = {paquetes_perdidos} ({porcentaje_perdida:.2f}% perdidos)\n\n")
-            
-            if latencias:
-                f.write("Estadísticas:\n")
-                f.write(f"  Latencia mínima: {min(latencias):.2f} ms\n")
-                f.write(f"  Latencia máxima: {max(latencias):.2f} ms\n")
-                f.write(f"  Latencia promedio: {statistics.mean(latencias):.2f} ms\n")
-                if len(latencias) > 1:
-                    f.write(f"  Jitter (desv. estándar): {statistics.stdev(latencias):.2f} ms\n")
-                f.write("\nDetalles de cada ping:\n")
-                for i, lat in enumerate(latencias, 1):
-                    f.write(f"  Ping {i}: time={lat:.2f} ms\n")
-            else:
-                f.write("No se recibieron respuestas válidas.\n")
-        
-        # Solo retornar el archivo si hay al menos algunas respuestas válidas
-        # y la pérdida no es mayor al 50% (VoIP no funciona con más pérdida)
-        if latencias and len(latencias) >= 5 and porcentaje_perdida <= 50:
-            return nombre_archivo
-        else:
-            return None
+        if motor is not None:
+            muestras.ttl_respuesta = motor.ttl_respuesta(ip)
+        return _finalizar_serie(muestras, guardar_archivo)
         
     except Exception as e:
         return None
 
 
-def calcular_latencia_promedio(archivo):
+def hacer_ping_lote(ips, cantidad=10, motor=None, guardar_archivo=False, registrar=True,
+                    pps_max=PPS_MAX, al_terminar=None):
     """
-    Calcula la latencia promedio desde un archivo de ping.
+    Realiza ping a muchas IPs a la vez usando el motor ICMP y el planificador.
+    Cada IP recibe 1 ping por segundo, con los envíos repartidos a lo largo del
+    segundo y limitados a pps_max paquetes por segundo en total, de modo que
+    miles de destinos no requieren miles de hilos ni salen en ráfaga.
     
     Parámetros:
-    - archivo: Ruta del archivo con resultados de ping
+    - ips: Lista de direcciones IP
+    - cantidad: Número de pings por IP (default: 10)
+    - motor: MotorICMP a usar (default: el motor compartido del proceso)
+    - guardar_archivo: Escribir además un archivo por IP en segundo plano (default: False)
+    - registrar: Agregar cada muestra al registro binario de pings/ (default: True)
+    - pps_max: Paquetes por segundo máximos para todo el lote (default: 1000)
+    - al_terminar: Callback opcional con (ip, ResultadoPing o None) apenas
+                   termina la serie de cada IP, llamado desde este hilo
     
     Retorna:
-    - latencia_promedio: Latencia promedio en ms o None si hay error
+    - dict: ip -> ResultadoPing o None si hay error
     """
-    try:
-        with open(archivo, 'r', encoding='utf-8') as f:
-            contenido = f.read()
-        
-        # Buscar líneas con formato "Ping X: time=XX.XX ms"
-        import re
-        patron = r'time=(\d+\.?\d*)\s*ms'
-        matches = re.findall(patron, contenido, re.IGNORECASE)
-        
-        if not matches:
-            # Intentar con formato alternativo
-            patron_alt = r'Latencia promedio:\s*(\d+\.?\d*)\s*ms'
-            match_alt = re.search(patron_alt, contenido, re.IGNORECASE)
-            if match_alt:
-                return float(match_alt.group(1))
-            return None
-        
-        latencias = [float(m) for m in matches]
-        return statistics.mean(latencias)
-        
-    except FileNotFoundError:
-        return None
-    except Exception as e:
-        return None
+    motor = motor or obtener_motor()
+    if motor is None or cantidad <= 0:
+        resultados = {}
+        for ip in ips:
+            resultados[ip] = hacer_ping(ip, cantidad, guardar_archivo, registrar) if cantidad > 0 else None
+            if al_terminar:
+                al_terminar(ip, resultados[ip])
+        return resultados
+    
+    registro = _registro_activo(registrar)
+    series = {ip: ResultadoPing(ip, registro=registro) for ip in ips}
+    llegadas = {ip: {} for ip in series}
+    lock = threading.Lock()
+    
+    def al_resultado(ip, indice, rtt, timestamp, timestamp_ns):
+        with lock:
+            muestras = series[ip]
+            pendientes = llegadas[ip]
+            pendientes[indice] = (latencia_valida(rtt), timestamp, timestamp_ns)
+            # Agregar en orden de secuencia aunque las respuestas lleguen desordenadas
+            while len(muestras.latencias) in pendientes:
+                muestras.agregar(*pendientes.pop(len(muestras.latencias)))
+    
+    # El planificador avisa cada serie completa; se cierra en este hilo, no en el receptor
+    terminados = queue.Queue()
+    planificador = PlanificadorSondeos(pps_max=pps_max, motor=motor)
+    for ip in series:
+        planificador.agregar_objetivo(ip, al_resultado, intervalo=1.0, cantidad=cantidad,
+                                      al_terminar=terminados.put)
+    
+    resultados = {}
+    with span('hacer_ping_lote'):
+        planificador.iniciar()
+        try:
+            for _ in range(len(series)):
+                while True:
+                    try:
+                        ip = terminados.get(timeout=1.0)
+                        break
+                    except queue.Empty:
+                        if not planificador.en_ejecucion():
+                            raise RuntimeError("El planificador de sondeos se detuvo")
+                muestras = series[ip]
+                muestras.ttl_respuesta = motor.ttl_respuesta(ip)
+                try:
+                    resultados[ip] = _finalizar_serie(muestras, guardar_archivo)
+                except Exception:
+                    resultados[ip] = None
+                if al_terminar:
+                    al_terminar(ip, resultados[ip])
+        finally:
+            planificador.detener()
+    return resultados
 
 
-def calcular_jitter(archivo):
+def leer_series_registro(ruta_registro):
     """
-    Calcula el jitter según el método de PingPlotter:
-    promedio de diferencias absolutas entre latencias consecutivas.
+    Reconstruye las series de pings guardadas en un registro binario.
+    Una serie nueva de una IP comienza cuando su secuencia vuelve a 1.
+    
+    Parámetros:
+    - ruta_registro: Ruta de un archivo pings/muestras-*.bin
+    
+    Retorna:
+    - list: ResultadoPing en orden de inicio de cada serie
+    """
+    series = []
+    actuales = {}
+    with LectorRegistro(ruta_registro) as lector:
+        for id_objetivo, secuencia, timestamp_ns, rtt_ms, perdido in lector:
+            muestras = actuales.get(id_objetivo)
+            if muestras is None or secuencia <= len(muestras.secuencias):
+                ip = lector.objetivos.get(id_objetivo, str(id_objetivo))
+                muestras = ResultadoPing(ip, fecha=lector.fecha(timestamp_ns))
+                actuales[id_objetivo] = muestras
+                series.append(muestras)
+            fecha = lector.fecha(timestamp_ns)
+            muestras.agregar(None if perdido else float(rtt_ms), fecha.timestamp())
+    return series
+
+
+def exportar_registro_texto(ruta_registro):
+    """
+    Exporta un registro binario al formato de texto histórico de pings/,
+    un archivo por serie.
+    
+    Retorna:
+    - list: Rutas de los archivos creados
+    """
+    archivos = []
+    for muestras in leer_series_registro(ruta_registro):
+        nombre = _nombre_archivo_ping(muestras.ip, muestras.fecha)
+        # Varias series de la misma IP pueden empezar en el mismo segundo
+        muestras.archivo = nombre
+        copia = 1
+        while muestras.archivo in archivos:
+            copia += 1
+            muestras.archivo = nombre.replace('.txt', f'-{copia}.txt')
+        _escribir_archivo_ping(muestras)
+        archivos.append(muestras.archivo)
+    return archivos
+
+
+class MetricasPing:
+    """
+    Acumulador de métricas de una serie de pings en memoria constante:
+    promedio, jitter según PingPlotter y pérdida en una sola pasada.
+    """
+    
+    def __init__(self):
+        self.muestras = 0
+        self.suma = 0.0
+        self.suma_diferencias = 0.0
+        self.anterior = None
+        self.perdida = None
+        # Valores precalculados usados si el archivo no tiene muestras
+        self.latencia_alternativa = None
+        self.jitter_alternativo = None
+    
+    def agregar(self, latencia):
+        """Incorporar una latencia recibida (ms)"""
+        if self.anterior is not None:
+            # Jitter según PingPlotter: diferencia absoluta entre muestras consecutivas
+            self.suma_diferencias += abs(latencia - self.anterior)
+        self.anterior = latencia
+        self.suma += latencia
+        self.muestras += 1
+    
+    @property
+    def latencia(self):
+        """Latencia promedio en ms o None"""
+        if self.muestras == 0:
+            return self.latencia_alternativa
+        return self.suma / self.muestras
+    
+    @property
+    def jitter(self):
+        """Jitter en ms o None si hay menos de 2 muestras"""
+        if self.muestras == 0:
+            return self.jitter_alternativo
+        if self.muestras < 2:
+            return None
+        return self.suma_diferencias / (self.muestras - 1)
+    
+    @classmethod
+    def desde_muestras(cls, muestras):
+        """Métricas de un ResultadoPing"""
+        metricas = cls()
+        for latencia in muestras.latencias:
+            if latencia is not None:
+                metricas.agregar(latencia)
+        if muestras.enviados > 0:
+            metricas.perdida = muestras.porcentaje_perdida
+        return metricas
+
+
+def analizar_archivo_ping(archivo):
+    """
+    Lee un archivo de ping una sola vez con importador_ping (formato propio,
+    iputils, macOS o Windows en inglés/español) y calcula latencia promedio,
+    jitter (PingPlotter), porcentaje de pérdida y cantidad de muestras.
     
     Parámetros:
     - archivo: Ruta del archivo con resultados de ping
     
     Retorna:
-    - jitter: Jitter en ms o None si hay error
+    - MetricasPing o None si el archivo no se puede leer
     """
-    try:
-        with open(archivo, 'r', encoding='utf-8') as f:
-            contenido = f.read()
-
-        import re
-
-        # Buscar líneas con formato "Ping X: time=XX.XX ms"
-        patron = r'time=(\d+\.?\d*)\s*ms'
-        matches = re.findall(patron, contenido, re.IGNORECASE)
-
-        if not matches:
-            # Intentar extraer jitter pre-calculado si existiera
-            patron_alt = r'Jitter.*?:\s*(\d+\.?\d*)\s*ms'
-            match_alt = re.search(patron_alt, contenido, re.IGNORECASE)
-            if match_alt:
-                return float(match_alt.group(1))
+    with span('parseo'):
+        try:
+            importado = importar_archivo(archivo)
+        except (OSError, ValueError):
             return None
+    
+    metricas = MetricasPing()
+    metricas.muestras = importado.recibidos
+    metricas.suma = importado.suma
+    metricas.suma_diferencias = importado.suma_diferencias
+    metricas.anterior = importado.anterior
+    metricas.perdida = importado.perdida
+    metricas.latencia_alternativa = importado.latencia_resumen
+    metricas.jitter_alternativo = importado.jitter_resumen
+    return metricas
 
-        latencias = [float(m) for m in matches]
 
-        if len(latencias) < 2:
-            return None
+def _obtener_metricas(archivo):
+    """MetricasPing de una ruta de archivo o de un ResultadoPing"""
+    if isinstance(archivo, ResultadoPing):
+        return MetricasPing.desde_muestras(archivo)
+    return analizar_archivo_ping(archivo)
 
-        # Cálculo de jitter según PingPlotter:
-        # diferencia absoluta entre muestras consecutivas
-        diferencias = [
-            abs(latencias[i+1] - latencias[i])
-            for i in range(len(latencias) - 1)
-        ]
 
-        jitter = sum(diferencias) / len(diferencias)
-        return jitter
+def calcular_latencia_promedio(archivo):
+    """
+    Calcula la latencia promedio desde un archivo de ping.
+    
+    Parámetros:
+    - archivo: Ruta del archivo con resultados de ping o ResultadoPing
+    
+    Retorna:
+    - latencia_promedio: Latencia promedio en ms o None si hay error
+    """
+    metricas = _obtener_metricas(archivo)
+    return metricas.latencia if metricas else None
 
-    except FileNotFoundError:
-        return None
-    except Exception:
-        return None
 
+def calcular_jitter(archivo):
+    """
+    Calcula el jitter según el método de PingPlotter:
+    promedio de diferencias absolutas entre latencias consecutivas.
+    
+    Parámetros:
+    - archivo: Ruta del archivo con resultados de ping o ResultadoPing
+    
+    Retorna:
+    - jitter: Jitter en ms o None si hay error
+    """
+    metricas = _obtener_metricas(archivo)
+    return metricas.jitter if metricas else None
 
 
 def calcular_paquetes_perdidos(archivo):
@@ -184,36 +512,13 @@ def calcular_paquetes_perdidos(archivo):
     Calcula el porcentaje de paquetes perdidos desde un archivo de ping.
     
     Parámetros:
-    - archivo: Ruta del archivo con resultados de ping
+    - archivo: Ruta del archivo con resultados de ping o ResultadoPing
     
     Retorna:
     - porcentaje_perdida: Porcentaje de paquetes perdidos (0-100) o None si hay error
     """
-    try:
-        with open(archivo, 'r', encoding='utf-8') as f:
-            contenido = f.read()
-        
-        import re
-        # Formato propio: "enviados = X, recibidos = Y, perdidos = Z (W% perdidos)"
-        match = re.search(r'enviados\s*=\s*(\d+).*?recibidos\s*=\s*(\d+)', contenido, re.IGNORECASE)
-        if match:
-            enviados = int(match.group(1))
-            recibidos = int(match.group(2))
-            perdidos = enviados - recibidos
-            porcentaje = (perdidos / enviados) * 100 if enviados > 0 else 0
-            return porcentaje
-        
-        # Buscar porcentaje directo
-        match = re.search(r'(\d+\.?\d*)%\s+(perdidos|loss)', contenido, re.IGNORECASE)
-        if match:
-            return float(match.group(1))
-        
-        return None
-        
-    except FileNotFoundError:
-        return None
-    except Exception as e:
-        return None
+    metricas = _obtener_metricas(archivo)
+    return metricas.perdida if metricas else None
 
 
 def calcular_mos(latencia_promedio, jitter, perdida_paquetes):
@@ -270,6 +575,68 @@ def clasificar_mos(mos):
         return "Mala"
 
 
+# Umbrales de clasificar_mos, de mayor a menor
+_CATEGORIAS_MOS = ((4.3, "Excelente"), (4.0, "Buena"), (3.6, "Aceptable"), (3.1, "Pobre"))
+
+
+def calcular_mos_lote(latencias, jitters, perdidas):
+    """
+    Versión vectorizada de calcular_mos sobre arrays de mediciones.
+    Aplica las mismas operaciones en el mismo orden (incluido el quiebre de
+    160 ms y los límites de R y MOS), por lo que cada elemento es idéntico
+    bit a bit al resultado escalar. Requiere numpy.
+    
+    Parámetros:
+    - latencias: Array de latencias promedio en ms
+    - jitters: Array de jitter en ms
+    - perdidas: Array de porcentajes de pérdida (0-100)
+    
+    Retorna:
+    - tupla de arrays: (MOS, R-Factor, latencia_efectiva)
+    """
+    import numpy as np
+    
+    latencias = np.asarray(latencias, dtype=np.float64)
+    jitters = np.asarray(jitters, dtype=np.float64)
+    perdidas = np.asarray(perdidas, dtype=np.float64)
+    
+    latencia_efectiva = latencias + (jitters * 2) + 10
+    
+    R = np.where(latencia_efectiva < 160,
+                 93.2 - (latencia_efectiva / 40),
+                 93.2 - ((latencia_efectiva - 120) / 10))
+    
+    R = R - (perdidas * 2.5)
+    
+    # Limitar R entre 0 y 100
+    R = np.maximum(0, np.minimum(100, R))
+    
+    MOS = 1 + (0.035 * R) + (0.000007 * R * (R - 60) * (100 - R))
+    
+    # Limitar MOS entre 1 y 5
+    MOS = np.maximum(1.0, np.minimum(5.0, MOS))
+    
+    return MOS, R, latencia_efectiva
+
+
+def clasificar_mos_lote(mos):
+    """
+    Versión vectorizada de clasificar_mos. Requiere numpy.
+    
+    Parámetros:
+    - mos: Array de valores MOS (1-5)
+    
+    Retorna:
+    - Array de strings con la clasificación de cada valor
+    """
+    import numpy as np
+    
+    mos = np.asarray(mos, dtype=np.float64)
+    condiciones = [mos >= umbral for umbral, _calidad in _CATEGORIAS_MOS]
+    calidades = [calidad for _umbral, calidad in _CATEGORIAS_MOS]
+    return np.select(condiciones, calidades, default="Mala")
+
+
 def analizar_ip(ip, cantidad_pings):
     """
     Realiza análisis completo de una IP: ping y cálculo de métricas.
@@ -283,63 +650,239 @@ def analizar_ip(ip, cantidad_pings):
     """
     try:
         # Realizar ping
-        archivo = hacer_ping(ip, cantidad_pings)
-        if not archivo:
+        muestras = hacer_ping(ip, cantidad_pings)
+        return _analizar_muestras(ip, muestras)
+    except Exception as e:
+        return {'error': True, 'mensaje': f'Error inesperado: {str(e)}'}
+
+
+def _analizar_muestras(ip, muestras):
+    """Calcula métricas y MOS a partir de las muestras retornadas por hacer_ping"""
+    try:
+        if not muestras:
             return {'error': True, 'mensaje': 'Conexión inestable o sin respuesta (>50% pérdida)'}
         
         # Calcular métricas
-        latencia = calcular_latencia_promedio(archivo)
-        jitter = calcular_jitter(archivo)
-        perdida = calcular_paquetes_perdidos(archivo)
-        
-        # Verificar que tenemos todos los datos
-        if latencia is None:
-            return {'error': True, 'mensaje': 'No se pudo calcular la latencia'}
-        if jitter is None:
-            return {'error': True, 'mensaje': 'No se pudo calcular el jitter'}
-        if perdida is None:
-            return {'error': True, 'mensaje': 'No se pudo calcular la pérdida de paquetes'}
+        with span('analisis'):
+            metricas = MetricasPing.desde_muestras(muestras)
+            resultado = evaluar_metricas(ip, metricas.latencia, metricas.jitter, metricas.perdida)
+        if not resultado['error']:
+            resultado['archivo'] = muestras.archivo
+            resultado['registro'] = muestras.registro.ruta if muestras.registro else None
+            resultado['timestamp'] = muestras.fecha.timestamp()
+            resultado['ttl_respuesta'] = muestras.ttl_respuesta
+        return resultado
+    except Exception as e:
+        return {'error': True, 'mensaje': f'Error inesperado: {str(e)}'}
+
+
+def evaluar_metricas(ip, latencia, jitter, perdida):
+    """
+    Valida latencia, jitter y pérdida ya calculados y obtiene MOS y calidad.
+    
+    Parámetros:
+    - ip: Dirección IP medida
+    - latencia: Latencia promedio en ms (o None)
+    - jitter: Jitter en ms (o None)
+    - perdida: Porcentaje de pérdida de paquetes (o None)
+    
+    Retorna:
+    - dict con resultados (mismo formato que analizar_ip) o dict con error
+    """
+    # Verificar que tenemos todos los datos
+    if latencia is None:
+        return {'error': True, 'mensaje': 'No se pudo calcular la latencia'}
+    if jitter is None:
+        return {'error': True, 'mensaje': 'No se pudo calcular el jitter'}
+    if perdida is None:
+        return {'error': True, 'mensaje': 'No se pudo calcular la pérdida de paquetes'}
+    
+    # Verificar que la pérdida no sea excesiva (backup check)
+    if perdida > 50:
+        return {'error': True, 'mensaje': f'Pérdida de paquetes excesiva ({perdida:.1f}%)'}
+    
+    # Calcular MOS
+    mos, r_factor, lat_efectiva = calcular_mos(latencia, jitter, perdida)
+    calidad = clasificar_mos(mos)
+    
+    return {
+        'ip': ip,
+        'latencia': latencia,
+        'jitter': jitter,
+        'perdida': perdida,
+        'mos': mos,
+        'r_factor': r_factor,
+        'latencia_efectiva': lat_efectiva,
+        'calidad': calidad,
+        'error': False
+    }
+
+
+def _resultado_objetivo(objetivo, resultado):
+    """Asociar el nombre (y grupo y etiquetas si tiene) del objetivo al resultado o normalizar el error"""
+    if not resultado or resultado.get('error'):
+        mensaje_error = resultado.get('mensaje', 'Error desconocido') if resultado else 'Sin respuesta'
+        resultado = {
+            'ip': objetivo['ip'],
+            'error': True,
+            'mensaje': mensaje_error
+        }
+    resultado['nombre'] = objetivo['nombre']
+    if objetivo.get('grupo'):
+        resultado['grupo'] = objetivo['grupo']
+    if objetivo.get('etiquetas'):
+        resultado['etiquetas'] = list(objetivo['etiquetas'])
+    return resultado
+
+
+def analizar_ips(objetivos, cantidad_pings, max_concurrencia=MAX_CONCURRENCIA, al_progreso=None,
+                pps_max=PPS_MAX):
+    """
+    Analiza varias IPs en paralelo.
+    Si el motor ICMP está disponible, todos los objetivos se sondean a la vez
+    desde un solo socket, repartidos por el planificador (hacer_ping_lote); si no, se usa un pool de hilos
+    acotado por max_concurrencia con ping3 (también para los objetivos que
+    quedaron sin resultado si el lote con el motor falla). En ambos casos un
+    barrido completo dura aproximadamente lo mismo que el objetivo más lento
+    y al_progreso se llama a medida que termina cada objetivo.
+    
+    Parámetros:
+    - objetivos: Lista de dicts con claves 'ip' y 'nombre' (formato de config.json)
+    - cantidad_pings: Cantidad de pings a realizar por objetivo
+    - max_concurrencia: Máximo de objetivos analizados a la vez con ping3 (default: 32)
+    - al_progreso: Callback opcional llamado al terminar cada objetivo con
+                   (objetivo, resultado, completados, total)
+    - pps_max: Paquetes por segundo máximos con el motor ICMP (default: 1000)
+    
+    Retorna:
+    - list: Resultados en el mismo orden que objetivos. Los errores se devuelven
+            como dict con 'ip', 'nombre', 'error' y 'mensaje'
+    """
+    total = len(objetivos)
+    resultados = [None] * total
+    if total == 0:
+        return resultados
+    
+    completados = 0
+    
+    motor = obtener_motor()
+    if motor is not None:
+        indices = {}
+        for indice, objetivo in enumerate(objetivos):
+            indices.setdefault(objetivo['ip'], []).append(indice)
         
-        # Verificar que la pérdida no sea excesiva (backup check)
-        if perdida > 50:
-            return {'error': True, 'mensaje': f'Pérdida de paquetes excesiva ({perdida:.1f}%)'}
+        def al_terminar(ip, muestras):
+            # Informar cada objetivo apenas termina su serie, no al final del lote
+            nonlocal completados
+            for indice in indices[ip]:
+                resultado = _analizar_muestras(ip, muestras)
+                resultados[indice] = _resultado_objetivo(objetivos[indice], resultado)
+                completados += 1
+                if al_progreso:
+                    al_progreso(objetivos[indice], resultados[indice], completados, total)
         
-        # Calcular MOS
-        mos, r_factor, lat_efectiva = calcular_mos(latencia, jitter, perdida)
-        calidad = clasificar_mos(mos)
+        try:
+            hacer_ping_lote(list(indices), cantidad_pings, motor=motor, pps_max=pps_max,
+                            al_terminar=al_terminar)
+            return resultados
+        except Exception:
+            # Los objetivos que quedaron sin resultado se sondean con ping3
+            log.exception("Falló el sondeo con el motor ICMP, se usa ping3 para %d objetivos",
+                          total - completados)
+    
+    def analizar_objetivo(objetivo):
+        return _resultado_objetivo(objetivo, analizar_ip(objetivo['ip'], cantidad_pings))
+    
+    max_hilos = max(1, min(int(max_concurrencia), total))
+    with ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix='mos-sondeo') as executor:
+        futuros = {executor.submit(analizar_objetivo, objetivo): indice
+                   for indice, objetivo in enumerate(objetivos) if resultados[indice] is None}
         
+        for futuro in as_completed(futuros):
+            indice = futuros[futuro]
+            resultado = futuro.result()
+            resultados[indice] = resultado
+            completados += 1
+            if al_progreso:
+                al_progreso(objetivos[indice], resultado, completados, total)
+    
+    return resultados
+
+
+def _salto(ttl, ip_respuesta, latencia_ms, consultas_dns):
+    """
+    Dict de un salto del traceroute ('*' si no hubo respuesta).
+    El hostname se resuelve en segundo plano con la caché de DNS inverso y se
+    completa en el mismo dict cuando la consulta termina.
+    """
+    if ip_respuesta is None:
+        # Sin respuesta (timeout)
         return {
-            'ip': ip,
-            'latencia': latencia,
-            'jitter': jitter,
-            'perdida': perdida,
-            'mos': mos,
-            'r_factor': r_factor,
-            'latencia_efectiva': lat_efectiva,
-            'calidad': calidad,
-            'archivo': archivo,
-            'error': False
+            'hop': ttl,
+            'ip': '*',
+            'latency_ms': None,
+            'hostname': None
         }
-    except Exception as e:
-        return {'error': True, 'mensaje': f'Error inesperado: {str(e)}'}
+    
+    salto = {
+        'hop': ttl,
+        'ip': ip_respuesta,
+        'latency_ms': round(latencia_ms, 2),
+        'hostname': None
+    }
+    
+    # Intentar resolver hostname sin bloquear la sonda
+    def asignar_hostname(hostname):
+        salto['hostname'] = hostname
+    
+    consultas_dns.append((salto, obtener_cache_dns().resolver(ip_respuesta, asignar_hostname)))
+    return salto
 
 
-def obtener_traceroute(host, max_hops=30, timeout=2):
+def _esperar_dns(consultas_dns, espera_dns):
+    """Esperar las consultas de DNS pendientes como máximo espera_dns segundos"""
+    if not consultas_dns or not espera_dns:
+        return
+    wait([futuro for _salto, futuro in consultas_dns], timeout=espera_dns)
+    for salto, futuro in consultas_dns:
+        if futuro.done():
+            salto['hostname'] = futuro.result()
+
+
+def obtener_traceroute(host, max_hops=30, timeout=2, paralelo=True, ventana=None, espera_dns=2.0):
     """
     Realiza un traceroute a un host específico usando scapy.
+    En modo paralelo envía las sondas de todos los TTL a la vez (o de a
+    'ventana' TTL) y asocia cada respuesta ICMP a su TTL, por lo que tarda
+    aproximadamente un RTT más el timeout en lugar de un timeout por salto.
 
     Parámetros:
     - host: Dirección IP o hostname del destino
     - max_hops: Número máximo de saltos (default: 30)
-    - timeout: Timeout en segundos para cada salto (default: 2)
+    - timeout: Timeout en segundos para cada salto, o para cada ventana en modo paralelo (default: 2)
+    - paralelo: Enviar todos los TTL sin esperar cada respuesta (default: True)
+    - ventana: TTL enviados a la vez en modo paralelo (default: None = todos)
+    - espera_dns: Segundos máximos a esperar, al final, los hostnames pendientes;
+                  los que lleguen después se completan en los dicts (default: 2.0)
+
+    Si el motor de sondeo instalado tiene su propio traceroute (por ejemplo
+    la red simulada) se usa ese en lugar de scapy.
 
     Retorna:
     - list: Lista de diccionarios con información de cada salto
             Cada dict contiene: hop (número), ip, latency_ms, hostname
     """
+    with span('traceroute'):
+        return _obtener_traceroute(host, max_hops, timeout, paralelo, ventana, espera_dns)
+
+
+def _obtener_traceroute(host, max_hops, timeout, paralelo, ventana, espera_dns):
     try:
+        motor = obtener_motor()
+        if motor is not None and hasattr(motor, 'traceroute'):
+            return motor.traceroute(host, max_hops=max_hops, timeout=timeout)
+
         from scapy.all import IP, ICMP, sr1, conf
-        import socket
         import logging
         import warnings
 
@@ -349,6 +892,12 @@ def obtener_traceroute(host, max_hops=30, timeout=2):
         logging.getLogger("scapy").setLevel(logging.ERROR)
         warnings.filterwarnings("ignore", category=Warning)
 
+        consultas_dns = []
+        if paralelo:
+            resultado = _traceroute_paralelo(host, max_hops, timeout, ventana, consultas_dns)
+            _esperar_dns(consultas_dns, espera_dns)
+            return resultado
+
         resultado = []
         destino_alcanzado = False
 
@@ -362,40 +911,63 @@ def obtener_traceroute(host, max_hops=30, timeout=2):
             fin = time.time()
 
             if respuesta is None:
-                # Sin respuesta (timeout)
-                resultado.append({
-                    'hop': ttl,
-                    'ip': '*',
-                    'latency_ms': None,
-                    'hostname': None
-                })
+                resultado.append(_salto(ttl, None, None, consultas_dns))
             else:
                 # Calcular latencia
                 latencia_ms = (fin - inicio) * 1000
                 ip_respuesta = respuesta.src
-
-                # Intentar resolver hostname
-                hostname = None
-                try:
-                    hostname = socket.gethostbyaddr(ip_respuesta)[0]
-                except:
-                    pass
-
-                resultado.append({
-                    'hop': ttl,
-                    'ip': ip_respuesta,
-                    'latency_ms': round(latencia_ms, 2),
-                    'hostname': hostname
-                })
+                resultado.append(_salto(ttl, ip_respuesta, latencia_ms, consultas_dns))
 
                 # Verificar si llegamos al destino
                 if ip_respuesta == host or respuesta.type == 0:
                     destino_alcanzado = True
                     break
 
+        _esperar_dns(consultas_dns, espera_dns)
         return resultado
 
     except Exception as e:
         # Retornar lista vacía con información de error
         print(f"Error en traceroute: {str(e)}")
-        return []
\ No newline at end of file
+        return []
+
+
+def _traceroute_paralelo(host, max_hops, timeout, ventana, consultas_dns):
+    """
+    Traceroute con todas las sondas en vuelo a la vez. Cada TTL usa su propio
+    número de secuencia ICMP, que vuelve citado dentro del time-exceeded, y
+    scapy empareja cada respuesta con la sonda que la originó.
+    """
+    from scapy.all import IP, ICMP, sr
+    import socket
+    
+    destino = socket.gethostbyname(host)
+    identificador = os.getpid() & 0xFFFF
+    ventana = ventana or max_hops
+    
+    respuestas = {}
+    ttl_destino = None
+    for primero in range(1, max_hops + 1, ventana):
+        ultimo = min(primero + ventana - 1, max_hops)
+        sondas = [IP(dst=destino, ttl=ttl) / ICMP(id=identificador, seq=ttl)
+                  for ttl in range(primero, ultimo + 1)]
+        
+        contestadas, _sin_respuesta = sr(sondas, verbose=0, timeout=timeout)
+        for enviada, recibida in contestadas:
+            ttl = enviada[IP].ttl
+            latencia_ms = (recibida.time - enviada.sent_time) * 1000
+            respuestas[ttl] = (recibida.src, latencia_ms)
+            if recibida.src == destino or recibida[ICMP].type == 0:
+                if ttl_destino is None or ttl < ttl_destino:
+                    ttl_destino = ttl
+        
+        # No seguir con más ventanas si ya llegamos al destino
+        if ttl_destino is not None:
+            break
+    
+    ultimo_salto = ttl_destino if ttl_destino is not None else max_hops
+    resultado = []
+    for ttl in range(1, ultimo_salto + 1):
+        ip_respuesta, latencia_ms = respuestas.get(ttl, (None, None))
+        resultado.append(_salto(ttl, ip_respuesta, latencia_ms, consultas_dns))
+    return resultado
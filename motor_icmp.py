@@ -0,0 +1,311 @@
+"""
+motor_icmp.py
+Motor ICMP multiplexado: un único socket para miles de pings simultáneos
+"""
+
+import os
+import sys
+import socket
+import struct
+import select
+import threading
+import time
+import heapq
+import ipaddress
+
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+
+# IP_RECVTTL no está expuesto por el módulo socket en todas las versiones
+IP_RECVTTL = getattr(socket, 'IP_RECVTTL', 12 if sys.platform.startswith('linux') else None)
+
+_ENCABEZADO_ICMP = struct.Struct('!BBHHH')
+
+# Segundos que SondeoICMP.esperar() tolera más allá del límite del sondeo
+MARGEN_ESPERA = 1.0
+
+
+def _checksum(datos):
+    """Checksum de Internet (RFC 1071)"""
+    if len(datos) % 2:
+        datos += b'\x00'
+    suma = sum(struct.unpack(f'!{len(datos) // 2}H', datos))
+    suma = (suma >> 16) + (suma & 0xFFFF)
+    suma += suma >> 16
+    return ~suma & 0xFFFF
+
+
+def _resolver(host):
+    """Convertir hostname a IPv4 (las IPs se devuelven sin consultar DNS)"""
+    try:
+        ipaddress.IPv4Address(host)
+        return host
+    except ValueError:
+        return socket.gethostbyname(host)
+
+
+class SondeoICMP:
+    """Un echo request en vuelo. rtt queda en segundos o None si se perdió."""
+
+    __slots__ = ('ip', 'secuencia', 'enviado', 'limite', 'rtt', 'ttl', 'evento', 'callback')
+
+    def __init__(self, ip, secuencia, limite, callback):
+        self.ip = ip
+        self.secuencia = secuencia
+        self.enviado = None
+        self.limite = limite
+        self.rtt = None
+        self.ttl = None
+        self.evento = threading.Event()
+        self.callback = callback
+
+    def esperar(self, timeout=None):
+        """
+        Bloquear hasta respuesta o timeout y retornar el RTT en segundos.
+
+        Parámetros:
+        - timeout: Segundos máximos de espera (default: hasta el límite del
+                   sondeo más un margen, por si el hilo receptor se detuvo)
+
+        Retorna:
+        - RTT en segundos o None si se perdió o no se resolvió a tiempo
+        """
+        if timeout is None:
+            timeout = max(0.0, self.limite - time.monotonic()) + MARGEN_ESPERA
+        self.evento.wait(timeout)
+        return self.rtt
+
+
+class MotorICMP:
+    """
+    Envía echo requests a cualquier cantidad de destinos desde un solo socket.
+    Las respuestas se asocian por identificador y número de secuencia, y un
+    único hilo receptor resuelve los sondeos y sus timeouts.
+
+    Usa un socket raw si hay privilegios; si no, un socket ICMP de datagrama
+    (Linux con net.ipv4.ping_group_range, macOS). En modo datagrama el kernel
+    reescribe el identificador, por lo que se asocia por IP origen y secuencia.
+    """
+
+    def __init__(self, tamano=56):
+        self.tamano = tamano
+        self.raw = True
+        try:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+        except PermissionError:
+            self.raw = False
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+            if IP_RECVTTL is not None:
+                try:
+                    self.sock.setsockopt(socket.IPPROTO_IP, IP_RECVTTL, 1)
+                except OSError:
+                    pass
+        self.sock.setblocking(False)
+
+        self.identificador = os.getpid() & 0xFFFF
+        self._secuencia = 0
+        self._pendientes = {}
+        self._vencimientos = []
+        self._ttl_respuestas = {}
+        self._lock = threading.Lock()
+        self._activo = True
+        self._hilo = threading.Thread(target=self._recibir, name='motor-icmp', daemon=True)
+        self._hilo.start()
+
+    def enviar(self, host, timeout=1.0, callback=None):
+        """
+        Enviar un echo request sin bloquear.
+
+        Parámetros:
+        - host: IP o hostname de destino
+        - timeout: Segundos a esperar la respuesta (default: 1.0)
+        - callback: Función opcional llamada con el SondeoICMP al resolverse
+                    (se ejecuta en el hilo receptor, debe ser rápida)
+
+        Retorna:
+        - SondeoICMP
+        """
+        ip = _resolver(host)
+        with self._lock:
+            # Buscar una secuencia libre para este destino
+            for _ in range(0x10000):
+                self._secuencia = (self._secuencia + 1) & 0xFFFF
+                if (ip, self._secuencia) not in self._pendientes:
+                    break
+            secuencia = self._secuencia
+            sondeo = SondeoICMP(ip, secuencia, time.monotonic() + timeout, callback)
+            self._pendientes[(ip, secuencia)] = sondeo
+            heapq.heappush(self._vencimientos, (sondeo.limite, secuencia, ip))
+
+        carga = b'\x00' * self.tamano
+        encabezado = _ENCABEZADO_ICMP.pack(ICMP_ECHO_REQUEST, 0, 0, self.identificador, secuencia)
+        paquete = _ENCABEZADO_ICMP.pack(ICMP_ECHO_REQUEST, 0, _checksum(encabezado + carga),
+                                        self.identificador, secuencia) + carga
+        try:
+            sondeo.enviado = time.perf_counter()
+            self.sock.sendto(paquete, (ip, 0))
+        except OSError:
+            self._resolver_sondeo(ip, secuencia, None, None)
+        return sondeo
+
+    def ping(self, host, timeout=1.0):
+        """
+        Ping bloqueante con el mismo contrato que ping3.ping.
+
+        Retorna:
+        - RTT en segundos o None si no hubo respuesta
+        """
+        return self.enviar(host, timeout).esperar()
+
+    def ping_lote(self, hosts, timeout=1.0):
+        """
+        Enviar un echo request a cada host a la vez y esperar todas las respuestas.
+
+        Retorna:
+        - dict: host -> RTT en segundos o None
+        """
+        sondeos = {}
+        for host in hosts:
+            try:
+                sondeos[host] = self.enviar(host, timeout)
+            except OSError:
+                sondeos[host] = None
+        return {host: (sondeo.esperar() if sondeo else None) for host, sondeo in sondeos.items()}
+
+    def ttl_respuesta(self, host):
+        """TTL de la última respuesta recibida de una IP (None si no hubo o no se conoce)"""
+        return self._ttl_respuestas.get(host)
+
+    def cerrar(self):
+        """Detener el hilo receptor, dar por perdidos los sondeos en vuelo y cerrar el socket"""
+        self._activo = False
+        self._hilo.join(timeout=1)
+        self.sock.close()
+        with self._lock:
+            pendientes = list(self._pendientes)
+            self._vencimientos.clear()
+        for ip, secuencia in pendientes:
+            self._resolver_sondeo(ip, secuencia, None, None)
+
+    def _resolver_sondeo(self, ip, secuencia, rtt, ttl):
+        with self._lock:
+            sondeo = self._pendientes.pop((ip, secuencia), None)
+        if sondeo is None:
+            return
+        sondeo.rtt = rtt
+        sondeo.ttl = ttl
+        if ttl is not None:
+            self._ttl_respuestas[ip] = ttl
+        sondeo.evento.set()
+        if sondeo.callback:
+            try:
+                sondeo.callback(sondeo)
+            except Exception:
+                pass
+
+    def _procesar(self, datos, origen, ttl, recibido):
+        if self.raw:
+            ihl = (datos[0] & 0x0F) * 4
+            ttl = datos[8]
+            datos = datos[ihl:]
+        if len(datos) < 8:
+            return
+        tipo, _codigo, _check, identificador, secuencia = _ENCABEZADO_ICMP.unpack_from(datos)
+        if tipo != ICMP_ECHO_REPLY:
+            return
+        # En modo raw llegan las respuestas de todos los procesos
+        if self.raw and identificador != self.identificador:
+            return
+        sondeo = self._pendientes.get((origen, secuencia))
+        if sondeo is None or sondeo.enviado is None:
+            return
+        self._resolver_sondeo(origen, secuencia, recibido - sondeo.enviado, ttl)
+
+    def _expirar(self):
+        ahora = time.monotonic()
+        vencidos = []
+        with self._lock:
+            while self._vencimientos and self._vencimientos[0][0] <= ahora:
+                _limite, secuencia, ip = heapq.heappop(self._vencimientos)
+                sondeo = self._pendientes.get((ip, secuencia))
+                if sondeo is not None and sondeo.limite <= ahora:
+                    vencidos.append((ip, secuencia))
+        for ip, secuencia in vencidos:
+            self._resolver_sondeo(ip, secuencia, None, None)
+
+    def _recibir(self):
+        while self._activo:
+            with self._lock:
+                proximo = self._vencimientos[0][0] if self._vencimientos else None
+            espera = 0.05 if proximo is None else min(0.05, max(0.0, proximo - time.monotonic()))
+            try:
+                listos, _, _ = select.select([self.sock], [], [], espera)
+            except (OSError, ValueError):
+                break
+
+            # Vaciar todo lo disponible antes de volver a select
+            while listos:
+                try:
+                    if self.raw:
+                        datos, direccion = self.sock.recvfrom(65535)
+                        ttl = None
+                    else:
+                        datos, ancillary, _flags, direccion = self.sock.recvmsg(65535, socket.CMSG_SPACE(4))
+                        ttl = None
+                        for nivel, tipo, valor in ancillary:
+                            if nivel == socket.IPPROTO_IP and tipo == socket.IP_TTL and len(valor) >= 4:
+                                ttl = struct.unpack('i', valor[:4])[0]
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError:
+                    break
+                recibido = time.perf_counter()
+                try:
+                    self._procesar(datos, direccion[0], ttl, recibido)
+                except (struct.error, IndexError):
+                    pass
+
+            self._expirar()
+
+
+_motor = None
+_motor_lock = threading.Lock()
+_motor_disponible = True
+
+
+def establecer_motor(motor):
+    """
+    Reemplazar el motor de sondeo compartido del proceso (por ejemplo por
+    red_simulada.MotorSimulado). None vuelve a la detección automática.
+
+    Cualquier objeto sirve como motor si implementa la interfaz de MotorICMP:
+    enviar(host, timeout, callback) -> sondeo con rtt/ttl/esperar(),
+    ping(host, timeout), ping_lote(hosts, timeout), ttl_respuesta(host) y
+    cerrar(). Si además tiene traceroute(host, max_hops, timeout),
+    obtener_traceroute lo usa en lugar de scapy.
+    """
+    global _motor, _motor_disponible
+    with _motor_lock:
+        _motor = motor
+        _motor_disponible = True
+
+
+def obtener_motor():
+    """
+    Retornar el motor ICMP compartido del proceso, creándolo la primera vez.
+
+    Retorna:
+    - MotorICMP (o el motor instalado con establecer_motor) o None si el
+      sistema no permite abrir un socket ICMP
+    """
+    global _motor, _motor_disponible
+    if _motor is not None or not _motor_disponible:
+        return _motor
+    with _motor_lock:
+        if _motor is None and _motor_disponible:
+            try:
+                _motor = MotorICMP()
+            except (OSError, AttributeError):
+                _motor_disponible = False
+    return _motor
@@ -0,0 +1,257 @@
+"""
+planificador.py
+Planificador central de sondeos: reparte los pings de cada objetivo a lo
+largo de su intervalo y respeta un presupuesto global de paquetes por segundo
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from motor_icmp import obtener_motor
+from instrumentacion import contar, registrar
+
+
+# Presupuesto global por defecto (paquetes por segundo)
+PPS_MAX = 1000
+
+# Fracción de la razón áurea: desfases sucesivos bien repartidos en [0, 1)
+_RAZON_AUREA = 0.6180339887498949
+
+
+class _Objetivo:
+    __slots__ = ('clave', 'ip', 'intervalo', 'cantidad', 'al_resultado', 'al_terminar',
+                 'proximo', 'enviados', 'pendientes', 'generacion')
+
+    def __init__(self, clave, ip, intervalo, cantidad, al_resultado, al_terminar, proximo, generacion):
+        self.clave = clave
+        self.ip = ip
+        self.intervalo = intervalo
+        self.cantidad = cantidad
+        self.al_resultado = al_resultado
+        self.al_terminar = al_terminar
+        self.proximo = proximo
+        self.enviados = 0
+        self.pendientes = 0
+        self.generacion = generacion
+
+
+class PlanificadorSondeos:
+    """
+    Agenda los pings de miles de objetivos en un heap ordenado por próximo
+    envío (O(log n) por sondeo). Cada objetivo nuevo recibe un desfase dentro
+    de su intervalo según la secuencia de la razón áurea, de modo que los
+    envíos quedan repartidos de forma pareja en lugar de coincidir en el mismo
+    segundo, y un token bucket limita el total de paquetes por segundo.
+
+    Los resultados se entregan con al_resultado(ip, indice, rtt, timestamp,
+    timestamp_ns), donde rtt está en segundos (None si se perdió), timestamp
+    es la hora de envío y timestamp_ns el instante monotónico de envío. El
+    callback corre en el hilo receptor del motor ICMP y debe ser rápido.
+    """
+
+    def __init__(self, pps_max=PPS_MAX, timeout=1.0, motor=None, max_hilos=32):
+        """
+        Parámetros:
+        - pps_max: Paquetes por segundo máximos para todos los objetivos (default: 1000)
+        - timeout: Segundos de espera por respuesta (default: 1.0)
+        - motor: MotorICMP a usar (default: el motor compartido; si no hay, ping3 en hilos)
+        - max_hilos: Hilos para ping3 cuando no hay motor ICMP (default: 32)
+        """
+        self.pps_max = pps_max
+        self.timeout = timeout
+        self.motor = motor or obtener_motor()
+        self._max_hilos = max_hilos
+        self._executor = None
+        self._heap = []
+        self._objetivos = {}
+        self._contador = itertools.count()
+        self._desfases = itertools.count(1)
+        self._generaciones = itertools.count()
+        self._cond = threading.Condition()
+        self._tokens = 1.0
+        self._ultimo_relleno = time.monotonic()
+        self._activo = False
+        self._hilo = None
+        self.enviados = 0
+        self.omitidos = 0
+
+    def agregar_objetivo(self, ip, al_resultado, intervalo=1.0, cantidad=None,
+                         al_terminar=None, clave=None):
+        """
+        Programar los pings de un objetivo.
+
+        Parámetros:
+        - ip: Dirección IP a sondear
+        - al_resultado: Callback por cada sondeo (ver docstring de la clase)
+        - intervalo: Segundos entre pings de este objetivo (default: 1.0)
+        - cantidad: Pings a enviar antes de retirar el objetivo (default: None = sin fin)
+        - al_terminar: Callback opcional con la clave cuando se resolvió el último ping
+        - clave: Identificador del objetivo si una IP se agrega más de una vez (default: ip)
+
+        Lanza ValueError si cantidad no es positiva
+        """
+        if cantidad is not None and cantidad <= 0:
+            raise ValueError(f"cantidad debe ser positiva ({cantidad})")
+        clave = ip if clave is None else clave
+        desfase = (next(self._desfases) * _RAZON_AUREA) % 1.0
+        with self._cond:
+            generacion = next(self._generaciones)
+            objetivo = _Objetivo(clave, ip, intervalo, cantidad, al_resultado, al_terminar,
+                                 time.monotonic() + desfase * intervalo, generacion)
+            self._objetivos[clave] = objetivo
+            heapq.heappush(self._heap, (objetivo.proximo, next(self._contador), clave, generacion))
+            self._cond.notify()
+
+    def quitar_objetivo(self, clave):
+        """Cancelar los próximos pings de un objetivo (los que están en vuelo se entregan igual)"""
+        with self._cond:
+            # Las entradas del heap se descartan al salir por no coincidir la generación
+            return self._objetivos.pop(clave, None) is not None
+
+    def objetivos(self):
+        with self._cond:
+            return list(self._objetivos)
+
+    def __len__(self):
+        return len(self._objetivos)
+
+    def iniciar(self):
+        """Iniciar el hilo planificador"""
+        with self._cond:
+            if self._activo:
+                return self
+            self._activo = True
+        self._hilo = threading.Thread(target=self._ejecutar, name='planificador-sondeos', daemon=True)
+        self._hilo.start()
+        return self
+
+    def en_ejecucion(self):
+        """True mientras el hilo planificador esté vivo"""
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def detener(self):
+        with self._cond:
+            self._activo = False
+            self._cond.notify_all()
+        if self._hilo is not None:
+            self._hilo.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def esperar(self, timeout=None):
+        """
+        Bloquear hasta que todos los objetivos con cantidad limitada terminen.
+
+        Retorna:
+        - True si terminaron, False si venció el timeout
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while any(objetivo.cantidad is not None for objetivo in self._objetivos.values()):
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    return False
+                self._cond.wait(restante)
+        return True
+
+    def _consumir_token(self):
+        """Esperar hasta que el presupuesto global permita enviar un paquete"""
+        while True:
+            ahora = time.monotonic()
+            # Ráfaga máxima: lo que se puede enviar en 10 ms (mínimo 1 paquete)
+            capacidad = max(1.0, self.pps_max / 100)
+            self._tokens = min(capacidad, self._tokens + (ahora - self._ultimo_relleno) * self.pps_max)
+            self._ultimo_relleno = ahora
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return
+            time.sleep((1.0 - self._tokens) / self.pps_max)
+
+    def _ejecutar(self):
+        while True:
+            with self._cond:
+                if not self._activo:
+                    return
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                proximo, _n, clave, generacion = self._heap[0]
+                espera = proximo - time.monotonic()
+                if espera > 0:
+                    self._cond.wait(espera)
+                    continue
+                heapq.heappop(self._heap)
+                objetivo = self._objetivos.get(clave)
+                if objetivo is None or objetivo.generacion != generacion:
+                    continue
+
+                indice = objetivo.enviados
+                objetivo.enviados += 1
+                objetivo.pendientes += 1
+                if objetivo.cantidad is None or objetivo.enviados < objetivo.cantidad:
+                    objetivo.proximo += objetivo.intervalo
+                    ahora = time.monotonic()
+                    if objetivo.proximo < ahora - objetivo.intervalo:
+                        # Atrasado más de un intervalo: no recuperar en ráfaga
+                        self.omitidos += 1
+                        objetivo.proximo = ahora
+                    heapq.heappush(self._heap, (objetivo.proximo, next(self._contador), clave, generacion))
+
+            self._consumir_token()
+            self._enviar(objetivo, indice)
+
+    def _enviar(self, objetivo, indice):
+        timestamp = time.time()
+        timestamp_ns = time.monotonic_ns()
+        self.enviados += 1
+        contar('sondeos')
+
+        def resolver(rtt):
+            if rtt is not None:
+                # Duración del sondeo en vuelo (no ocupa ningún hilo)
+                registrar('ping', time.perf_counter_ns() - int(rtt * 1e9), int(rtt * 1e9))
+            try:
+                objetivo.al_resultado(objetivo.ip, indice, rtt, timestamp, timestamp_ns)
+            except Exception:
+                pass
+            self._finalizar_sondeo(objetivo)
+
+        if self.motor is not None:
+            try:
+                self.motor.enviar(objetivo.ip, self.timeout, callback=lambda sondeo: resolver(sondeo.rtt))
+            except OSError:
+                resolver(None)
+            return
+
+        # Sin motor ICMP: ping3 bloqueante en un pool de hilos
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_hilos, thread_name_prefix='ping3')
+
+        def ping3_bloqueante():
+            import ping3
+            try:
+                rtt = ping3.ping(objetivo.ip, timeout=self.timeout)
+            except Exception:
+                rtt = None
+            resolver(rtt if rtt else None)
+
+        self._executor.submit(ping3_bloqueante)
+
+    def _finalizar_sondeo(self, objetivo):
+        terminado = False
+        with self._cond:
+            objetivo.pendientes -= 1
+            if (objetivo.cantidad is not None and objetivo.enviados >= objetivo.cantidad
+                    and objetivo.pendientes == 0):
+                if self._objetivos.get(objetivo.clave) is objetivo:
+                    del self._objetivos[objetivo.clave]
+                terminado = True
+                self._cond.notify_all()
+        if terminado and objetivo.al_terminar:
+            try:
+                objetivo.al_terminar(objetivo.clave)
+            except Exception:
+                pass
@@ -0,0 +1,325 @@
+"""
+reanalizar.py
+Recalcula latencia, jitter, pérdida y MOS de un directorio de logs de ping
+en paralelo, escribiendo los resultados en CSV o JSONL
+
+Uso:
+    python reanalizar.py pings/ --salida resultados.csv
+    python reanalizar.py /ruta/logs --salida resultados.jsonl --procesos 8
+
+El checkpoint guarda una línea por archivo terminado. Para los registros
+binarios, que pueden seguir creciendo, guarda además los registros leídos y
+dónde empieza la serie más vieja que seguía abierta: al reanudar solo se
+leen los registros desde ahí, y las series que seguían abiertas se vuelven a
+emitir completas.
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from mos_functions import analizar_archivo_ping, evaluar_metricas, MetricasPing, ResultadoPing
+from registro_muestras import LectorRegistro
+
+
+COLUMNAS = ['archivo', 'ip', 'fecha', 'muestras', 'latencia', 'jitter', 'perdida',
+            'mos', 'r_factor', 'latencia_efectiva', 'calidad', 'error', 'mensaje']
+
+EXTENSIONES = ('.txt', '.bin')
+
+# Nombre generado por hacer_ping: ping-{ip}-{AAAAMMDD-HHMMSS}.txt
+PATRON_NOMBRE = re.compile(r'^ping-(.+)-(\d{8}-\d{6})\.txt$')
+
+
+def recorrer_archivos(directorio):
+    """Generador de rutas de logs de ping bajo un directorio (recursivo, sin listar todo en memoria)"""
+    pendientes = [directorio]
+    while pendientes:
+        actual = pendientes.pop()
+        try:
+            with os.scandir(actual) as entradas:
+                for entrada in entradas:
+                    if entrada.is_dir(follow_symlinks=False):
+                        pendientes.append(entrada.path)
+                    elif entrada.name.endswith(EXTENSIONES):
+                        yield entrada.path
+        except OSError:
+            continue
+
+
+def _fila(archivo, ip, fecha, metricas):
+    resultado = evaluar_metricas(ip, metricas.latencia, metricas.jitter, metricas.perdida)
+    fila = {columna: resultado.get(columna) for columna in COLUMNAS}
+    fila.update({
+        'archivo': archivo,
+        'ip': ip,
+        'fecha': fecha,
+        'muestras': metricas.muestras,
+        'latencia': metricas.latencia,
+        'jitter': metricas.jitter,
+        'perdida': metricas.perdida,
+        'error': resultado['error'],
+    })
+    return fila
+
+
+def analizar_registro(archivo, leidos=0, desde=0):
+    """
+    Métricas y MOS de las series de un registro binario, retomando una
+    lectura anterior. Una serie nueva de una IP comienza cuando su secuencia
+    vuelve a empezar; la última de cada IP puede seguir abierta si el
+    registro todavía se está escribiendo.
+
+    Parámetros:
+    - archivo: Ruta de un archivo pings/muestras-*.bin
+    - leidos: Registros que tenía el archivo en la lectura anterior (default: 0)
+    - desde: Primer registro de la serie más vieja que seguía abierta (default: 0)
+
+    Retorna:
+    - tupla (filas, registros, desde) con las filas de las series nuevas o
+      que seguían abiertas y los valores a guardar para la próxima lectura
+    """
+    series = []
+    actuales = {}
+    with LectorRegistro(archivo) as lector:
+        registros = len(lector)
+        if registros == leidos:
+            return [], registros, desde
+        for indice, (id_objetivo, secuencia, timestamp_ns, rtt_ms, perdido) in \
+                enumerate(lector.registros(desde), desde):
+            actual = actuales.get(id_objetivo)
+            if actual is None or secuencia <= len(actual[1].secuencias):
+                if actual is not None:
+                    # La serie anterior se cerró; si fue antes de la lectura
+                    # previa ya se emitió completa
+                    actual[2] = indice >= leidos
+                muestras = ResultadoPing(lector.objetivos.get(id_objetivo, str(id_objetivo)),
+                                         fecha=lector.fecha(timestamp_ns))
+                actual = actuales[id_objetivo] = [indice, muestras, True]
+                series.append(actual)
+            actual[1].agregar(None if perdido else float(rtt_ms), lector.fecha(timestamp_ns).timestamp())
+
+    filas = [_fila(archivo, muestras.ip, muestras.fecha.isoformat(timespec='seconds'),
+                   MetricasPing.desde_muestras(muestras))
+             for _inicio, muestras, emitir in series if emitir]
+    abiertas = [inicio for inicio, _muestras, _emitir in actuales.values()]
+    return filas, registros, min(abiertas, default=registros)
+
+
+def analizar_archivo(archivo):
+    """
+    Métricas y MOS de un log de ping.
+
+    Retorna:
+    - list de filas (una por archivo de texto, una por serie en registros binarios)
+    """
+    try:
+        if archivo.endswith('.bin'):
+            return analizar_registro(archivo)[0]
+
+        metricas = analizar_archivo_ping(archivo)
+        if metricas is None:
+            return [{'archivo': archivo, 'error': True, 'mensaje': 'No se pudo leer el archivo'}]
+        ip = fecha = None
+        match = PATRON_NOMBRE.match(os.path.basename(archivo))
+        if match:
+            ip, fecha = match.group(1), match.group(2)
+        return [_fila(archivo, ip, fecha, metricas)]
+    except Exception as e:
+        return [{'archivo': archivo, 'error': True, 'mensaje': f'Error inesperado: {str(e)}'}]
+
+
+def _analizar_lote(lote):
+    """
+    Tarea de un proceso trabajador: analizar un lote de (archivo, estado).
+
+    Retorna:
+    - tupla (cantidad de archivos, líneas nuevas del checkpoint, filas)
+    """
+    filas = []
+    lineas = []
+    for archivo, estado in lote:
+        if not archivo.endswith('.bin'):
+            filas.extend(analizar_archivo(archivo))
+            lineas.append(f"{archivo}\n")
+            continue
+        try:
+            nuevas, registros, desde = analizar_registro(archivo, *(estado or (0, 0)))
+        except Exception as e:
+            filas.append({'archivo': archivo, 'error': True, 'mensaje': f'Error inesperado: {str(e)}'})
+            lineas.append(f"{archivo}\n")
+            continue
+        filas.extend(nuevas)
+        if (registros, desde) != estado:
+            lineas.append(f"{archivo}\t{registros}\t{desde}\n")
+    return len(lote), lineas, filas
+
+
+def _lotes(archivos, tamano, procesados):
+    lote = []
+    for archivo in archivos:
+        estado = procesados.get(archivo, False)
+        # Los de texto y los binarios con error quedan terminados
+        if estado is None:
+            continue
+        lote.append((archivo, estado or None))
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _cargar_checkpoint(ruta):
+    """
+    Estado de cada archivo del checkpoint: None si está terminado o
+    (registros, desde) para un registro binario. Vale la última línea.
+    """
+    procesados = {}
+    if not ruta or not os.path.exists(ruta):
+        return procesados
+    with open(ruta, 'r', encoding='utf-8') as f:
+        for linea in f:
+            campos = linea.rstrip('\n').split('\t')
+            if not campos[0]:
+                continue
+            try:
+                procesados[campos[0]] = (int(campos[1]), int(campos[2])) if len(campos) == 3 else None
+            except ValueError:
+                procesados[campos[0]] = None
+    return procesados
+
+
+class _Escritor:
+    """Salida CSV o JSONL con flush por lote"""
+
+    def __init__(self, ruta, formato):
+        self.formato = formato
+        if ruta == '-':
+            self.archivo = sys.stdout
+            nuevo = True
+        else:
+            nuevo = not os.path.exists(ruta) or os.path.getsize(ruta) == 0
+            self.archivo = open(ruta, 'a', encoding='utf-8', newline='')
+        if formato == 'csv':
+            self.csv = csv.DictWriter(self.archivo, fieldnames=COLUMNAS, extrasaction='ignore')
+            if nuevo:
+                self.csv.writeheader()
+
+    def escribir(self, filas):
+        for fila in filas:
+            if self.formato == 'csv':
+                self.csv.writerow(fila)
+            else:
+                self.archivo.write(json.dumps(fila, ensure_ascii=False) + '\n')
+        self.archivo.flush()
+
+    def cerrar(self):
+        if self.archivo is not sys.stdout:
+            self.archivo.close()
+
+
+def reanalizar(directorio, salida='-', formato=None, procesos=None, checkpoint=None,
+               tamano_lote=64, al_progreso=None):
+    """
+    Reanaliza todos los logs de un directorio con un pool de procesos.
+    La memoria se mantiene acotada: solo hay unos pocos lotes en vuelo por
+    proceso y cada lote se escribe apenas termina.
+
+    Parámetros:
+    - directorio: Directorio con logs de ping (pings/ o cualquier otro)
+    - salida: Ruta del CSV/JSONL de salida o '-' para stdout (default: '-')
+    - formato: 'csv' o 'jsonl' (default: según la extensión de salida, csv para stdout)
+    - procesos: Procesos trabajadores (default: cantidad de CPUs)
+    - checkpoint: Archivo con las rutas ya procesadas para reanudar; los
+                  registros binarios que siguieron creciendo se retoman donde
+                  quedaron (default: None)
+    - tamano_lote: Archivos por tarea (default: 64)
+    - al_progreso: Callback opcional con la cantidad de archivos procesados
+
+    Retorna:
+    - int: Cantidad de archivos procesados en esta ejecución
+    """
+    if formato is None:
+        formato = 'jsonl' if salida.endswith(('.jsonl', '.json')) else 'csv'
+    procesos = procesos or os.cpu_count() or 1
+    procesados = _cargar_checkpoint(checkpoint)
+    escritor = _Escritor(salida, formato)
+    registro_checkpoint = open(checkpoint, 'a', encoding='utf-8') if checkpoint else None
+    lotes = _lotes(recorrer_archivos(directorio), tamano_lote, procesados)
+    total = 0
+
+    try:
+        with ProcessPoolExecutor(max_workers=procesos) as executor:
+            en_vuelo = set()
+            agotado = False
+            while en_vuelo or not agotado:
+                # Mantener unos pocos lotes por proceso para acotar memoria
+                while not agotado and len(en_vuelo) < procesos * 2:
+                    lote = next(lotes, None)
+                    if lote is None:
+                        agotado = True
+                    else:
+                        en_vuelo.add(executor.submit(_analizar_lote, lote))
+                if not en_vuelo:
+                    break
+
+                listos, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    cantidad, lineas, filas = futuro.result()
+                    escritor.escribir(filas)
+                    # El checkpoint se escribe después de la salida: al reanudar
+                    # un lote puede repetirse, pero nunca perderse
+                    if registro_checkpoint and lineas:
+                        registro_checkpoint.write(''.join(lineas))
+                        registro_checkpoint.flush()
+                    total += cantidad
+                    if al_progreso:
+                        al_progreso(total)
+    finally:
+        escritor.cerrar()
+        if registro_checkpoint:
+            registro_checkpoint.close()
+
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reanálisis masivo de logs de ping (MOS)")
+    parser.add_argument('directorio', nargs='?', default='pings',
+                        help="Directorio con logs de ping (default: pings)")
+    parser.add_argument('-o', '--salida', default='-',
+                        help="Archivo de salida .csv o .jsonl, '-' para stdout (default: -)")
+    parser.add_argument('-f', '--formato', choices=['csv', 'jsonl'],
+                        help="Formato de salida (default: según la extensión)")
+    parser.add_argument('-p', '--procesos', type=int, default=None,
+                        help="Procesos trabajadores (default: cantidad de CPUs)")
+    parser.add_argument('-c', '--checkpoint', default=None,
+                        help="Archivo de checkpoint para reanudar (default: <salida>.checkpoint)")
+    parser.add_argument('--lote', type=int, default=64,
+                        help="Archivos por tarea (default: 64)")
+    args = parser.parse_args()
+
+    checkpoint = args.checkpoint
+    if checkpoint is None and args.salida != '-':
+        checkpoint = args.salida + '.checkpoint'
+
+    def al_progreso(total):
+        print(f"\rArchivos procesados: {total}", end='', file=sys.stderr, flush=True)
+
+    try:
+        total = reanalizar(args.directorio, args.salida, args.formato, args.procesos,
+                           checkpoint, args.lote, al_progreso)
+    except KeyboardInterrupt:
+        print("\nInterrumpido. Ejecute el mismo comando para reanudar.", file=sys.stderr)
+        return 130
+    print(f"\nListo: {total} archivos", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
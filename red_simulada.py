@@ -0,0 +1,329 @@
+"""
+red_simulada.py
+Red simulada determinista y motor de sondeo que la usa en lugar de ICMP real
+
+Permite ejecutar analizar_ip, analizar_ips, los monitores y obtener_traceroute
+contra miles de objetivos virtuales sin red ni privilegios:
+
+    from motor_icmp import establecer_motor
+    from red_simulada import MotorSimulado, RedSimulada, objetivos_simulados
+
+    establecer_motor(MotorSimulado(RedSimulada(semilla=7)))
+    resultados = analizar_ips(objetivos_simulados(10000), 10)
+"""
+
+import hashlib
+import heapq
+import itertools
+import random
+import threading
+import time
+
+from motor_icmp import SondeoICMP
+
+
+# Fracción por defecto de routers y objetivos con enlaces degradados
+PROPORCION_DEGRADADOS = 0.1
+
+# Cantidad de routers troncales entre los que se eligen las rutas
+_ROUTERS_TRONCALES = 40
+
+
+def _semilla_nodo(semilla, clave):
+    """Semilla estable (independiente de PYTHONHASHSEED) para un nodo"""
+    return int.from_bytes(hashlib.blake2b(f'{semilla}:{clave}'.encode(), digest_size=8).digest(), 'big')
+
+
+class NodoSimulado:
+    """
+    Router u objetivo de la red simulada.
+
+    - latencia: RTT base en ms hasta el nodo sin colas
+    - cola: Demora media de encolamiento que agrega el nodo a lo que pasa por él (ms)
+    - p_malo / p_recuperacion / perdida_mala: Cadena de Gilbert-Elliott de
+      pérdida en ráfagas (probabilidad de entrar y de salir del estado malo, y
+      pérdida mientras dura)
+    - limite_icmp: Probabilidad de que un router no responda los pings
+      dirigidos a él (no afecta el tráfico que reenvía)
+    """
+
+    __slots__ = ('ip', 'hostname', 'latencia', 'cola', 'perdida_base', 'p_malo', 'p_recuperacion',
+                 'perdida_mala', 'limite_icmp', 'ttl_inicial', 'ruta', 'random', 'estados')
+
+    def __init__(self, ip, hostname, latencia, ruta, aleatorio, degradado, router):
+        self.ip = ip
+        self.hostname = hostname
+        self.latencia = latencia
+        self.ruta = ruta
+        self.random = aleatorio
+        self.perdida_base = 0.0005
+        if degradado:
+            self.cola = aleatorio.uniform(5.0, 30.0)
+            self.p_malo = aleatorio.uniform(0.02, 0.1)
+            self.p_recuperacion = aleatorio.uniform(0.2, 0.5)
+            self.perdida_mala = aleatorio.uniform(0.5, 0.9)
+        else:
+            self.cola = aleatorio.uniform(0.1, 1.5)
+            self.p_malo = aleatorio.uniform(0.0, 0.002)
+            self.p_recuperacion = 0.5
+            self.perdida_mala = 0.5
+        self.limite_icmp = aleatorio.choice((0.0, 0.0, 0.0, 0.3)) if router else 0.0
+        self.ttl_inicial = 255 if router else aleatorio.choice((64, 64, 128))
+        # Estado bueno/malo de cada elemento del camino vista desde este nodo
+        self.estados = [False] * (len(ruta) + 1)
+
+    @property
+    def ttl_respuesta(self):
+        return self.ttl_inicial - len(self.ruta)
+
+
+class RedSimulada:
+    """
+    Topología en árbol generada a partir de una semilla: gateway, router del
+    proveedor, de 2 a 6 routers troncales elegidos por /16 de destino, un
+    router de borde por /24 y el objetivo. Los routers compartidos por varias
+    rutas son el mismo nodo, de modo que uno degradado afecta a todos los
+    objetivos detrás de él.
+
+    Cada nodo tiene su propio generador aleatorio derivado de la semilla y de
+    su IP: la secuencia de muestras de un objetivo es siempre la misma sin
+    importar en qué orden o desde qué hilos se sondeen los demás.
+    """
+
+    def __init__(self, semilla=0, proporcion_degradados=PROPORCION_DEGRADADOS):
+        """
+        Parámetros:
+        - semilla: Semilla de la topología y de las muestras (default: 0)
+        - proporcion_degradados: Fracción de nodos con colas y pérdida en ráfagas (default: 0.1)
+        """
+        self.semilla = semilla
+        self.proporcion_degradados = proporcion_degradados
+        self._nodos = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._nodos)
+
+    def _aleatorio(self, clave):
+        return random.Random(_semilla_nodo(self.semilla, clave))
+
+    def _router(self, ip, hostname, latencia, ruta):
+        nodo = self._nodos.get(ip)
+        if nodo is None:
+            aleatorio = self._aleatorio(ip)
+            degradado = aleatorio.random() < self.proporcion_degradados
+            nodo = NodoSimulado(ip, hostname, latencia, list(ruta), aleatorio, degradado, True)
+            self._nodos[ip] = nodo
+        return nodo
+
+    def _crear_objetivo(self, ip):
+        octetos = _octetos(ip, self.semilla)
+        ruta = [self._router('192.168.1.1', 'gateway.sim', 1.5, [])]
+        ruta.append(self._router('100.64.0.1', 'proveedor.sim', 6.0, ruta))
+
+        # Troncales según el /16 del destino, en orden creciente de latencia
+        aleatorio_red = self._aleatorio(f'troncal:{octetos[0]}.{octetos[1]}')
+        troncales = sorted(aleatorio_red.sample(range(_ROUTERS_TRONCALES), aleatorio_red.randint(2, 6)))
+        for k in troncales:
+            ruta.append(self._router(f'100.65.{k}.1', f'troncal{k}.sim', 8.0 + 2.5 * k, ruta))
+
+        aleatorio_borde = self._aleatorio(f'borde:{octetos[0]}.{octetos[1]}.{octetos[2]}')
+        ip_borde = f'100.66.{aleatorio_borde.randrange(256)}.{aleatorio_borde.randrange(1, 255)}'
+        ruta.append(self._router(ip_borde, f'borde-{ip_borde.replace(".", "-")}.sim',
+                                 ruta[-1].latencia + aleatorio_borde.uniform(1.0, 8.0), ruta))
+
+        aleatorio = self._aleatorio(ip)
+        degradado = aleatorio.random() < self.proporcion_degradados
+        latencia = ruta[-1].latencia + aleatorio.uniform(0.5, 25.0)
+        return NodoSimulado(ip, None, latencia, ruta, aleatorio, degradado, False)
+
+    def nodo(self, ip):
+        """NodoSimulado de una IP (router conocido u objetivo, creado la primera vez)"""
+        nodo = self._nodos.get(ip)
+        if nodo is None:
+            with self._lock:
+                nodo = self._nodos.get(ip)
+                if nodo is None:
+                    nodo = self._crear_objetivo(ip)
+                    self._nodos[ip] = nodo
+        return nodo
+
+    def muestra(self, nodo):
+        """
+        Sondear un nodo una vez.
+
+        Retorna:
+        - RTT en ms o None si el paquete se perdió
+        """
+        with self._lock:
+            aleatorio = nodo.random
+            camino = nodo.ruta + [nodo]
+            perdido = False
+            rtt = nodo.latencia
+            for i, elemento in enumerate(camino):
+                # Avanzar la cadena de Gilbert-Elliott de este tramo
+                if nodo.estados[i]:
+                    nodo.estados[i] = aleatorio.random() >= elemento.p_recuperacion
+                else:
+                    nodo.estados[i] = aleatorio.random() < elemento.p_malo
+                perdida = elemento.perdida_mala if nodo.estados[i] else elemento.perdida_base
+                if aleatorio.random() < perdida:
+                    perdido = True
+                rtt += aleatorio.expovariate(1.0 / elemento.cola)
+            if nodo.limite_icmp and aleatorio.random() < nodo.limite_icmp:
+                perdido = True
+        return None if perdido else rtt
+
+
+def _octetos(ip, semilla):
+    """Octetos IPv4 de una IP; los hostnames se mapean a una IP estable"""
+    try:
+        octetos = [int(parte) for parte in ip.split('.')]
+        if len(octetos) == 4 and all(0 <= octeto <= 255 for octeto in octetos):
+            return octetos
+    except ValueError:
+        pass
+    valor = _semilla_nodo(semilla, ip)
+    return [10, (valor >> 16) & 0xFF, (valor >> 8) & 0xFF, valor & 0xFF]
+
+
+def objetivos_simulados(cantidad, prefijo='10'):
+    """
+    Lista de objetivos virtuales en el formato de config.json.
+
+    Parámetros:
+    - cantidad: Cantidad de objetivos
+    - prefijo: Primer octeto de las IPs (default: '10')
+
+    Retorna:
+    - list de dicts con 'ip' y 'nombre'
+    """
+    objetivos = []
+    for i in range(cantidad):
+        ip = f'{prefijo}.{i // 64516 % 256}.{i // 254 % 254}.{i % 254 + 1}'
+        objetivos.append({'ip': ip, 'nombre': f'Simulado {i + 1}'})
+    return objetivos
+
+
+class MotorSimulado:
+    """
+    Motor de sondeo con la interfaz de MotorICMP sobre una RedSimulada.
+    Cada respuesta se entrega después de su RTT simulado (multiplicado por
+    escala_tiempo) desde un hilo propio, como llegaría de la red; los
+    perdidos se resuelven al vencer el timeout. Con escala_tiempo=0 todo se
+    resuelve en el momento, útil para benchmarks.
+    """
+
+    def __init__(self, red=None, semilla=0, escala_tiempo=1.0):
+        """
+        Parámetros:
+        - red: RedSimulada a usar (default: una nueva con la semilla indicada)
+        - semilla: Semilla si no se pasa red (default: 0)
+        - escala_tiempo: Factor aplicado a las demoras reales (default: 1.0)
+        """
+        # Una RedSimulada recién creada está vacía (len 0): no usar "or"
+        self.red = red if red is not None else RedSimulada(semilla)
+        self.escala_tiempo = escala_tiempo
+        self._secuencias = itertools.count(1)
+        self._entregas = []
+        self._ttl_respuestas = {}
+        self._cond = threading.Condition()
+        self._activo = True
+        self._hilo = None
+        if escala_tiempo:
+            self._hilo = threading.Thread(target=self._entregar, name='motor-simulado', daemon=True)
+            self._hilo.start()
+
+    def enviar(self, host, timeout=1.0, callback=None):
+        """Enviar un ping simulado sin bloquear (ver MotorICMP.enviar)"""
+        nodo = self.red.nodo(host)
+        rtt_ms = self.red.muestra(nodo)
+        ahora = time.monotonic()
+        # El límite contempla la escala para que esperar() no corte una entrega demorada
+        sondeo = SondeoICMP(nodo.ip, next(self._secuencias) & 0xFFFF,
+                            ahora + timeout * max(1.0, self.escala_tiempo), callback)
+        sondeo.enviado = time.perf_counter()
+
+        if rtt_ms is None or rtt_ms / 1000 > timeout:
+            rtt, ttl, demora = None, None, timeout
+        else:
+            rtt, ttl, demora = rtt_ms / 1000, nodo.ttl_respuesta, rtt_ms / 1000
+
+        if not self.escala_tiempo:
+            self._resolver(sondeo, rtt, ttl)
+            return sondeo
+        with self._cond:
+            heapq.heappush(self._entregas, (ahora + demora * self.escala_tiempo, sondeo.secuencia,
+                                            id(sondeo), sondeo, rtt, ttl))
+            self._cond.notify()
+        return sondeo
+
+    def ping(self, host, timeout=1.0):
+        return self.enviar(host, timeout).esperar()
+
+    def ping_lote(self, hosts, timeout=1.0):
+        sondeos = {host: self.enviar(host, timeout) for host in hosts}
+        return {host: sondeo.esperar() for host, sondeo in sondeos.items()}
+
+    def ttl_respuesta(self, host):
+        return self._ttl_respuestas.get(host)
+
+    def traceroute(self, host, max_hops=30, timeout=2):
+        """
+        Traceroute simulado con el formato de obtener_traceroute: un sondeo
+        por salto, todos a la vez, esperando la respuesta más lenta.
+        """
+        nodo = self.red.nodo(host)
+        camino = (nodo.ruta + [nodo])[:max_hops]
+        saltos = []
+        espera = 0.0
+        for ttl, elemento in enumerate(camino, 1):
+            rtt_ms = self.red.muestra(elemento)
+            if rtt_ms is None or rtt_ms / 1000 > timeout:
+                saltos.append({'hop': ttl, 'ip': '*', 'latency_ms': None, 'hostname': None})
+                espera = timeout
+            else:
+                saltos.append({'hop': ttl, 'ip': elemento.ip, 'latency_ms': round(rtt_ms, 2),
+                               'hostname': elemento.hostname})
+                espera = max(espera, rtt_ms / 1000)
+        if self.escala_tiempo:
+            time.sleep(espera * self.escala_tiempo)
+        return saltos
+
+    def cerrar(self):
+        """Detener la entrega y dar por perdidos los sondeos todavía en vuelo"""
+        with self._cond:
+            self._activo = False
+            self._cond.notify_all()
+            pendientes, self._entregas = self._entregas, []
+        if self._hilo is not None:
+            self._hilo.join(timeout=1)
+        for _momento, _secuencia, _id, sondeo, _rtt, _ttl in pendientes:
+            self._resolver(sondeo, None, None)
+
+    def _resolver(self, sondeo, rtt, ttl):
+        sondeo.rtt = rtt
+        sondeo.ttl = ttl
+        if ttl is not None:
+            self._ttl_respuestas[sondeo.ip] = ttl
+        sondeo.evento.set()
+        if sondeo.callback:
+            try:
+                sondeo.callback(sondeo)
+            except Exception:
+                pass
+
+    def _entregar(self):
+        while True:
+            with self._cond:
+                while self._activo and (not self._entregas or self._entregas[0][0] > time.monotonic()):
+                    espera = self._entregas[0][0] - time.monotonic() if self._entregas else None
+                    self._cond.wait(espera)
+                if not self._activo:
+                    return
+                listos = []
+                ahora = time.monotonic()
+                while self._entregas and self._entregas[0][0] <= ahora:
+                    listos.append(heapq.heappop(self._entregas))
+            for _momento, _secuencia, _id, sondeo, rtt, ttl in listos:
+                self._resolver(sondeo, rtt, ttl)
@@ -0,0 +1,280 @@
+"""
+registro_muestras.py
+Registro binario de muestras de ping: append-only, registros de ancho fijo
+y lectura sin copias mediante mmap
+"""
+
+import os
+import mmap
+import struct
+import threading
+import time
+import atexit
+from datetime import datetime
+
+from instrumentacion import span, contar
+
+
+MAGIA = b'MOSB'
+VERSION = 2
+
+# Encabezado: magia, versión, tamaño de registro, ancla de reloj de pared y
+# ancla monotónica (ns) tomadas en el mismo instante al crear el archivo
+ENCABEZADO = struct.Struct('<4sHHqq8x')
+
+# Registro: id de objetivo, secuencia, timestamp monotónico (ns), RTT (ms), perdido.
+# Empaquetado sin relleno: 21 bytes por muestra. Una serie de 10 pings en el
+# formato de texto histórico ocupa unos 550 bytes (55 por muestra, 2,6 veces
+# más); la reducción de ~10x sale de no crear un archivo por corrida, que en
+# disco ocupa al menos un bloque de 4 KiB (~400 bytes por muestra, ~19x).
+# Bajar más el registro exigiría acortar el timestamp o la secuencia, que
+# son los que permiten ordenar y reanudar la lectura.
+REGISTRO = struct.Struct('<IIqfB')
+
+# dtype equivalente para lectura vectorizada con numpy
+DTYPE_REGISTRO = [('objetivo', '<u4'), ('secuencia', '<u4'), ('timestamp_ns', '<i8'),
+                  ('rtt_ms', '<f4'), ('perdido', 'u1')]
+
+# Formatos de registro legibles por versión (la 1 tenía 3 bytes de relleno)
+_FORMATOS = {
+    1: (struct.Struct('<IIqfB3x'), DTYPE_REGISTRO + [('_relleno', 'V3')]),
+    VERSION: (REGISTRO, DTYPE_REGISTRO),
+}
+
+
+def _ruta_objetivos(ruta):
+    """Archivo lateral con la tabla id -> ip del registro"""
+    return ruta + '.objetivos'
+
+
+class RegistroMuestras:
+    """
+    Escritor append-only de muestras. Cada muestra se agrega apenas llega y
+    un hilo de fondo hace el fsync por lotes (cada lote_fsync registros o
+    intervalo_fsync segundos, lo que ocurra primero), así quien agrega nunca
+    espera al disco. Es seguro usarlo desde varios hilos.
+    """
+
+    def __init__(self, ruta, lote_fsync=256, intervalo_fsync=1.0):
+        self.ruta = ruta
+        self.lote_fsync = lote_fsync
+        self.intervalo_fsync = intervalo_fsync
+        self._lock = threading.Lock()
+        # Serializa fsync y cierre sin bloquear a agregar()
+        self._lock_disco = threading.Lock()
+        self._despertar = threading.Condition(self._lock)
+        self._ids = {}
+        self._pendientes = 0
+        self._cerrado = False
+
+        directorio = os.path.dirname(ruta)
+        if directorio and not os.path.exists(directorio):
+            os.makedirs(directorio, exist_ok=True)
+
+        nuevo = not os.path.exists(ruta) or os.path.getsize(ruta) == 0
+        self._archivo = open(ruta, 'ab')
+        if nuevo:
+            self._archivo.write(ENCABEZADO.pack(MAGIA, VERSION, REGISTRO.size,
+                                                time.time_ns(), time.monotonic_ns()))
+            # Un lector que abra el archivo antes del primer fsync ya ve el encabezado
+            self._archivo.flush()
+        else:
+            # Agregar registros de otra versión dejaría el archivo ilegible
+            with open(ruta, 'rb') as f:
+                encabezado = f.read(ENCABEZADO.size)
+            if (len(encabezado) < ENCABEZADO.size or
+                    ENCABEZADO.unpack(encabezado)[:3] != (MAGIA, VERSION, REGISTRO.size)):
+                self._archivo.close()
+                raise ValueError(f"{ruta} no es un registro de muestras versión {VERSION}")
+            self._ids = _leer_objetivos(ruta)
+        self._objetivos = open(_ruta_objetivos(ruta), 'a', encoding='utf-8')
+        self._hilo = threading.Thread(target=self._bucle_fsync, name='fsync-registro', daemon=True)
+        self._hilo.start()
+
+    def id_objetivo(self, ip):
+        """Id numérico de una IP, asignándolo la primera vez que aparece"""
+        id_objetivo = self._ids.get(ip)
+        if id_objetivo is None:
+            id_objetivo = len(self._ids)
+            self._ids[ip] = id_objetivo
+            self._objetivos.write(f"{id_objetivo}\t{ip}\n")
+            # Un lector concurrente debe poder resolver el id de cada registro volcado
+            self._objetivos.flush()
+        return id_objetivo
+
+    def agregar(self, ip, secuencia, timestamp_ns, rtt_ms, perdido):
+        """
+        Agregar una muestra al registro.
+
+        Parámetros:
+        - ip: Dirección IP del objetivo
+        - secuencia: Número de secuencia dentro de la serie
+        - timestamp_ns: Instante de envío según time.monotonic_ns()
+        - rtt_ms: Latencia en ms (ignorada si perdido)
+        - perdido: True si no hubo respuesta válida
+        """
+        with self._lock:
+            registro = REGISTRO.pack(self.id_objetivo(ip), secuencia, timestamp_ns,
+                                     0.0 if perdido or rtt_ms is None else rtt_ms,
+                                     1 if perdido else 0)
+            self._archivo.write(registro)
+            self._pendientes += 1
+            if self._pendientes >= self.lote_fsync:
+                self._despertar.notify()
+
+    def _bucle_fsync(self):
+        """Hilo de fondo: fsync al llenarse un lote o al vencer el intervalo"""
+        while True:
+            with self._lock:
+                if not self._cerrado and self._pendientes < self.lote_fsync:
+                    self._despertar.wait(self.intervalo_fsync)
+                if self._cerrado:
+                    return
+                if not self._pendientes:
+                    continue
+            self.sincronizar()
+
+    def sincronizar(self):
+        """Forzar escritura a disco de las muestras pendientes"""
+        with self._lock_disco:
+            with self._lock:
+                if self._archivo.closed:
+                    return
+                self._objetivos.flush()
+                self._archivo.flush()
+                pendientes, self._pendientes = self._pendientes, 0
+            # El fsync corre fuera de self._lock: agregar() sigue sin esperar
+            with span('fsync_registro'):
+                os.fsync(self._archivo.fileno())
+            contar('bytes_escritos', pendientes * REGISTRO.size)
+
+    def cerrar(self):
+        with self._lock:
+            if self._cerrado:
+                return
+            self._cerrado = True
+            self._despertar.notify()
+        if self._hilo is not threading.current_thread():
+            self._hilo.join()
+        self.sincronizar()
+        with self._lock_disco, self._lock:
+            self._archivo.close()
+            self._objetivos.close()
+
+
+def _leer_objetivos(ruta):
+    """Tabla ip -> id leída del archivo lateral"""
+    ids = {}
+    try:
+        with open(_ruta_objetivos(ruta), 'r', encoding='utf-8') as f:
+            for linea in f:
+                id_objetivo, _, ip = linea.rstrip('\n').partition('\t')
+                if ip:
+                    ids[ip] = int(id_objetivo)
+    except FileNotFoundError:
+        pass
+    return ids
+
+
+class LectorRegistro:
+    """
+    Lectura de un registro binario mapeado en memoria. Los registros se
+    decodifican directamente desde el mapa, sin copiar el archivo.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with open(ruta, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < ENCABEZADO.size:
+                # Recién creado y sin encabezado completo todavía: registro vacío
+                self._mapa = None
+                self._cantidad = 0
+                self._datos = memoryview(b'')
+                self._formato, self._dtype = REGISTRO, DTYPE_REGISTRO
+                self.ancla_pared_ns = self.ancla_monotonica_ns = 0
+                self.objetivos = {}
+                return
+            self._mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magia, version, tamano, self.ancla_pared_ns, self.ancla_monotonica_ns = \
+            ENCABEZADO.unpack_from(self._mapa, 0)
+        self._formato, self._dtype = _FORMATOS.get(version, (None, None))
+        if magia != MAGIA or self._formato is None or tamano != self._formato.size:
+            self._mapa.close()
+            raise ValueError(f"{ruta} no es un registro de muestras válido (versión {version})")
+        # Ignorar un registro final incompleto (escritura en curso)
+        self._cantidad = (len(self._mapa) - ENCABEZADO.size) // self._formato.size
+        fin = ENCABEZADO.size + self._cantidad * self._formato.size
+        self._datos = memoryview(self._mapa)[ENCABEZADO.size:fin]
+        self.objetivos = {id_objetivo: ip for ip, id_objetivo in _leer_objetivos(ruta).items()}
+
+    def __len__(self):
+        return self._cantidad
+
+    def __getitem__(self, indice):
+        if indice < 0:
+            indice += self._cantidad
+        if not 0 <= indice < self._cantidad:
+            raise IndexError(indice)
+        return self._formato.unpack_from(self._datos, indice * self._formato.size)
+
+    def __iter__(self):
+        """Tuplas (id_objetivo, secuencia, timestamp_ns, rtt_ms, perdido)"""
+        return self._formato.iter_unpack(self._datos)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
+
+    def registros(self, desde=0):
+        """Tuplas de los registros a partir del índice desde (lectura incremental)"""
+        return self._formato.iter_unpack(self._datos[desde * self._formato.size:])
+
+    def muestras(self, ip):
+        """Registros de una IP en orden de llegada"""
+        id_objetivo = next((id_objetivo for id_objetivo, ip_objetivo in self.objetivos.items()
+                            if ip_objetivo == ip), None)
+        if id_objetivo is None:
+            return
+        for registro in self._formato.iter_unpack(self._datos):
+            if registro[0] == id_objetivo:
+                yield registro
+
+    def fecha(self, timestamp_ns):
+        """Convertir un timestamp monotónico del registro a datetime local"""
+        return datetime.fromtimestamp(
+            (self.ancla_pared_ns + timestamp_ns - self.ancla_monotonica_ns) / 1e9)
+
+    def como_array(self):
+        """
+        Vista numpy (structured array) sobre el mapa, sin copiar.
+        Requiere numpy instalado.
+        """
+        import numpy as np
+        return np.frombuffer(self._datos, dtype=np.dtype(self._dtype))
+
+    def cerrar(self):
+        self._datos.release()
+        if self._mapa is not None:
+            self._mapa.close()
+
+
+_registro = None
+_registro_lock = threading.Lock()
+
+
+def obtener_registro(directorio='pings'):
+    """
+    Registro binario compartido del proceso. Cada proceso escribe su propio
+    archivo pings/muestras-{fecha}.bin para que el ancla monotónica sea válida.
+    """
+    global _registro
+    if _registro is None:
+        with _registro_lock:
+            if _registro is None:
+                fecha_hora = datetime.now().strftime("%Y%m%d-%H%M%S")
+                ruta = os.path.join(directorio, f"muestras-{fecha_hora}-{os.getpid()}.bin")
+                _registro = RegistroMuestras(ruta)
+                atexit.register(_registro.cerrar)
+    return _registro
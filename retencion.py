@@ -0,0 +1,869 @@
+"""
+retencion.py
+Retención, agregados y compactación del directorio pings/
+
+hacer_ping deja un archivo de texto por serie y cada proceso un registro
+binario muestras-*.bin; sin mantenimiento pings/ crece sin límite. Este
+módulo aplica una política en tres pasos:
+
+1. Agregados: cada archivo crudo se resume una sola vez (los registros
+   binarios en forma incremental) en pings/agregados.db, por IP y por
+   minuto y por hora: enviados, perdidos, latencia, jitter, mínimo,
+   máximo, pérdida, MOS y un histograma logarítmico de latencias del que
+   salen p50/p95/p99. Los agregados se combinan sin volver a los crudos.
+2. Compactación: los crudos más viejos que dias_crudos se guardan en
+   pings/archivo/AAAA-MM-DD.zip (deflate) con un índice en la misma base
+   para ubicarlos por ruta, IP y fecha, y se borran.
+3. Retención: se borran los zip más viejos que dias_archivo, los agregados
+   por minuto más viejos que dias_minuto y los por hora más viejos que
+   dias_hora. Si pings/ supera max_mb se compactan antes de tiempo los
+   crudos más viejos y después se borran los zip más viejos.
+
+    python retencion.py pings --dias-crudos 7 --max-mb 1024
+    python retencion.py pings --consultar 8.8.8.8 --resolucion hora --horas 48
+"""
+
+import argparse
+import json
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zipfile
+from collections import Counter
+from datetime import datetime
+
+from importador_ping import importar_archivo
+from mos_functions import calcular_mos
+from registro_muestras import LectorRegistro
+from reanalizar import recorrer_archivos, PATRON_NOMBRE
+from instrumentacion import span, contar
+
+
+DIRECTORIO = 'pings'
+NOMBRE_BASE = 'agregados.db'
+SUBDIRECTORIO_ARCHIVO = 'archivo'
+
+# Política por defecto
+DIAS_CRUDOS = 7
+DIAS_ARCHIVO = 90
+DIAS_MINUTO = 30
+DIAS_HORA = 730
+
+# Un crudo modificado hace menos de esto puede estar escribiéndose: no se compacta
+INACTIVIDAD = 3600
+
+# Cubetas del histograma: cada una abarca un factor 1.02 (error relativo < 1%)
+FACTOR_HISTOGRAMA = 1.02
+LATENCIA_MINIMA = 0.01
+_INVERSA_LOG = 1 / math.log(FACTOR_HISTOGRAMA)
+
+# Crudos compactados por tanda cuando se excede max_mb
+TANDA_COMPACTACION = 256
+
+RESOLUCIONES = {'minuto': ('agregados_minuto', 60), 'hora': ('agregados_hora', 3600)}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS agregados_minuto (
+    ip TEXT NOT NULL,
+    inicio INTEGER NOT NULL,
+    enviados INTEGER NOT NULL,
+    perdidos INTEGER NOT NULL,
+    suma REAL NOT NULL,
+    suma_diferencias REAL NOT NULL,
+    pares INTEGER NOT NULL,
+    minimo REAL,
+    maximo REAL,
+    histograma TEXT,
+    latencia REAL,
+    jitter REAL,
+    perdida REAL,
+    mos REAL,
+    PRIMARY KEY (ip, inicio)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_agregados_minuto_inicio ON agregados_minuto (inicio);
+CREATE TABLE IF NOT EXISTS agregados_hora (
+    ip TEXT NOT NULL,
+    inicio INTEGER NOT NULL,
+    enviados INTEGER NOT NULL,
+    perdidos INTEGER NOT NULL,
+    suma REAL NOT NULL,
+    suma_diferencias REAL NOT NULL,
+    pares INTEGER NOT NULL,
+    minimo REAL,
+    maximo REAL,
+    histograma TEXT,
+    latencia REAL,
+    jitter REAL,
+    perdida REAL,
+    mos REAL,
+    PRIMARY KEY (ip, inicio)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_agregados_hora_inicio ON agregados_hora (inicio);
+CREATE TABLE IF NOT EXISTS procesados (
+    ruta TEXT PRIMARY KEY,
+    registros INTEGER NOT NULL DEFAULT 0,
+    ip TEXT,
+    inicio REAL,
+    fin REAL,
+    estado TEXT,
+    fallido INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS archivados (
+    ruta TEXT PRIMARY KEY,
+    contenedor TEXT NOT NULL,
+    ip TEXT,
+    inicio REAL,
+    fin REAL,
+    tamano INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_archivados_ip_inicio ON archivados (ip, inicio);
+CREATE INDEX IF NOT EXISTS idx_archivados_contenedor ON archivados (contenedor);
+"""
+
+# Columnas agregadas a procesados después de la primera versión del esquema
+_COLUMNAS_PROCESADOS = {'estado': 'TEXT', 'fallido': 'INTEGER NOT NULL DEFAULT 0'}
+
+_COLUMNAS = ('ip', 'inicio', 'enviados', 'perdidos', 'suma', 'suma_diferencias', 'pares',
+             'minimo', 'maximo', 'histograma', 'latencia', 'jitter', 'perdida', 'mos')
+
+
+def _cubeta(latencia):
+    return math.floor(math.log(max(latencia, LATENCIA_MINIMA)) * _INVERSA_LOG)
+
+
+class HistogramaLatencias:
+    """
+    Histograma de latencias en cubetas logarítmicas. Ocupa unas pocas
+    decenas de cubetas por serie, se combina sumando conteos y da
+    percentiles con error relativo menor al 1%.
+    """
+
+    def __init__(self, cubetas=None):
+        self.cubetas = Counter(cubetas or {})
+
+    def __len__(self):
+        return sum(self.cubetas.values())
+
+    def agregar(self, latencia):
+        self.cubetas[_cubeta(latencia)] += 1
+
+    def agregar_lote(self, latencias):
+        self.cubetas.update(map(_cubeta, latencias))
+
+    def combinar(self, otro):
+        self.cubetas.update(otro.cubetas)
+
+    def percentil(self, p):
+        """Latencia en ms del percentil p (0-100) o None si está vacío"""
+        total = len(self)
+        if total == 0:
+            return None
+        objetivo = max(1, math.ceil(p / 100 * total))
+        acumulado = 0
+        for cubeta in sorted(self.cubetas):
+            acumulado += self.cubetas[cubeta]
+            if acumulado >= objetivo:
+                # Centro geométrico de la cubeta
+                return FACTOR_HISTOGRAMA ** (cubeta + 0.5)
+        return None
+
+    def a_json(self):
+        return json.dumps({str(cubeta): cantidad for cubeta, cantidad in self.cubetas.items()},
+                          separators=(',', ':'))
+
+    @classmethod
+    def desde_json(cls, texto):
+        if not texto:
+            return cls()
+        return cls({int(cubeta): cantidad for cubeta, cantidad in json.loads(texto).items()})
+
+
+class Agregado:
+    """
+    Resumen combinable de las muestras de una IP en un intervalo: conteos,
+    sumas para latencia y jitter (PingPlotter), extremos e histograma.
+    """
+
+    def __init__(self):
+        self.enviados = 0
+        self.perdidos = 0
+        self.suma = 0.0
+        self.suma_diferencias = 0.0
+        self.pares = 0
+        self.minimo = None
+        self.maximo = None
+        self.histograma = HistogramaLatencias()
+
+    @property
+    def recibidos(self):
+        return self.enviados - self.perdidos
+
+    def agregar(self, latencia, anterior=None):
+        """Incorporar una muestra (latencia None = perdida) y su respuesta anterior de la serie"""
+        self.enviados += 1
+        if latencia is None:
+            self.perdidos += 1
+            return
+        self.suma += latencia
+        if anterior is not None:
+            self.suma_diferencias += abs(latencia - anterior)
+            self.pares += 1
+        if self.minimo is None or latencia < self.minimo:
+            self.minimo = latencia
+        if self.maximo is None or latencia > self.maximo:
+            self.maximo = latencia
+        self.histograma.agregar(latencia)
+
+    def combinar(self, otro):
+        self.enviados += otro.enviados
+        self.perdidos += otro.perdidos
+        self.suma += otro.suma
+        self.suma_diferencias += otro.suma_diferencias
+        self.pares += otro.pares
+        if otro.minimo is not None and (self.minimo is None or otro.minimo < self.minimo):
+            self.minimo = otro.minimo
+        if otro.maximo is not None and (self.maximo is None or otro.maximo > self.maximo):
+            self.maximo = otro.maximo
+        self.histograma.combinar(otro.histograma)
+
+    @property
+    def latencia(self):
+        return self.suma / self.recibidos if self.recibidos > 0 else None
+
+    @property
+    def jitter(self):
+        return self.suma_diferencias / self.pares if self.pares > 0 else None
+
+    @property
+    def perdida(self):
+        return self.perdidos / self.enviados * 100 if self.enviados > 0 else None
+
+    @property
+    def mos(self):
+        """MOS del intervalo o None si no hay latencia y jitter"""
+        if self.latencia is None or self.jitter is None:
+            return None
+        return calcular_mos(self.latencia, self.jitter, self.perdida)[0]
+
+    @classmethod
+    def desde_importador(cls, importado):
+        """Agregado de un ImportadorPing con histograma"""
+        agregado = cls()
+        agregado.enviados = importado.enviados
+        agregado.perdidos = importado.perdidos
+        agregado.suma = importado.suma
+        agregado.suma_diferencias = importado.suma_diferencias
+        agregado.pares = max(importado.recibidos - 1, 0)
+        agregado.minimo = importado.minimo
+        agregado.maximo = importado.maximo
+        if importado.histograma is not None:
+            agregado.histograma = importado.histograma
+        return agregado
+
+    @classmethod
+    def desde_fila(cls, fila):
+        agregado = cls()
+        for campo in ('enviados', 'perdidos', 'suma', 'suma_diferencias', 'pares', 'minimo', 'maximo'):
+            setattr(agregado, campo, fila[campo])
+        agregado.histograma = HistogramaLatencias.desde_json(fila['histograma'])
+        return agregado
+
+    def fila(self, ip, inicio):
+        return (ip, inicio, self.enviados, self.perdidos, self.suma, self.suma_diferencias,
+                self.pares, self.minimo, self.maximo, self.histograma.a_json(),
+                self.latencia, self.jitter, self.perdida, self.mos)
+
+    def como_dict(self):
+        return {
+            'enviados': self.enviados,
+            'perdidos': self.perdidos,
+            'recibidos': self.recibidos,
+            'latencia': self.latencia,
+            'jitter': self.jitter,
+            'perdida': self.perdida,
+            'mos': self.mos,
+            'minimo': self.minimo,
+            'maximo': self.maximo,
+            'p50': self.histograma.percentil(50),
+            'p95': self.histograma.percentil(95),
+            'p99': self.histograma.percentil(99),
+        }
+
+
+def _fecha_contenedor(inicio):
+    return datetime.fromtimestamp(inicio).strftime('%Y-%m-%d')
+
+
+def _pid_registro(nombre):
+    """PID del proceso que escribe un muestras-{fecha}-{pid}.bin o None"""
+    try:
+        return int(nombre[:-len('.bin')].rsplit('-', 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+class AlmacenRetencion:
+    """
+    Agregados, índice de archivados y política de retención de un
+    directorio de pings. Como HistorialResultados, cada hilo usa su propia
+    conexión a la base (modo WAL), de modo que las consultas no esperan a
+    la compactación.
+    """
+
+    def __init__(self, directorio=DIRECTORIO):
+        self.directorio = directorio
+        self.directorio_archivo = os.path.join(directorio, SUBDIRECTORIO_ARCHIVO)
+        self.ruta = os.path.join(directorio, NOMBRE_BASE)
+        os.makedirs(directorio, exist_ok=True)
+        self._local = threading.local()
+        self._conexiones = []
+        self._lock = threading.Lock()
+        conexion = self._conexion()
+        # Solo tiene efecto al crear la base: permite devolver al disco lo podado
+        conexion.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.executescript(ESQUEMA)
+        existentes = {fila['name'] for fila in conexion.execute("PRAGMA table_info(procesados)")}
+        for columna, tipo in _COLUMNAS_PROCESADOS.items():
+            if columna not in existentes:
+                conexion.execute(f"ALTER TABLE procesados ADD COLUMN {columna} {tipo}")
+        conexion.commit()
+
+    def _conexion(self):
+        """Conexión del hilo actual, creándola la primera vez"""
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=30, check_same_thread=False)
+            conexion.row_factory = sqlite3.Row
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+            with self._lock:
+                self._conexiones.append(conexion)
+        return conexion
+
+    def _relativa(self, ruta):
+        return os.path.relpath(ruta, self.directorio).replace(os.sep, '/')
+
+    def _crudos(self):
+        """Rutas de los crudos de pings/ (sin entrar al subdirectorio de archivados)"""
+        for ruta in recorrer_archivos(self.directorio):
+            if not self._relativa(ruta).startswith(SUBDIRECTORIO_ARCHIVO + '/'):
+                yield ruta
+
+    # Agregados
+
+    def agregar_pendientes(self):
+        """
+        Resumir los crudos que todavía no están en los agregados y los
+        registros nuevos de los binarios ya vistos. Un crudo que no se puede
+        interpretar se marca como fallido: no se reintenta y la compactación
+        lo archiva tal como está.
+
+        Retorna:
+        - int: Cantidad de archivos incorporados
+        """
+        return self._agregar_pendientes()[0]
+
+    def _agregar_pendientes(self):
+        """Como agregar_pendientes; retorna la tupla (incorporados, fallidos)"""
+        with span('retencion_agregar'):
+            conexion = self._conexion()
+            procesados = {fila['ruta']: fila for fila in conexion.execute("SELECT * FROM procesados")}
+            # Un crudo ya archivado cuyo borrado se interrumpió no se vuelve a sumar
+            archivados = {fila['ruta'] for fila in conexion.execute("SELECT ruta FROM archivados")}
+            incorporados = fallidos = 0
+            for ruta in self._crudos():
+                relativa = self._relativa(ruta)
+                procesado = procesados.get(relativa)
+                if relativa in archivados or (procesado is not None and
+                                              (procesado['fallido'] or ruta.endswith('.txt'))):
+                    continue
+                try:
+                    if self._agregar_archivo(ruta, procesado):
+                        incorporados += 1
+                except ValueError:
+                    self._marcar_fallido(ruta)
+                    fallidos += 1
+                except OSError:
+                    # Puede ser pasajero (archivo bloqueado): se reintenta en la próxima pasada
+                    continue
+            contar('retencion_agregados', incorporados)
+            contar('retencion_fallidos', fallidos)
+            return incorporados, fallidos
+
+    def _marcar_fallido(self, ruta):
+        """Registrar un crudo que no se pudo interpretar (su fecha es la de modificación)"""
+        conexion = self._conexion()
+        with conexion:
+            conexion.execute(
+                "INSERT INTO procesados (ruta, inicio, fallido) VALUES (?, ?, 1) "
+                "ON CONFLICT (ruta) DO UPDATE SET fallido = 1, "
+                "inicio = COALESCE(procesados.inicio, excluded.inicio)",
+                (self._relativa(ruta), os.path.getmtime(ruta)))
+
+    def _agregar_archivo(self, ruta, procesado):
+        """Incorporar un crudo retomando su fila de procesados (None si es la primera vez)"""
+        if ruta.endswith('.bin'):
+            if procesado is None:
+                return self._agregar_registro(ruta, 0, {})
+            return self._agregar_registro(ruta, procesado['registros'],
+                                          json.loads(procesado['estado'] or '{}'))
+        return self._agregar_texto(ruta)
+
+    def _agregar_texto(self, ruta):
+        nombre = os.path.basename(ruta)
+        match = PATRON_NOMBRE.match(nombre)
+        if match:
+            ip = match.group(1)
+            inicio = datetime.strptime(match.group(2), '%Y%m%d-%H%M%S').timestamp()
+        else:
+            ip = os.path.splitext(nombre)[0]
+            inicio = os.path.getmtime(ruta)
+
+        importado = importar_archivo(ruta, histograma=HistogramaLatencias())
+        agregado = Agregado.desde_importador(importado)
+        # La serie (1 ping por segundo) se asigna entera al minuto en que empezó
+        parciales = {(ip, int(inicio // 60) * 60): agregado} if agregado.enviados else {}
+        self._guardar(parciales, self._relativa(ruta), 0, ip, inicio, inicio + agregado.enviados)
+        return True
+
+    def _agregar_registro(self, ruta, desde, anteriores):
+        """
+        Incorporar los registros nuevos de un binario. anteriores tiene la
+        última respuesta de cada IP en la pasada anterior (None si su serie
+        iba en un perdido o recién empezaba), para no perder el par de
+        jitter que cruza el límite entre pasadas.
+        """
+        parciales = {}
+        anteriores = dict(anteriores)
+        inicio = fin = None
+        with LectorRegistro(ruta) as lector:
+            cantidad = len(lector)
+            if cantidad <= desde:
+                return False
+            objetivos = lector.objetivos
+            desfase = lector.ancla_pared_ns - lector.ancla_monotonica_ns
+            for objetivo, secuencia, timestamp_ns, rtt_ms, perdido in lector.registros(desde):
+                instante = (timestamp_ns + desfase) / 1e9
+                if inicio is None:
+                    inicio = instante
+                fin = instante
+                ip = objetivos.get(objetivo, str(objetivo))
+                clave = (ip, int(instante // 60) * 60)
+                agregado = parciales.get(clave)
+                if agregado is None:
+                    agregado = parciales[clave] = Agregado()
+                if secuencia == 1:
+                    # Serie nueva: el jitter no se mide contra la serie anterior
+                    anteriores[ip] = None
+                latencia = None if perdido else rtt_ms
+                agregado.agregar(latencia, anteriores.get(ip))
+                if latencia is not None:
+                    anteriores[ip] = latencia
+        self._guardar(parciales, self._relativa(ruta), cantidad, None, inicio, fin,
+                      json.dumps(anteriores, separators=(',', ':')))
+        return True
+
+    def _guardar(self, parciales, relativa, registros, ip, inicio, fin, estado=None):
+        """Combinar los agregados parciales de un archivo y marcarlo procesado, en una transacción"""
+        conexion = self._conexion()
+        with conexion:
+            por_tabla = {'agregados_minuto': parciales, 'agregados_hora': {}}
+            for (ip_parcial, minuto), agregado in parciales.items():
+                clave = (ip_parcial, minuto // 3600 * 3600)
+                hora = por_tabla['agregados_hora'].get(clave)
+                if hora is None:
+                    hora = por_tabla['agregados_hora'][clave] = Agregado()
+                hora.combinar(agregado)
+
+            for tabla, agregados in por_tabla.items():
+                filas = []
+                for (ip_parcial, inicio_parcial), agregado in agregados.items():
+                    existente = conexion.execute(
+                        f"SELECT * FROM {tabla} WHERE ip = ? AND inicio = ?",
+                        (ip_parcial, inicio_parcial)).fetchone()
+                    if existente is not None:
+                        combinado = Agregado.desde_fila(existente)
+                        combinado.combinar(agregado)
+                        agregado = combinado
+                    filas.append(agregado.fila(ip_parcial, inicio_parcial))
+                conexion.executemany(
+                    f"INSERT OR REPLACE INTO {tabla} ({', '.join(_COLUMNAS)}) "
+                    f"VALUES ({', '.join('?' for _ in _COLUMNAS)})", filas)
+
+            # En los binarios se conserva el inicio de la primera pasada
+            conexion.execute(
+                "INSERT INTO procesados (ruta, registros, ip, inicio, fin, estado) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (ruta) DO UPDATE SET registros = excluded.registros, "
+                "inicio = COALESCE(procesados.inicio, excluded.inicio), "
+                "fin = COALESCE(excluded.fin, procesados.fin), estado = excluded.estado",
+                (relativa, registros, ip, inicio, fin, estado))
+
+    # Compactación
+
+    def _compactables(self, limite, ahora):
+        """Crudos modificados antes de limite que no están en uso, del más viejo al más nuevo"""
+        candidatos = []
+        for ruta in self._crudos():
+            try:
+                modificado = os.path.getmtime(ruta)
+            except OSError:
+                continue
+            if modificado > limite or ahora - modificado < INACTIVIDAD:
+                continue
+            if ruta.endswith('.bin') and _pid_registro(os.path.basename(ruta)) == os.getpid():
+                continue
+            candidatos.append((modificado, ruta))
+        candidatos.sort()
+        return [ruta for _, ruta in candidatos]
+
+    def compactar(self, rutas):
+        """
+        Guardar crudos en los zip diarios de pings/archivo/, indexarlos y
+        borrarlos. Cada crudo se agrega antes a los agregados si hacía falta;
+        los que no se pueden interpretar se archivan igual, sin agregados.
+
+        Parámetros:
+        - rutas: Rutas de los crudos a compactar
+
+        Retorna:
+        - int: Cantidad de crudos compactados
+        """
+        if not rutas:
+            return 0
+        with span('retencion_compactar'):
+            conexion = self._conexion()
+            procesados = {fila['ruta']: fila for fila in
+                          conexion.execute("SELECT * FROM procesados")}
+            archivados = {fila['ruta']: fila for fila in
+                          conexion.execute("SELECT ruta, ip, inicio, fin FROM archivados")}
+            por_contenedor = {}
+            for ruta in rutas:
+                relativa = self._relativa(ruta)
+                # Ya archivado en una pasada cortada antes del borrado: solo falta borrarlo
+                fila = archivados.get(relativa) or procesados.get(relativa)
+                try:
+                    if relativa not in archivados and (fila is None or (ruta.endswith('.bin') and
+                                                                        not fila['fallido'])):
+                        try:
+                            self._agregar_archivo(ruta, fila)
+                        except ValueError:
+                            self._marcar_fallido(ruta)
+                        fila = conexion.execute("SELECT * FROM procesados WHERE ruta = ?",
+                                                (relativa,)).fetchone()
+                    inicio = fila['inicio'] if fila and fila['inicio'] is not None \
+                        else os.path.getmtime(ruta)
+                except (OSError, ValueError):
+                    continue
+                contenedor = _fecha_contenedor(inicio) + '.zip'
+                por_contenedor.setdefault(contenedor, []).append((ruta, relativa, fila, inicio))
+
+            os.makedirs(self.directorio_archivo, exist_ok=True)
+            compactados = 0
+            for contenedor, archivos in sorted(por_contenedor.items()):
+                compactados += self._compactar_contenedor(contenedor, archivos)
+            contar('retencion_compactados', compactados)
+            return compactados
+
+    def _compactar_contenedor(self, contenedor, archivos):
+        # Orden seguro ante cortes: zip cerrado, índice confirmado y recién
+        # entonces se borra el original (al reintentar no se duplica en el zip)
+        filas = []
+        borrar = []
+        with zipfile.ZipFile(os.path.join(self.directorio_archivo, contenedor), 'a',
+                             compression=zipfile.ZIP_DEFLATED) as zf:
+            existentes = set(zf.namelist())
+            for ruta, relativa, fila, inicio in archivos:
+                miembros = [(ruta, relativa)]
+                lateral = ruta + '.objetivos'
+                if ruta.endswith('.bin') and os.path.exists(lateral):
+                    miembros.append((lateral, relativa + '.objetivos'))
+                try:
+                    for origen, miembro in miembros:
+                        if miembro not in existentes:
+                            zf.write(origen, miembro)
+                    tamano = os.path.getsize(ruta)
+                except OSError:
+                    continue
+                filas.append((relativa, contenedor, fila['ip'] if fila else None, inicio,
+                              fila['fin'] if fila else None, tamano))
+                borrar.extend(origen for origen, _ in miembros)
+
+        conexion = self._conexion()
+        with conexion:
+            conexion.executemany(
+                "INSERT OR REPLACE INTO archivados (ruta, contenedor, ip, inicio, fin, tamano) "
+                "VALUES (?, ?, ?, ?, ?, ?)", filas)
+            conexion.executemany("DELETE FROM procesados WHERE ruta = ?",
+                                 [(fila[0],) for fila in filas])
+        for ruta in borrar:
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+        return len(filas)
+
+    # Retención
+
+    def uso_disco(self):
+        """Bytes ocupados por pings/ (crudos, zip y base de agregados)"""
+        total = 0
+        pendientes = [self.directorio]
+        while pendientes:
+            try:
+                with os.scandir(pendientes.pop()) as entradas:
+                    for entrada in entradas:
+                        if entrada.is_dir(follow_symlinks=False):
+                            pendientes.append(entrada.path)
+                        else:
+                            total += entrada.stat(follow_symlinks=False).st_size
+            except OSError:
+                continue
+        return total
+
+    def _contenedores(self):
+        """Nombres de los zip de archivados, del más viejo al más nuevo"""
+        try:
+            return sorted(nombre for nombre in os.listdir(self.directorio_archivo)
+                          if nombre.endswith('.zip'))
+        except FileNotFoundError:
+            return []
+
+    def _borrar_contenedor(self, contenedor):
+        try:
+            os.remove(os.path.join(self.directorio_archivo, contenedor))
+        except FileNotFoundError:
+            pass
+        conexion = self._conexion()
+        with conexion:
+            conexion.execute("DELETE FROM archivados WHERE contenedor = ?", (contenedor,))
+
+    def aplicar(self, dias_crudos=DIAS_CRUDOS, dias_archivo=DIAS_ARCHIVO, dias_minuto=DIAS_MINUTO,
+                dias_hora=DIAS_HORA, max_mb=None, ahora=None):
+        """
+        Aplicar la política completa: agregar, compactar y borrar lo vencido.
+
+        Parámetros:
+        - dias_crudos: Días que se conservan los crudos sin compactar (default: 7)
+        - dias_archivo: Días que se conservan los zip de crudos (default: 90)
+        - dias_minuto: Días de agregados por minuto (default: 30)
+        - dias_hora: Días de agregados por hora (default: 730)
+        - max_mb: Tamaño máximo de pings/ en MB o None sin límite (default: None)
+        - ahora: Epoch de referencia (default: ahora)
+
+        Retorna:
+        - dict con agregados, fallidos, compactados, contenedores_borrados,
+          filas_borradas y bytes
+        """
+        ahora = time.time() if ahora is None else ahora
+        resumen = dict(zip(('agregados', 'fallidos'), self._agregar_pendientes()))
+        resumen['compactados'] = self.compactar(
+            self._compactables(ahora - dias_crudos * 86400, ahora))
+
+        limite_archivo = _fecha_contenedor(ahora - dias_archivo * 86400) + '.zip'
+        vencidos = [contenedor for contenedor in self._contenedores() if contenedor < limite_archivo]
+        for contenedor in vencidos:
+            self._borrar_contenedor(contenedor)
+        resumen['contenedores_borrados'] = len(vencidos)
+
+        conexion = self._conexion()
+        with conexion:
+            filas = conexion.execute("DELETE FROM agregados_minuto WHERE inicio < ?",
+                                     (ahora - dias_minuto * 86400,)).rowcount
+            filas += conexion.execute("DELETE FROM agregados_hora WHERE inicio < ?",
+                                      (ahora - dias_hora * 86400,)).rowcount
+        resumen['filas_borradas'] = filas
+        conexion.execute("PRAGMA incremental_vacuum")
+        conexion.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        if max_mb is not None:
+            self._ajustar_tamano(int(max_mb * 1024 * 1024), ahora, resumen)
+        resumen['bytes'] = self.uso_disco()
+        return resumen
+
+    def _ajustar_tamano(self, max_bytes, ahora, resumen):
+        """Compactar crudos y luego borrar zip, de los más viejos, hasta entrar en max_bytes"""
+        if self.uso_disco() <= max_bytes:
+            return
+        candidatos = self._compactables(ahora, ahora)
+        for desde in range(0, len(candidatos), TANDA_COMPACTACION):
+            resumen['compactados'] += self.compactar(candidatos[desde:desde + TANDA_COMPACTACION])
+            if self.uso_disco() <= max_bytes:
+                return
+        for contenedor in self._contenedores():
+            self._borrar_contenedor(contenedor)
+            resumen['contenedores_borrados'] += 1
+            if self.uso_disco() <= max_bytes:
+                return
+
+    # Consultas
+
+    def consultar(self, ip, desde=None, hasta=None, resolucion='minuto'):
+        """
+        Agregados de un objetivo en un rango de tiempo, en orden cronológico.
+
+        Parámetros:
+        - ip: Dirección IP del objetivo
+        - desde: Epoch inicial inclusive (default: sin límite)
+        - hasta: Epoch final inclusive (default: sin límite)
+        - resolucion: 'minuto' u 'hora' (default: 'minuto')
+
+        Retorna:
+        - list de dicts con inicio, enviados, perdidos, recibidos, latencia,
+          jitter, perdida, mos, minimo, maximo, p50, p95 y p99
+        """
+        return [dict(agregado.como_dict(), inicio=inicio)
+                for inicio, agregado in self._agregados(ip, desde, hasta, resolucion)]
+
+    def resumen(self, ip, desde=None, hasta=None, resolucion='hora'):
+        """
+        Agregado único de un objetivo en un rango, combinando los intervalos.
+
+        Retorna:
+        - dict como los de consultar (sin inicio) o None si no hay datos
+        """
+        total = Agregado()
+        for _, agregado in self._agregados(ip, desde, hasta, resolucion):
+            total.combinar(agregado)
+        return total.como_dict() if total.enviados else None
+
+    def _agregados(self, ip, desde, hasta, resolucion):
+        tabla, duracion = RESOLUCIONES[resolucion]
+        sql = f"SELECT * FROM {tabla} WHERE ip = ?"
+        parametros = [ip]
+        if desde is not None:
+            # Incluir el intervalo que contiene a desde
+            sql += " AND inicio > ?"
+            parametros.append(desde - duracion)
+        if hasta is not None:
+            sql += " AND inicio <= ?"
+            parametros.append(hasta)
+        sql += " ORDER BY inicio"
+        for fila in self._conexion().execute(sql, parametros):
+            yield fila['inicio'], Agregado.desde_fila(fila)
+
+    def buscar_archivados(self, ip=None, desde=None, hasta=None):
+        """
+        Crudos compactados que pueden contener muestras de un objetivo en un
+        rango (los registros binarios tienen varias IPs y siempre se incluyen).
+
+        Retorna:
+        - list de dicts con ruta, contenedor, ip, inicio, fin y tamano
+        """
+        sql = "SELECT * FROM archivados WHERE 1 = 1"
+        parametros = []
+        if ip is not None:
+            sql += " AND (ip = ? OR ip IS NULL)"
+            parametros.append(ip)
+        if desde is not None:
+            sql += " AND COALESCE(fin, inicio) >= ?"
+            parametros.append(desde)
+        if hasta is not None:
+            sql += " AND inicio <= ?"
+            parametros.append(hasta)
+        sql += " ORDER BY inicio"
+        return [dict(fila) for fila in self._conexion().execute(sql, parametros)]
+
+    def leer_archivado(self, ruta):
+        """
+        Contenido original de un crudo compactado.
+
+        Parámetros:
+        - ruta: Ruta relativa a pings/ (la columna ruta de buscar_archivados)
+
+        Retorna:
+        - bytes o None si no está archivado
+        """
+        fila = self._conexion().execute("SELECT contenedor FROM archivados WHERE ruta = ?",
+                                        (ruta,)).fetchone()
+        if fila is None:
+            return None
+        try:
+            with zipfile.ZipFile(os.path.join(self.directorio_archivo, fila['contenedor'])) as zf:
+                return zf.read(ruta)
+        except (OSError, KeyError, zipfile.BadZipFile):
+            return None
+
+    def extraer_archivado(self, ruta, destino):
+        """
+        Extraer un crudo compactado (y su .objetivos si es un registro
+        binario) para abrirlo con las herramientas de siempre.
+
+        Retorna:
+        - str con la ruta extraída o None si no está archivado
+        """
+        fila = self._conexion().execute("SELECT contenedor FROM archivados WHERE ruta = ?",
+                                        (ruta,)).fetchone()
+        if fila is None:
+            return None
+        try:
+            with zipfile.ZipFile(os.path.join(self.directorio_archivo, fila['contenedor'])) as zf:
+                miembros = [ruta]
+                if ruta + '.objetivos' in zf.namelist():
+                    miembros.append(ruta + '.objetivos')
+                for miembro in miembros:
+                    zf.extract(miembro, destino)
+        except (OSError, KeyError, zipfile.BadZipFile):
+            return None
+        return os.path.join(destino, *ruta.split('/'))
+
+    def cerrar(self):
+        with self._lock:
+            for conexion in self._conexiones:
+                conexion.close()
+            self._conexiones = []
+        self._local = threading.local()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retención, agregados y compactación de pings/")
+    parser.add_argument('directorio', nargs='?', default=DIRECTORIO,
+                        help="Directorio de pings (default: pings)")
+    parser.add_argument('--dias-crudos', type=float, default=DIAS_CRUDOS,
+                        help=f"Días antes de compactar los crudos (default: {DIAS_CRUDOS})")
+    parser.add_argument('--dias-archivo', type=float, default=DIAS_ARCHIVO,
+                        help=f"Días que se conservan los zip de crudos (default: {DIAS_ARCHIVO})")
+    parser.add_argument('--dias-minuto', type=float, default=DIAS_MINUTO,
+                        help=f"Días de agregados por minuto (default: {DIAS_MINUTO})")
+    parser.add_argument('--dias-hora', type=float, default=DIAS_HORA,
+                        help=f"Días de agregados por hora (default: {DIAS_HORA})")
+    parser.add_argument('--max-mb', type=float, default=None,
+                        help="Tamaño máximo del directorio en MB (default: sin límite)")
+    parser.add_argument('--solo-agregar', action='store_true',
+                        help="Solo actualizar los agregados, sin compactar ni borrar")
+    parser.add_argument('--consultar', default=None, metavar='IP',
+                        help="Mostrar los agregados de una IP como JSON por línea y salir")
+    parser.add_argument('--resolucion', choices=sorted(RESOLUCIONES), default='minuto',
+                        help="Resolución de --consultar (default: minuto)")
+    parser.add_argument('--horas', type=float, default=24,
+                        help="Horas hacia atrás de --consultar (default: 24)")
+    args = parser.parse_args()
+
+    almacen = AlmacenRetencion(args.directorio)
+    try:
+        if args.consultar:
+            for fila in almacen.consultar(args.consultar, desde=time.time() - args.horas * 3600,
+                                          resolucion=args.resolucion):
+                print(json.dumps(fila, ensure_ascii=False))
+            return 0
+        if args.solo_agregar:
+            print(f"Archivos agregados: {almacen.agregar_pendientes()}", file=sys.stderr)
+            return 0
+        resumen = almacen.aplicar(args.dias_crudos, args.dias_archivo, args.dias_minuto,
+                                  args.dias_hora, args.max_mb)
+    finally:
+        almacen.cerrar()
+    print(f"Agregados: {resumen['agregados']}, fallidos: {resumen['fallidos']}, "
+          f"compactados: {resumen['compactados']}, "
+          f"zip borrados: {resumen['contenedores_borrados']}, "
+          f"filas borradas: {resumen['filas_borradas']}, "
+          f"tamaño: {resumen['bytes'] / 1024 / 1024:.1f} MB", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,540 @@
+"""
+servicio.py
+Servicio sin interfaz gráfica para monitoreo MOS (no importa tkinter)
+
+Ejecuta barridos de todas las IPs de config.json cada 'intervalo_barrido'
+segundos y escribe un resultado JSON por línea en stdout o en un archivo.
+Pensado para correr bajo systemd o en contenedores mínimos:
+
+    python servicio.py --config /etc/mos/config.json --salida /var/log/mos.jsonl
+
+Con --continuo cada IP se sondea sin pausa según su 'intervalo' en
+config.json, con un presupuesto global de 'pps_max' paquetes por segundo, y
+se emite el MOS de una ventana deslizante cada --cadencia segundos.
+
+Con --rutas, después de cada barrido se revisa la ruta de cada IP: el
+traceroute solo se repite si cambió el TTL de sus echo replies o si la ruta
+guardada venció, y cada cambio de ruta se escribe como una línea JSON con
+"tipo": "cambio_ruta" (y en el historial).
+
+Con --monitor-ruta (o "monitor_ruta": true en config.json) se monitorea
+además, estilo MTR, cada salto de la ruta hacia cada IP (ver monitor_ruta.py)
+con un presupuesto de 'pps_rutas' paquetes por segundo, y después de cada
+barrido (o cada --cadencia segundos en modo continuo) se escribe una línea
+JSON por destino con "tipo": "ruta", las métricas de cada salto y el salto
+donde empieza la degradación. En modo continuo los saltos comparten el
+planificador de las IPs.
+
+Con --simular N se reemplazan las IPs de config.json por N objetivos de la
+red simulada de red_simulada.py (--semilla elige la topología), para pruebas
+de carga sin red ni privilegios.
+
+Con --traza ARCHIVO se activa la instrumentación: cada barrido (o cada
+--cadencia segundos en modo continuo) registra en el log p50/p99 por etapa,
+sondeos por segundo y bytes escritos, y al terminar se exportan los spans
+en formato Chrome trace (chrome://tracing, Perfetto).
+
+Con --metricas PUERTO se sirven los últimos resultados en formato
+OpenMetrics/Prometheus en http://<host>:PUERTO/metrics.
+
+Con --retencion se aplica en segundo plano, cada 'intervalo' segundos de la
+sección "retencion" de config.json, la política de retencion.py sobre
+pings/: agregados por minuto y hora, compactación de los crudos viejos en
+zip diarios y borrado de lo vencido o de lo que exceda 'max_mb'. Las
+claves válidas son intervalo, dias_crudos, dias_archivo, dias_minuto,
+dias_hora y max_mb; cualquier otra impide arrancar el servicio.
+
+Los objetivos salen de "ips" en config.json o, para inventarios grandes, del
+CSV/JSON indicado en "inventario" (ver inventario.py), con grupo y etiquetas
+por objetivo. config.json y el inventario se vigilan (salvo con
+--sin-vigilancia) y se recargan al cambiar: en modo continuo solo se
+programan los objetivos nuevos y se cancelan los quitados, sin interrumpir
+los sondeos en curso de los demás.
+
+Señales: SIGTERM/SIGINT terminan después del barrido en curso (una segunda
+señal termina de inmediato); SIGHUP recarga config.json antes del próximo barrido.
+"""
+
+import argparse
+import json
+import logging
+import signal
+import sys
+import threading
+import time
+
+from configuracion import leer_configuracion, RUTA_CONFIGURACION
+from inventario import cargar_objetivos, ruta_inventario, contar_grupos, ips_repetidas, VigilanteArchivos
+from mos_functions import analizar_ips, MAX_CONCURRENCIA
+from historial import HistorialResultados
+from monitor_continuo import MonitorObjetivos
+from planificador import PPS_MAX
+from cache_rutas import CacheRutas, VIGENCIA_RUTA
+from monitor_ruta import MonitorRutas, PPS_RUTAS
+from exportador_metricas import ExportadorMetricas
+from motor_icmp import establecer_motor
+import instrumentacion
+from red_simulada import MotorSimulado, RedSimulada, objetivos_simulados
+from retencion import AlmacenRetencion
+
+
+INTERVALO_BARRIDO = 300
+INTERVALO_RETENCION = 3600
+
+# Claves aceptadas en la sección "retencion" de config.json (max_mb admite null)
+CLAVES_RETENCION = ('intervalo', 'dias_crudos', 'dias_archivo', 'dias_minuto', 'dias_hora', 'max_mb')
+
+log = logging.getLogger('mos.servicio')
+
+
+def politica_retencion(config):
+    """
+    Validar la sección "retencion" de la configuración.
+
+    Retorna:
+    - tupla (intervalo, dict de argumentos para AlmacenRetencion.aplicar)
+
+    Lanza ValueError si hay claves desconocidas o valores que no son
+    números positivos
+    """
+    politica = dict(config.get('retencion') or {})
+    desconocidas = sorted(politica.keys() - set(CLAVES_RETENCION))
+    if desconocidas:
+        raise ValueError(f"Claves desconocidas en \"retencion\": {', '.join(desconocidas)} "
+                         f"(válidas: {', '.join(CLAVES_RETENCION)})")
+    for clave, valor in politica.items():
+        if valor is None and clave == 'max_mb':
+            continue
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)) or valor <= 0:
+            raise ValueError(f"\"retencion\".{clave} debe ser un número positivo ({valor!r})")
+    intervalo = politica.pop('intervalo', INTERVALO_RETENCION)
+    return intervalo, politica
+
+
+class ServicioMOS:
+    """Bucle de barridos programados con manejo de señales"""
+
+    def __init__(self, ruta_config=RUTA_CONFIGURACION, salida='-', intervalo=None, historial=True,
+                 rutas=False, puerto_metricas=None, simulados=None, semilla=0, traza=None,
+                 retencion=False, vigilar=True, monitor_ruta=False):
+        self.ruta_config = ruta_config
+        self.salida = salida
+        self.intervalo_forzado = intervalo
+        self.usar_historial = historial
+        self.usar_rutas = rutas
+        self.config = None
+        self.historial = None
+        self.rutas = None
+        self.puerto_metricas = puerto_metricas
+        self.exportador = None
+        self.simulados = simulados
+        self.traza = traza
+        self.usar_retencion = retencion
+        self.usar_vigilancia = vigilar
+        self.vigilante = None
+        self._hilo_retencion = None
+        self.usar_monitor_ruta = monitor_ruta
+        self.monitor_rutas = None
+        self._rutas_pendientes = threading.Event()
+        if traza:
+            instrumentacion.activar()
+        if simulados:
+            establecer_motor(MotorSimulado(RedSimulada(semilla)))
+        self._detener = threading.Event()
+        self._recargar = threading.Event()
+        self._archivo = None
+        self._lock = threading.Lock()
+
+    def cargar_configuracion(self):
+        """Leer config.json y el inventario; si falla se mantiene la configuración anterior"""
+        try:
+            config = leer_configuracion(self.ruta_config)
+            if self.simulados:
+                config['ips'] = objetivos_simulados(self.simulados)
+            else:
+                config['ips'] = cargar_objetivos(config, self.ruta_config)
+            if self.usar_retencion:
+                # Una política inválida se rechaza al cargar, no en cada pasada
+                politica_retencion(config)
+        except Exception as e:
+            if self.config is None:
+                raise
+            log.error("No se pudo recargar %s: %s", self.ruta_config, e)
+            return
+        self.config = config
+        self._rutas_pendientes.set()
+        if self.exportador:
+            # Los objetivos quitados del inventario dejan de exportarse
+            self.exportador.conservar(objetivo['ip'] for objetivo in config['ips'])
+        grupos = contar_grupos(config['ips'])
+        log.info("Configuración cargada: %d IPs en %d grupos", len(config['ips']),
+                 len(grupos.keys() - {None}))
+
+        if self.usar_vigilancia:
+            rutas = [self.ruta_config, ruta_inventario(config, self.ruta_config)]
+            if self.vigilante is None:
+                self.vigilante = VigilanteArchivos(rutas)
+            else:
+                self.vigilante.establecer(rutas)
+
+        # Mismo archivo por defecto que la interfaz gráfica (main.py); "historial": null lo desactiva
+        ruta_historial = config.get('historial', 'historial.db')
+        if self.usar_historial and self.historial is None and ruta_historial:
+            try:
+                self.historial = HistorialResultados(ruta_historial)
+            except Exception as e:
+                log.error("No se pudo abrir el historial: %s", e)
+
+        if self.usar_rutas and self.rutas is None:
+            self.rutas = CacheRutas(vigencia=config.get('vigencia_rutas', VIGENCIA_RUTA),
+                                    historial=self.historial, al_cambio=self._al_cambio_ruta)
+
+    @property
+    def intervalo(self):
+        if self.intervalo_forzado is not None:
+            return self.intervalo_forzado
+        return self.config.get('intervalo_barrido', INTERVALO_BARRIDO)
+
+    def instalar_senales(self):
+        def terminar(signum, frame):
+            if self._detener.is_set():
+                # Segunda señal: salir sin esperar el barrido en curso
+                raise SystemExit(128 + signum)
+            log.info("Señal %d recibida, terminando al finalizar el barrido", signum)
+            self._detener.set()
+
+        def recargar(signum, frame):
+            self._recargar.set()
+
+        signal.signal(signal.SIGTERM, terminar)
+        signal.signal(signal.SIGINT, terminar)
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, recargar)
+
+    def escribir(self, resultado):
+        """Escribir un resultado como una línea JSON"""
+        resultado.setdefault('timestamp', time.time())
+        with self._lock:
+            self._archivo.write(json.dumps(resultado, ensure_ascii=False) + '\n')
+            self._archivo.flush()
+
+    def publicar(self, resultado):
+        """Escribir un resultado y pasarlo al exportador de métricas si está activo"""
+        self.escribir(resultado)
+        if self.exportador:
+            self.exportador.agregar(resultado)
+
+    def iniciar_exportador(self):
+        if self.puerto_metricas is None or self.exportador is not None:
+            return
+        try:
+            self.exportador = ExportadorMetricas(self.puerto_metricas).iniciar()
+            log.info("Métricas OpenMetrics en el puerto %d", self.exportador.puerto)
+        except OSError as e:
+            log.error("No se pudo iniciar el exportador de métricas: %s", e)
+
+    def detener_exportador(self):
+        if self.exportador:
+            self.exportador.detener()
+            self.exportador = None
+
+    def iniciar_retencion(self):
+        if not self.usar_retencion or self._hilo_retencion is not None:
+            return
+        self._hilo_retencion = threading.Thread(target=self._bucle_retencion,
+                                                name='mos-retencion', daemon=True)
+        self._hilo_retencion.start()
+
+    def _bucle_retencion(self):
+        """Aplicar la política de retención de pings/ hasta que se detenga el servicio"""
+        try:
+            almacen = AlmacenRetencion()
+        except Exception as e:
+            log.error("No se pudo abrir la base de agregados: %s", e)
+            return
+        try:
+            while not self._detener.is_set():
+                intervalo, politica = politica_retencion(self.config)
+                try:
+                    resumen = almacen.aplicar(**politica)
+                    log.info("Retención: %d agregados, %d fallidos, %d compactados, %d zip borrados, "
+                             "%.1f MB", resumen['agregados'], resumen['fallidos'], resumen['compactados'],
+                             resumen['contenedores_borrados'], resumen['bytes'] / 1024 / 1024)
+                except Exception as e:
+                    log.error("No se pudo aplicar la retención: %s", e)
+                self._detener.wait(intervalo)
+        finally:
+            almacen.cerrar()
+
+    def iniciar_monitor_rutas(self, planificador=None):
+        """
+        Monitorear los saltos de la ruta hacia cada IP si está habilitado por
+        parámetro o en config.json.
+
+        Parámetros:
+        - planificador: PlanificadorSondeos en ejecución a compartir (default: None = uno propio)
+        """
+        if self.monitor_rutas is not None:
+            return
+        if not (self.usar_monitor_ruta or self.config.get('monitor_ruta')):
+            return
+        self.monitor_rutas = MonitorRutas(pps_max=self.config.get('pps_rutas', PPS_RUTAS),
+                                          planificador=planificador)
+        if planificador is None:
+            self.monitor_rutas.iniciar()
+        self._rutas_pendientes.set()
+        threading.Thread(target=self._bucle_monitor_rutas, name='mos-monitor-ruta', daemon=True).start()
+
+    def detener_monitor_rutas(self):
+        if self.monitor_rutas:
+            self.monitor_rutas.detener()
+            self.monitor_rutas = None
+
+    def _bucle_monitor_rutas(self):
+        """Descubrir las rutas de las IPs nuevas y dejar las quitadas cada vez que cambia la configuración"""
+        monitor = self.monitor_rutas
+        while not self._detener.is_set():
+            if not self._rutas_pendientes.wait(1.0):
+                continue
+            self._rutas_pendientes.clear()
+            objetivos = {objetivo['ip']: objetivo['nombre'] for objetivo in self.config.get('ips', [])}
+            for destino in set(monitor.rutas) - objetivos.keys():
+                monitor.quitar(destino)
+            for ip, nombre in objetivos.items():
+                # Una recarga a mitad de camino vuelve a empezar con los objetivos nuevos
+                if self._detener.is_set() or self._rutas_pendientes.is_set():
+                    break
+                if ip not in monitor.rutas and monitor.agregar(ip, nombre) is None:
+                    log.warning("No se pudo obtener la ruta hacia %s", ip)
+
+    def escribir_rutas(self):
+        """Escribir el estado por salto de cada ruta monitoreada como una línea JSON por destino"""
+        if self.monitor_rutas is None:
+            return
+        for destino, ruta in self.monitor_rutas.resumen().items():
+            degradado = self.monitor_rutas.salto_degradado(destino)
+            self.escribir({
+                'tipo': 'ruta',
+                'destino': destino,
+                'nombre': ruta['nombre'],
+                'saltos': ruta['saltos'],
+                'salto_degradado': degradado['hop'] if degradado else None
+            })
+
+    def revisar_cambios(self):
+        """Pedir una recarga si config.json o el inventario cambiaron en disco"""
+        if self.vigilante is not None and self.vigilante.cambio():
+            log.info("Cambios en la configuración detectados, recargando")
+            self._recargar.set()
+
+    def _al_cambio_ruta(self, evento):
+        log.info("Cambio de ruta hacia %s (%s)", evento['destino'], evento['motivo'])
+        self.escribir(dict(evento, tipo='cambio_ruta'))
+
+    def barrido(self):
+        """Analizar todas las IPs configuradas una vez"""
+        inicio = time.monotonic()
+        instrumentacion.iniciar_barrido()
+        objetivos = self.config.get('ips', [])
+        resultados = analizar_ips(objetivos, self.config['cantidad_pings'],
+                                  max_concurrencia=self.config.get('max_concurrencia', MAX_CONCURRENCIA),
+                                  pps_max=self.config.get('pps_max', PPS_MAX),
+                                  al_progreso=lambda objetivo, resultado, completados, total:
+                                      self.publicar(resultado))
+        if self.historial:
+            try:
+                self.historial.guardar(resultados)
+            except Exception as e:
+                log.error("No se pudo guardar el historial: %s", e)
+        if self.rutas:
+            traceroutes = self.rutas.actualizar(resultados)
+            log.info("Rutas revisadas: %d traceroutes, %d en caché", traceroutes, len(self.rutas))
+        errores = sum(1 for resultado in resultados if resultado.get('error'))
+        log.info("Barrido completo: %d IPs, %d con error, %.1f s",
+                 len(resultados), errores, time.monotonic() - inicio)
+        if self.traza:
+            self.registrar_resumen_traza()
+        return resultados
+
+    def registrar_resumen_traza(self):
+        resumen = instrumentacion.resumen_barrido()
+        log.info("Traza: %.0f sondeos/s, %d bytes escritos",
+                 resumen['sondeos_por_segundo'] or 0, resumen['bytes_escritos'])
+        for nombre, etapa in sorted(resumen['etapas'].items()):
+            log.info("Traza %-22s n=%-7d p50=%.3f ms p99=%.3f ms total=%.1f ms", nombre,
+                     etapa['cantidad'], etapa['p50_ms'], etapa['p99_ms'], etapa['total_ms'])
+
+    def exportar_traza(self):
+        if not self.traza:
+            return
+        try:
+            eventos = instrumentacion.exportar_chrome_trace(self.traza)
+            log.info("Traza exportada en %s (%d eventos)", self.traza, eventos)
+        except OSError as e:
+            log.error("No se pudo exportar la traza: %s", e)
+
+    def ejecutar(self, una_vez=False):
+        """Ejecutar barridos hasta recibir SIGTERM/SIGINT"""
+        self.cargar_configuracion()
+        self._archivo = sys.stdout if self.salida == '-' else open(self.salida, 'a', encoding='utf-8')
+        self.iniciar_exportador()
+        self.iniciar_retencion()
+        self.iniciar_monitor_rutas()
+        try:
+            while not self._detener.is_set():
+                if self._recargar.is_set():
+                    self._recargar.clear()
+                    self.cargar_configuracion()
+
+                proximo = time.monotonic() + self.intervalo
+                self.barrido()
+                self.escribir_rutas()
+                if una_vez:
+                    break
+
+                # Esperar al próximo barrido despertando ante señales
+                while not self._detener.is_set() and not self._recargar.is_set():
+                    self.revisar_cambios()
+                    restante = proximo - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self._detener.wait(min(restante, 1.0))
+        finally:
+            self.detener_monitor_rutas()
+            self.detener_exportador()
+            self.exportar_traza()
+            if self._archivo is not sys.stdout:
+                self._archivo.close()
+            if self.historial:
+                self.historial.cerrar()
+        log.info("Servicio detenido")
+
+    def _advertir_repetidas(self):
+        """El monitor continuo tiene una ventana por IP: las repetidas se sondean una vez"""
+        repetidas = ips_repetidas(self.config['ips'])
+        if repetidas:
+            log.warning("%d IPs aparecen más de una vez en el inventario; se sondean una sola vez "
+                        "con los datos de su última aparición", len(repetidas))
+
+    def ejecutar_continuo(self, cadencia=10.0):
+        """Monitorear todas las IPs en forma continua hasta recibir SIGTERM/SIGINT"""
+        self.cargar_configuracion()
+        self._archivo = sys.stdout if self.salida == '-' else open(self.salida, 'a', encoding='utf-8')
+        self.iniciar_exportador()
+        self.iniciar_retencion()
+        pendientes = []
+
+        def al_resultado(resultado):
+            self.publicar(resultado)
+            with self._lock:
+                pendientes.append(resultado)
+
+        monitor = MonitorObjetivos(al_resultado, cadencia=cadencia,
+                                   tamano_ventana=self.config.get('tamano_ventana', 60),
+                                   pps_max=self.config.get('pps_max', PPS_MAX))
+        monitor.agregar_desde_config(self.config)
+        self._advertir_repetidas()
+        monitor.iniciar()
+        self.iniciar_monitor_rutas(monitor.planificador)
+        instrumentacion.iniciar_barrido()
+        proximo_ciclo = time.monotonic() + cadencia
+        try:
+            while not self._detener.is_set():
+                self._detener.wait(1.0)
+                self.revisar_cambios()
+                if time.monotonic() >= proximo_ciclo:
+                    proximo_ciclo += cadencia
+                    self.escribir_rutas()
+                    # Cada cadencia cuenta como un barrido para la traza
+                    if self.traza:
+                        self.registrar_resumen_traza()
+                        instrumentacion.iniciar_barrido()
+                if self._recargar.is_set():
+                    self._recargar.clear()
+                    self.cargar_configuracion()
+                    # Solo se tocan los objetivos agregados, quitados o con otro intervalo
+                    monitor.planificador.pps_max = self.config.get('pps_max', PPS_MAX)
+                    agregados, quitados, modificados = monitor.sincronizar(self.config['ips'])
+                    log.info("Objetivos: %d agregados, %d quitados, %d modificados",
+                             agregados, quitados, modificados)
+                    self._advertir_repetidas()
+
+                # Guardar en el historial en lotes de un segundo
+                with self._lock:
+                    lote = pendientes[:]
+                    del pendientes[:]
+                if lote and self.historial:
+                    try:
+                        self.historial.guardar(lote)
+                    except Exception as e:
+                        log.error("No se pudo guardar el historial: %s", e)
+        finally:
+            monitor.detener()
+            # El planificador compartido ya se detuvo con el monitor
+            self.monitor_rutas = None
+            self.detener_exportador()
+            self.exportar_traza()
+            if self._archivo is not sys.stdout:
+                self._archivo.close()
+            if self.historial:
+                self.historial.cerrar()
+        log.info("Servicio detenido")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio de monitoreo MOS sin interfaz gráfica")
+    parser.add_argument('-c', '--config', default=RUTA_CONFIGURACION,
+                        help="Ruta de config.json (default: config.json)")
+    parser.add_argument('-o', '--salida', default='-',
+                        help="Archivo JSONL de resultados, '-' para stdout (default: -)")
+    parser.add_argument('-i', '--intervalo', type=float, default=None,
+                        help="Segundos entre barridos (default: intervalo_barrido de config.json)")
+    parser.add_argument('--una-vez', action='store_true',
+                        help="Ejecutar un solo barrido y salir")
+    parser.add_argument('--sin-historial', action='store_true',
+                        help="No guardar resultados en el historial SQLite")
+    parser.add_argument('--continuo', action='store_true',
+                        help="Monitoreo continuo con ventana deslizante en lugar de barridos")
+    parser.add_argument('--cadencia', type=float, default=10.0,
+                        help="Segundos entre resultados por IP en modo continuo (default: 10)")
+    parser.add_argument('--rutas', action='store_true',
+                        help="Detectar cambios de ruta después de cada barrido (requiere scapy)")
+    parser.add_argument('--monitor-ruta', action='store_true',
+                        help="Monitorear latencia, jitter, pérdida y MOS de cada salto de las rutas")
+    parser.add_argument('--simular', type=int, default=None, metavar='N',
+                        help="Usar N objetivos de la red simulada en lugar de las IPs de config.json")
+    parser.add_argument('--semilla', type=int, default=0,
+                        help="Semilla de la red simulada (default: 0)")
+    parser.add_argument('--traza', default=None, metavar='ARCHIVO',
+                        help="Activar la instrumentación y exportar un Chrome trace JSON al terminar")
+    parser.add_argument('--metricas', type=int, default=None, metavar='PUERTO',
+                        help="Servir métricas OpenMetrics/Prometheus en este puerto")
+    parser.add_argument('--sin-vigilancia', action='store_true',
+                        help="No recargar config.json ni el inventario al cambiar en disco")
+    parser.add_argument('--retencion', action='store_true',
+                        help="Agregar, compactar y podar pings/ en segundo plano según config.json")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr,
+                        format='%(asctime)s %(levelname)s %(message)s')
+
+    servicio = ServicioMOS(args.config, args.salida, args.intervalo, not args.sin_historial,
+                           args.rutas, args.metricas, args.simular, args.semilla, args.traza,
+                           args.retencion, not args.sin_vigilancia, args.monitor_ruta)
+    servicio.instalar_senales()
+    try:
+        if args.continuo:
+            servicio.ejecutar_continuo(cadencia=args.cadencia)
+        else:
+            servicio.ejecutar(una_vez=args.una_vez)
+    except FileNotFoundError:
+        log.error("No se encontró %s", args.config)
+        return 1
+    except ValueError as e:
+        log.error("Error al leer %s: %s", args.config, e)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+"""
+Configuración común de las pruebas: los módulos del proyecto están en la
+raíz del repositorio y la red se reemplaza por red_simulada.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motor_icmp import establecer_motor
+from red_simulada import MotorSimulado, RedSimulada
+
+
+SEMILLA = 7
+
+
+@pytest.fixture
+def semilla():
+    """Semilla de la red simulada que usa motor_simulado"""
+    return SEMILLA
+
+
+@pytest.fixture
+def motor_simulado(semilla):
+    """MotorSimulado instalado como motor compartido durante la prueba"""
+    motor = MotorSimulado(RedSimulada(semilla))
+    establecer_motor(motor)
+    yield motor
+    establecer_motor(None)
+    motor.cerrar()
+
+
+@pytest.fixture
+def directorio_temporal(tmp_path, monkeypatch):
+    """Directorio de trabajo vacío (pings/ y los archivos de salida quedan ahí)"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,67 @@
+"""Lectura de un archivo de ping en una sola pasada"""
+
+import builtins
+
+import pytest
+
+from mos_functions import (ResultadoPing, MetricasPing, analizar_archivo_ping, calcular_latencia_promedio,
+                           calcular_jitter, calcular_paquetes_perdidos, _escribir_archivo_ping)
+
+LATENCIAS = (10.0, None, 14.0, 12.0, 30.0, None, 11.0, 13.5)
+
+
+def _archivo_propio(ruta):
+    muestras = ResultadoPing('8.8.8.8')
+    for latencia in LATENCIAS:
+        muestras.agregar(latencia, 0)
+    muestras.archivo = str(ruta)
+    _escribir_archivo_ping(muestras)
+    return muestras
+
+
+def test_archivo_igual_que_en_memoria(tmp_path):
+    muestras = _archivo_propio(tmp_path / 'ping.txt')
+
+    del_archivo = analizar_archivo_ping(muestras.archivo)
+    en_memoria = MetricasPing.desde_muestras(muestras)
+
+    assert del_archivo.muestras == en_memoria.muestras == 6
+    assert del_archivo.latencia == pytest.approx(en_memoria.latencia, abs=0.01)
+    assert del_archivo.jitter == pytest.approx(en_memoria.jitter, abs=0.01)
+    assert del_archivo.perdida == pytest.approx(en_memoria.perdida)
+    assert calcular_paquetes_perdidos(muestras.archivo) == pytest.approx(25.0)
+
+
+def test_una_sola_apertura_por_archivo(tmp_path, monkeypatch):
+    ruta = _archivo_propio(tmp_path / 'ping.txt').archivo
+    aperturas = []
+    abrir = builtins.open
+
+    def open_contado(archivo, *args, **kwargs):
+        if str(archivo) == ruta:
+            aperturas.append(archivo)
+        return abrir(archivo, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, 'open', open_contado)
+    metricas = analizar_archivo_ping(ruta)
+
+    assert metricas is not None
+    assert len(aperturas) == 1
+
+
+def test_solo_resumen_usa_los_valores_precalculados(tmp_path):
+    ruta = tmp_path / 'resumen.txt'
+    ruta.write_text("""PING 8.8.8.8 (8.8.8.8) 56(84) bytes of data.
+
+--- 8.8.8.8 ping statistics ---
+10 packets transmitted, 9 received, 10% packet loss, time 9012ms
+rtt min/avg/max/mdev = 10.1/12.5/15.2/1.75 ms
+""", encoding='utf-8')
+
+    assert calcular_latencia_promedio(str(ruta)) == pytest.approx(12.5)
+    assert calcular_jitter(str(ruta)) == pytest.approx(1.75)
+
+
+def test_archivo_inexistente(tmp_path):
+    assert analizar_archivo_ping(str(tmp_path / 'falta.txt')) is None
+    assert calcular_latencia_promedio(str(tmp_path / 'falta.txt')) is None
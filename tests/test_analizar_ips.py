@@ -0,0 +1,69 @@
+"""Análisis concurrente de objetivos: orden, concurrencia acotada y progreso"""
+
+import threading
+import time
+
+import mos_functions
+from mos_functions import analizar_ips
+from red_simulada import objetivos_simulados
+
+
+def test_pool_acotado_y_en_orden(monkeypatch):
+    activos = 0
+    maximo = 0
+    lock = threading.Lock()
+
+    def analizar_ip(ip, cantidad_pings):
+        nonlocal activos, maximo
+        with lock:
+            activos += 1
+            maximo = max(maximo, activos)
+        # Los primeros objetivos terminan últimos
+        time.sleep(0.05 if ip.endswith('.1') else 0.01)
+        with lock:
+            activos -= 1
+        return {'ip': ip, 'mos': 4.0, 'error': False}
+
+    monkeypatch.setattr(mos_functions, 'obtener_motor', lambda: None)
+    monkeypatch.setattr(mos_functions, 'analizar_ip', analizar_ip)
+    objetivos = objetivos_simulados(20)
+    progreso = []
+
+    resultados = analizar_ips(objetivos, 10, max_concurrencia=4,
+                              al_progreso=lambda objetivo, resultado, completados, total:
+                              progreso.append((objetivo['ip'], completados, total)))
+
+    assert [resultado['ip'] for resultado in resultados] == [objetivo['ip'] for objetivo in objetivos]
+    assert [resultado['nombre'] for resultado in resultados] == [objetivo['nombre'] for objetivo in objetivos]
+    assert maximo == 4
+    assert [completados for _ip, completados, _total in progreso] == list(range(1, 21))
+    assert {total for _ip, _completados, total in progreso} == {20}
+
+
+def test_error_de_un_objetivo_no_corta_el_barrido(monkeypatch):
+    def analizar_ip(ip, cantidad_pings):
+        if ip == '10.0.0.2':
+            return {'error': True, 'mensaje': 'Sin respuesta'}
+        return {'ip': ip, 'mos': 4.0, 'error': False}
+
+    monkeypatch.setattr(mos_functions, 'obtener_motor', lambda: None)
+    monkeypatch.setattr(mos_functions, 'analizar_ip', analizar_ip)
+
+    resultados = analizar_ips(objetivos_simulados(3), 10)
+
+    assert [resultado['error'] for resultado in resultados] == [False, True, False]
+    assert resultados[1] == {'ip': '10.0.0.2', 'nombre': 'Simulado 2', 'error': True,
+                             'mensaje': 'Sin respuesta'}
+
+
+def test_barrido_sobre_la_red_simulada(motor_simulado, directorio_temporal):
+    objetivos = objetivos_simulados(10)
+    # Una IP repetida con otro nombre recibe su propio resultado
+    objetivos.append({'ip': objetivos[0]['ip'], 'nombre': 'Repetido'})
+
+    resultados = analizar_ips(objetivos, 6)
+
+    assert [resultado['nombre'] for resultado in resultados] == [objetivo['nombre'] for objetivo in objetivos]
+    assert resultados[-1]['ip'] == resultados[0]['ip']
+    assert resultados[-1].get('mos') == resultados[0].get('mos')
+    assert any(not resultado['error'] for resultado in resultados)
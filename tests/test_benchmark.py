@@ -0,0 +1,29 @@
+"""Ejecución de los benchmarks y comparación con la línea base"""
+
+import os
+
+from benchmark import ejecutar_benchmarks, comparar, guardar_base, leer_base
+
+
+def test_ejecutar_en_directorio_temporal(directorio_temporal):
+    progreso = []
+    solo = ['calcular_archivo_chico', 'importar_iputils', 'analizar_ip_simulado']
+
+    resultados = ejecutar_benchmarks(repeticiones=2, escala=1000, solo=solo,
+                                     al_progreso=lambda nombre, resultado: progreso.append(nombre))
+
+    assert sorted(resultados) == sorted(progreso) == sorted(solo)
+    assert resultados['importar_iputils']['unidades'] == 1000
+    assert all(resultado['segundos'] <= resultado['mediana'] for resultado in resultados.values())
+    # Los archivos generados y el registro de pings quedan en el directorio temporal
+    assert os.listdir(directorio_temporal) == []
+
+
+def test_comparar_con_la_base(directorio_temporal):
+    base = {'a': {'segundos': 1.0}, 'b': {'segundos': 1.0}, 'c': {'segundos': 1.0}}
+    guardar_base('base.json', base, 1000)
+    actuales = {'a': {'segundos': 1.1}, 'b': {'segundos': 1.5}, 'nuevo': {'segundos': 9.0}}
+
+    regresiones = comparar(actuales, leer_base('base.json'), umbral=0.2)
+
+    assert [(nombre, actual) for nombre, _base, actual, _variacion in regresiones] == [('b', 1.5)]
@@ -0,0 +1,92 @@
+"""Caché de rutas: traceroute solo ante destinos nuevos, huella distinta o vencimiento"""
+
+import pytest
+
+import cache_rutas
+from cache_rutas import CacheRutas, saltos_por_ttl
+
+
+def _saltos(*ips):
+    return [{'hop': hop, 'ip': ip, 'latency_ms': None if ip == '*' else 1.0, 'hostname': None}
+            for hop, ip in enumerate(ips, 1)]
+
+
+@pytest.fixture
+def rutas(monkeypatch):
+    """Reemplaza obtener_traceroute por rutas fijas por destino y cuenta las llamadas"""
+    actuales = {'10.0.0.1': _saltos('192.0.2.1', '10.0.0.1')}
+    llamadas = []
+
+    def traceroute(destino, max_hops=30, timeout=2):
+        llamadas.append(destino)
+        return actuales.get(destino, [])
+
+    monkeypatch.setattr(cache_rutas, 'obtener_traceroute', traceroute)
+    return actuales, llamadas
+
+
+def test_saltos_por_ttl():
+    assert saltos_por_ttl(55) == 10
+    assert saltos_por_ttl(120) == 9
+    assert saltos_por_ttl(250) == 6
+    assert saltos_por_ttl(None) is None
+
+
+def test_traceroute_solo_si_cambia_la_huella(rutas):
+    actuales, llamadas = rutas
+    eventos = []
+    cache = CacheRutas(al_cambio=eventos.append)
+
+    assert cache.obtener('10.0.0.1', 55) == actuales['10.0.0.1']
+    assert cache.obtener('10.0.0.1', 55) == actuales['10.0.0.1']
+    assert cache.obtener('10.0.0.1') == actuales['10.0.0.1']
+    assert (llamadas, cache.aciertos) == (['10.0.0.1'], 2)
+
+    # Otro TTL: se repite el traceroute y se registra el cambio de ruta
+    actuales['10.0.0.1'] = _saltos('192.0.2.1', '192.0.2.9', '10.0.0.1')
+    assert cache.obtener('10.0.0.1', 54) == actuales['10.0.0.1']
+    assert len(llamadas) == 2
+    assert [(evento['motivo'], evento['ttl_anterior'], evento['ttl_nuevo']) for evento in eventos] == [
+        ('huella', 55, 54)]
+    assert eventos[0]['saltos_nuevos'] == ['192.0.2.1', '192.0.2.9', '10.0.0.1']
+
+
+def test_saltos_sin_respuesta_no_son_un_cambio(rutas):
+    actuales, _llamadas = rutas
+    eventos = []
+    cache = CacheRutas(al_cambio=eventos.append)
+    cache.obtener('10.0.0.1', 55)
+
+    actuales['10.0.0.1'] = _saltos('*', '10.0.0.1')
+    cache.obtener('10.0.0.1', forzar=True)
+
+    assert eventos == []
+
+
+def test_ruta_vencida_y_traceroute_fallido(rutas, monkeypatch):
+    actuales, llamadas = rutas
+    cache = CacheRutas(vigencia=60)
+    anteriores = cache.obtener('10.0.0.1', 55)
+
+    ahora = cache_rutas.time.monotonic() + 61
+    monkeypatch.setattr(cache_rutas.time, 'monotonic', lambda: ahora)
+    assert cache.motivo_traceroute('10.0.0.1', 55) == 'vencida'
+
+    # Un traceroute sin saltos conserva la ruta anterior
+    del actuales['10.0.0.1']
+    assert cache.obtener('10.0.0.1', 55) == anteriores
+    assert len(llamadas) == 2
+
+
+def test_actualizar_solo_los_pendientes(rutas):
+    actuales, llamadas = rutas
+    actuales['10.0.0.2'] = _saltos('192.0.2.1', '10.0.0.2')
+    cache = CacheRutas()
+    resultados = [{'ip': '10.0.0.1', 'ttl_respuesta': 55}, {'ip': '10.0.0.2', 'ttl_respuesta': 60},
+                  {'ip': '10.0.0.3', 'error': True}, None]
+
+    assert cache.actualizar(resultados) == 2
+    assert cache.actualizar(resultados) == 0
+    resultados[1]['ttl_respuesta'] = 59
+    assert cache.actualizar(resultados) == 1
+    assert sorted(llamadas) == ['10.0.0.1', '10.0.0.2', '10.0.0.2']
@@ -0,0 +1,75 @@
+"""Caché de DNS inverso: consultas compartidas, caché negativa, vencimiento y LRU"""
+
+import threading
+import time
+
+import pytest
+
+import dns_inverso
+from dns_inverso import CacheDNSInverso
+
+
+@pytest.fixture
+def consultas(monkeypatch):
+    """Reemplaza gethostbyaddr: cuenta las consultas y espera a que se libere 'liberar'"""
+    contador = {'consultas': 0}
+    liberar = threading.Event()
+    liberar.set()
+
+    def gethostbyaddr(ip):
+        contador['consultas'] += 1
+        liberar.wait(5)
+        if ip.endswith('.99'):
+            raise OSError('sin nombre')
+        return f'host-{ip}', [], [ip]
+
+    monkeypatch.setattr(dns_inverso.socket, 'gethostbyaddr', gethostbyaddr)
+    contador['liberar'] = liberar
+    return contador
+
+
+def test_consultas_simultaneas_comparten_la_busqueda(consultas):
+    cache = CacheDNSInverso()
+    consultas['liberar'].clear()
+    nombres = []
+
+    futuros = [cache.resolver('10.0.0.1', nombres.append) for _ in range(5)]
+    consultas['liberar'].set()
+
+    assert {futuro.result(timeout=5) for futuro in futuros} == {'host-10.0.0.1'}
+    assert consultas['consultas'] == 1
+    # Los callbacks corren en el hilo de la consulta, después de publicar el resultado
+    limite = time.monotonic() + 5
+    while len(nombres) < 5 and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert nombres == ['host-10.0.0.1'] * 5
+    # Ya en caché: se resuelve sin consultar
+    assert cache.resolver('10.0.0.1').result() == 'host-10.0.0.1'
+    assert consultas['consultas'] == 1
+
+
+def test_cache_negativa_y_vencimiento(consultas, monkeypatch):
+    ahora = [1000.0]
+    monkeypatch.setattr(dns_inverso.time, 'monotonic', lambda: ahora[0])
+    cache = CacheDNSInverso(ttl=60, ttl_negativo=10)
+
+    assert cache.resolver('10.0.0.99').result(timeout=5) is None
+    assert cache.obtener('10.0.0.99') == (True, None)
+
+    ahora[0] += 11
+    assert cache.obtener('10.0.0.99') == (False, None)
+    cache.resolver('10.0.0.1').result(timeout=5)
+    ahora[0] += 59
+    assert cache.obtener('10.0.0.1') == (True, 'host-10.0.0.1')
+
+
+def test_desaloja_la_menos_usada(consultas):
+    cache = CacheDNSInverso(capacidad=2)
+    for ip in ('10.0.0.1', '10.0.0.2'):
+        cache.resolver(ip).result(timeout=5)
+    cache.obtener('10.0.0.1')
+    cache.resolver('10.0.0.3').result(timeout=5)
+
+    assert len(cache) == 2
+    assert cache.obtener('10.0.0.2') == (False, None)
+    assert cache.obtener('10.0.0.1')[0] and cache.obtener('10.0.0.3')[0]
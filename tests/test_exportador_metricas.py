@@ -0,0 +1,82 @@
+"""Documento OpenMetrics del exportador y su servidor HTTP"""
+
+import gzip
+import urllib.request
+
+import pytest
+
+from exportador_metricas import ExportadorMetricas, SnapshotMetricas, TIPO_CONTENIDO
+
+
+def _resultado(ip, mos, latencia, **extra):
+    resultado = {'ip': ip, 'nombre': f'Nodo "{ip}"', 'latencia': latencia, 'jitter': 1.5,
+                 'perdida': 0.0, 'mos': mos, 'r_factor': 90.0, 'timestamp': 1000.0, 'error': False}
+    resultado.update(extra)
+    return resultado
+
+
+def _lineas(snapshot):
+    snapshot.renderizar()
+    return snapshot.cuerpo.decode('utf-8').split('\n')
+
+
+def test_documento_por_objetivo_e_histogramas():
+    snapshot = SnapshotMetricas()
+    snapshot.actualizar([_resultado('10.0.0.1', 4.2, 30.0), _resultado('10.0.0.2', 2.2, 120.0),
+                         {'ip': '10.0.0.3', 'error': True}, None])
+
+    lineas = _lineas(snapshot)
+
+    assert lineas[-2:] == ['# EOF', '']
+    assert 'mos_valor{ip="10.0.0.1",nombre="Nodo \\"10.0.0.1\\""} 4.2' in lineas
+    assert 'mos_error{ip="10.0.0.3",nombre="10.0.0.3"} 1' in lineas
+    assert not any(linea.startswith('mos_valor{ip="10.0.0.3"') for linea in lineas)
+    assert 'mos_distribucion_bucket{le="2.5"} 1' in lineas
+    assert 'mos_distribucion_bucket{le="+Inf"} 2' in lineas
+    assert 'mos_latencia_distribucion_ms_bucket{le="50.0"} 1' in lineas
+    assert 'mos_resultados_total 3' in lineas and 'mos_resultados_error_total 1' in lineas
+    assert gzip.decompress(snapshot.cuerpo_gzip) == snapshot.cuerpo
+
+
+def test_solo_se_rearma_con_cambios():
+    snapshot = SnapshotMetricas()
+    snapshot.agregar(_resultado('10.0.0.1', 4.2, 30.0))
+    snapshot.renderizar()
+    cuerpo = snapshot.cuerpo
+
+    snapshot.renderizar()
+    assert snapshot.cuerpo is cuerpo
+
+    snapshot.agregar(_resultado('10.0.0.1', 3.9, 40.0))
+    assert 'mos_valor{ip="10.0.0.1",nombre="Nodo \\"10.0.0.1\\""} 3.9' in _lineas(snapshot)
+
+
+def test_conservar_quita_las_series_de_objetivos_quitados():
+    snapshot = SnapshotMetricas()
+    snapshot.actualizar([_resultado('10.0.0.1', 4.2, 30.0), _resultado('10.0.0.2', 4.0, 30.0)])
+
+    assert snapshot.conservar(['10.0.0.2']) == 1
+    assert len(snapshot) == 1
+    assert not any('ip="10.0.0.1"' in linea for linea in _lineas(snapshot))
+
+
+def test_servidor_http():
+    snapshot = SnapshotMetricas()
+    snapshot.agregar(_resultado('10.0.0.1', 4.2, 30.0))
+    snapshot.renderizar()
+    try:
+        exportador = ExportadorMetricas(0, '127.0.0.1', intervalo=60, snapshot=snapshot).iniciar()
+    except OSError as e:
+        pytest.skip(f'No se puede abrir un puerto local: {e}')
+    try:
+        assert exportador.snapshot is snapshot
+        url = f'http://127.0.0.1:{exportador.puerto}/metrics'
+        with urllib.request.urlopen(url, timeout=5) as respuesta:
+            assert respuesta.headers['Content-Type'] == TIPO_CONTENIDO
+            assert respuesta.read() == snapshot.cuerpo
+        pedido = urllib.request.Request(url, headers={'Accept-Encoding': 'gzip'})
+        with urllib.request.urlopen(pedido, timeout=5) as respuesta:
+            assert respuesta.headers['Content-Encoding'] == 'gzip'
+            assert gzip.decompress(respuesta.read()) == snapshot.cuerpo
+    finally:
+        exportador.detener()
@@ -0,0 +1,68 @@
+"""Series de pings en memoria: hacer_ping y las métricas calculadas sobre ellas"""
+
+import os
+
+import pytest
+
+import mos_functions
+from mos_functions import (hacer_ping, latencia_valida, ResultadoPing, calcular_latencia_promedio,
+                           calcular_jitter, calcular_paquetes_perdidos, _escritor)
+from motor_icmp import establecer_motor
+from red_simulada import MotorSimulado, RedSimulada, objetivos_simulados
+
+
+@pytest.fixture
+def motor_instantaneo(semilla, monkeypatch):
+    """
+    Red simulada sin demoras: hacer_ping es secuencial y espacia los pings
+    un segundo, la prueba no necesita esperar ni los perdidos ni el intervalo
+    """
+    monkeypatch.setattr(mos_functions.time, 'sleep', lambda segundos: None)
+    motor = MotorSimulado(RedSimulada(semilla), escala_tiempo=0)
+    establecer_motor(motor)
+    yield motor
+    establecer_motor(None)
+
+
+def test_serie_en_memoria_sin_archivo(motor_instantaneo, semilla, directorio_temporal):
+    red = RedSimulada(semilla)
+    for objetivo in objetivos_simulados(10):
+        ip = objetivo['ip']
+        esperadas = []
+        for _ in range(6):
+            rtt_ms = red.muestra(red.nodo(ip))
+            esperadas.append(None if rtt_ms is None or rtt_ms > 1000 else latencia_valida(rtt_ms / 1000))
+
+        muestras = hacer_ping(ip, 6, registrar=False)
+
+        if muestras is None:
+            assert sum(latencia is not None for latencia in esperadas) < 5
+            continue
+        assert muestras.secuencias == [1, 2, 3, 4, 5, 6]
+        assert muestras.latencias == esperadas
+        assert muestras.archivo is None
+    assert not os.path.exists('pings')
+
+
+def test_guardar_archivo_es_opcional(motor_instantaneo, directorio_temporal):
+    muestras = hacer_ping('10.0.0.1', 6, guardar_archivo=True, registrar=False)
+    _escritor.vaciar()
+
+    assert muestras is not None
+    assert os.path.exists(muestras.archivo)
+    assert calcular_latencia_promedio(muestras.archivo) == pytest.approx(
+        calcular_latencia_promedio(muestras), abs=0.01)
+
+
+def test_metricas_sobre_resultado_ping():
+    muestras = ResultadoPing('10.0.0.1')
+    for latencia in (10.0, None, 14.0, 12.0, None, 20.0):
+        muestras.agregar(latencia, 0)
+
+    assert muestras.perdidos == [False, True, False, False, True, False]
+    assert (muestras.enviados, muestras.recibidos) == (6, 4)
+    assert calcular_latencia_promedio(muestras) == pytest.approx(14.0)
+    # Jitter PingPlotter sobre las respuestas consecutivas: (4 + 2 + 8) / 3
+    assert calcular_jitter(muestras) == pytest.approx(14 / 3)
+    assert calcular_paquetes_perdidos(muestras) == pytest.approx(100 / 3)
+    assert not muestras.es_valido()
@@ -0,0 +1,85 @@
+"""Consultas del historial de resultados MOS"""
+
+import threading
+import time
+
+import pytest
+
+from historial import HistorialResultados
+
+
+def _resultado(ip, timestamp, mos, error=False):
+    return {'ip': ip, 'nombre': f'nodo {ip}', 'timestamp': timestamp, 'latencia': 20.0 + mos,
+            'jitter': 2.0, 'perdida': 0.0, 'mos': mos, 'calidad': 'Buena', 'error': error}
+
+
+@pytest.fixture
+def historial(tmp_path):
+    historial = HistorialResultados(str(tmp_path / 'historial.db'))
+    yield historial
+    historial.cerrar()
+
+
+def test_consultar_por_rango(historial):
+    historial.guardar([_resultado('10.0.0.1', 100 + i, 4.0 + i / 10) for i in range(5)] +
+                      [_resultado('10.0.0.2', 102, 3.0), _resultado('10.0.0.1', 103.5, 1.0, error=True)])
+
+    filas = historial.consultar('10.0.0.1', desde=101, hasta=103)
+    assert [fila['timestamp'] for fila in filas] == [101, 102, 103]
+    assert all(fila['ip'] == '10.0.0.1' and fila['error'] == 0 for fila in filas)
+
+    con_errores = historial.consultar('10.0.0.1', desde=101, hasta=104, incluir_errores=True)
+    assert [fila['timestamp'] for fila in con_errores] == [101, 102, 103, 103.5, 104]
+
+
+def test_guardar_ignora_vacios_y_completa_el_instante(historial):
+    historial.guardar([None, {}, {'ip': '10.0.0.1', 'mos': 4.2}], timestamp=50)
+
+    assert [(fila['timestamp'], fila['mos']) for fila in historial.consultar('10.0.0.1')] == [(50, 4.2)]
+
+
+def test_resumen_y_ultimos_dias(historial):
+    ahora = time.time()
+    historial.guardar([_resultado('10.0.0.1', ahora - 10 * 86400, 1.0),
+                       _resultado('10.0.0.1', ahora - 3600, 4.0),
+                       _resultado('10.0.0.1', ahora - 60, 3.0),
+                       _resultado('10.0.0.1', ahora - 30, 1.5, error=True)])
+
+    assert [mos for _, mos in historial.mos_ultimos_dias('10.0.0.1', dias=7)] == [4.0, 3.0]
+    resumen = historial.resumen('10.0.0.1', desde=ahora - 7 * 86400)
+    assert resumen['muestras'] == 2
+    assert resumen['mos_promedio'] == pytest.approx(3.5)
+    assert resumen['mos_minimo'] == pytest.approx(3.0)
+
+
+def test_cambios_de_ruta(historial):
+    for destino, instante in (('10.0.0.1', 10), ('10.0.0.2', 20), ('10.0.0.1', 30)):
+        historial.guardar_cambio_ruta({'destino': destino, 'timestamp': instante, 'motivo': 'ttl',
+                                       'ttl_anterior': 5, 'ttl_nuevo': 6,
+                                       'saltos_anteriores': ['1.1.1.1'], 'saltos_nuevos': ['1.1.1.1', '2.2.2.2']})
+
+    cambios = historial.consultar_cambios_ruta('10.0.0.1', desde=15)
+    assert len(cambios) == 1
+    assert cambios[0]['saltos_nuevos'] == ['1.1.1.1', '2.2.2.2']
+    assert [cambio['timestamp'] for cambio in historial.consultar_cambios_ruta()] == [10, 20, 30]
+
+
+def test_hilos_insertan_y_consultan_a_la_vez(historial):
+    errores = []
+
+    def insertar(indice):
+        try:
+            for lote in range(20):
+                historial.guardar([_resultado(f'10.0.1.{indice}', lote, 4.0)])
+                historial.consultar(f'10.0.1.{indice}')
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=insertar, args=(indice,)) for indice in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert errores == []
+    assert all(len(historial.consultar(f'10.0.1.{indice}')) == 20 for indice in range(4))
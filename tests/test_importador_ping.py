@@ -0,0 +1,108 @@
+"""Formatos de ping reconocidos por importador_ping"""
+
+import pytest
+
+from importador_ping import importar_archivo
+from mos_functions import ResultadoPing, _escribir_archivo_ping
+
+
+# Misma corrida en cada formato: 10, perdido, 14 y 12 ms
+FORMATOS = {
+    'iputils': """PING 8.8.8.8 (8.8.8.8) 56(84) bytes of data.
+64 bytes from 8.8.8.8: icmp_seq=1 ttl=117 time=10.0 ms
+64 bytes from 8.8.8.8: icmp_seq=3 ttl=117 time=14.0 ms
+64 bytes from 8.8.8.8: icmp_seq=4 ttl=117 time=12.0 ms
+
+--- 8.8.8.8 ping statistics ---
+4 packets transmitted, 3 received, 25% packet loss, time 3004ms
+rtt min/avg/max/mdev = 10.0/12.0/14.0/1.633 ms
+""",
+    'macos': """PING 8.8.8.8 (8.8.8.8): 56 data bytes
+64 bytes from 8.8.8.8: icmp_seq=0 ttl=117 time=10.000 ms
+Request timeout for icmp_seq 1
+64 bytes from 8.8.8.8: icmp_seq=2 ttl=117 time=14.000 ms
+64 bytes from 8.8.8.8: icmp_seq=3 ttl=117 time=12.000 ms
+
+--- 8.8.8.8 ping statistics ---
+4 packets transmitted, 3 packets received, 25.0% packet loss
+round-trip min/avg/max/stddev = 10.000/12.000/14.000/1.633 ms
+""",
+    'windows_en': """
+Pinging 8.8.8.8 with 32 bytes of data:
+Reply from 8.8.8.8: bytes=32 time=10ms TTL=117
+Request timed out.
+Reply from 8.8.8.8: bytes=32 time=14ms TTL=117
+Reply from 8.8.8.8: bytes=32 time=12ms TTL=117
+
+Ping statistics for 8.8.8.8:
+    Packets: Sent = 4, Received = 3, Lost = 1 (25% loss),
+Approximate round trip times in milli-seconds:
+    Minimum = 10ms, Maximum = 14ms, Average = 12ms
+""",
+    'windows_es': """
+Haciendo ping a 8.8.8.8 con 32 bytes de datos:
+Respuesta desde 8.8.8.8: bytes=32 tiempo=10ms TTL=117
+Tiempo de espera agotado para esta solicitud.
+Respuesta desde 8.8.8.8: bytes=32 tiempo=14ms TTL=117
+Respuesta desde 8.8.8.8: bytes=32 tiempo=12ms TTL=117
+
+Estadísticas de ping para 8.8.8.8:
+    Paquetes: enviados = 4, recibidos = 3, perdidos = 1
+    (25% perdidos),
+Tiempos aproximados de ida y vuelta en milisegundos:
+    Mínimo = 10ms, Máximo = 14ms, Media = 12ms
+""",
+}
+
+
+def _verificar(importado):
+    assert importado.recibidos == 3
+    assert importado.perdidos == 1
+    assert importado.latencia == pytest.approx(12.0)
+    # Jitter PingPlotter: (|14 - 10| + |12 - 14|) / 2
+    assert importado.jitter == pytest.approx(3.0)
+    assert importado.perdida == pytest.approx(25.0)
+    assert importado.minimo == pytest.approx(10.0)
+    assert importado.maximo == pytest.approx(14.0)
+
+
+@pytest.mark.parametrize('formato', sorted(FORMATOS))
+def test_formatos_de_terceros(tmp_path, formato):
+    ruta = tmp_path / f'{formato}.txt'
+    ruta.write_text(FORMATOS[formato], encoding='utf-8')
+
+    _verificar(importar_archivo(str(ruta)))
+
+
+@pytest.mark.parametrize('formato', ['iputils', 'macos'])
+def test_secuencias_perdidas(tmp_path, formato):
+    ruta = tmp_path / f'{formato}.txt'
+    ruta.write_text(FORMATOS[formato], encoding='utf-8')
+
+    perdidas = [secuencia for _corrida, secuencia in importar_archivo(str(ruta)).secuencias_perdidas()]
+
+    assert perdidas == ([2] if formato == 'iputils' else [1])
+
+
+def test_formato_propio(directorio_temporal):
+    muestras = ResultadoPing('8.8.8.8')
+    for latencia in (10.0, None, 14.0, 12.0):
+        muestras.agregar(latencia, 0)
+    muestras.archivo = 'propio.txt'
+    _escribir_archivo_ping(muestras)
+
+    _verificar(importar_archivo('propio.txt'))
+
+
+@pytest.mark.parametrize('tamano_bloque', [1, 7, 64])
+def test_bloques_pequenos_no_cambian_el_resultado(tmp_path, tamano_bloque):
+    ruta = tmp_path / 'varias.txt'
+    # Varias corridas seguidas para que los cortes caigan en cualquier lugar
+    ruta.write_text(''.join(FORMATOS[formato] for formato in sorted(FORMATOS)), encoding='utf-8')
+
+    completo = importar_archivo(str(ruta))
+    por_bloques = importar_archivo(str(ruta), tamano_bloque)
+
+    assert (por_bloques.recibidos, por_bloques.perdidos) == (completo.recibidos, completo.perdidos) == (12, 4)
+    assert por_bloques.latencia == pytest.approx(completo.latencia)
+    assert por_bloques.jitter == pytest.approx(completo.jitter)
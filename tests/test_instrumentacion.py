@@ -0,0 +1,81 @@
+"""Spans, contadores, resumen por barrido y exportación Chrome trace"""
+
+import json
+
+import pytest
+
+import instrumentacion
+from instrumentacion import span, contar, registrar
+
+
+@pytest.fixture
+def traza():
+    """Instrumentación activa y vacía durante la prueba"""
+    anterior = instrumentacion.activa()
+    instrumentacion.reiniciar()
+    instrumentacion.activar()
+    yield
+    instrumentacion.activar(anterior)
+    instrumentacion.reiniciar()
+
+
+def test_desactivada_no_registra():
+    anterior = instrumentacion.activa()
+    instrumentacion.activar(False)
+    try:
+        instrumentacion.reiniciar()
+        with span('parseo') as nulo:
+            contar('sondeos')
+        assert nulo is instrumentacion._SPAN_NULO
+        assert instrumentacion.contadores() == {}
+        assert instrumentacion.resumen_barrido()['etapas'] == {}
+    finally:
+        instrumentacion.activar(anterior)
+
+
+def test_resumen_del_barrido(traza):
+    contar('sondeos', 5)
+    instrumentacion.iniciar_barrido()
+    for milisegundos in range(1, 101):
+        registrar('parseo', 0, milisegundos * 1000000)
+    with span('calculo'):
+        pass
+    contar('sondeos', 10)
+    contar('bytes_escritos', 2048)
+
+    resumen = instrumentacion.resumen_barrido()
+
+    # Solo cuenta lo ocurrido desde iniciar_barrido
+    assert resumen['contadores'] == {'sondeos': 10, 'bytes_escritos': 2048}
+    assert resumen['bytes_escritos'] == 2048
+    assert resumen['sondeos_por_segundo'] > 0
+    parseo = resumen['etapas']['parseo']
+    assert (parseo['cantidad'], parseo['p50_ms'], parseo['p99_ms']) == (100, 50.0, 99.0)
+    assert parseo['total_ms'] == pytest.approx(5050.0)
+    assert resumen['etapas']['calculo']['cantidad'] == 1
+
+
+def test_reservorio_acotado(traza, monkeypatch):
+    monkeypatch.setattr(instrumentacion, 'MAX_MUESTRAS_ETAPA', 50)
+    for _ in range(1000):
+        registrar('sondeo', 0, 1000000)
+
+    etapa = instrumentacion._duraciones['sondeo']
+    assert len(etapa.muestras) == 50
+    assert instrumentacion.resumen_barrido()['etapas']['sondeo']['cantidad'] == 1000
+
+
+def test_exportar_chrome_trace(traza, tmp_path):
+    with span('traceroute'):
+        pass
+    registrar('parseo', 2000, 3000)
+    contar('sondeos', 3)
+
+    ruta = tmp_path / 'traza.json'
+    assert instrumentacion.exportar_chrome_trace(str(ruta)) == 3
+
+    eventos = json.loads(ruta.read_text(encoding='utf-8'))['traceEvents']
+    spans = {evento['name']: evento for evento in eventos if evento['ph'] == 'X'}
+    assert set(spans) == {'traceroute', 'parseo'}
+    assert (spans['parseo']['ts'], spans['parseo']['dur']) == (2.0, 3.0)
+    assert [evento['args'] for evento in eventos if evento['ph'] == 'C'] == [{'sondeos': 3}]
@@ -0,0 +1,86 @@
+"""Inventario en streaming, IPs repetidas y recarga incremental de objetivos"""
+
+import json
+import os
+
+import pytest
+
+import inventario
+from inventario import cargar_objetivos, ips_repetidas, leer_inventario, VigilanteArchivos
+from monitor_continuo import MonitorObjetivos
+from planificador import PlanificadorSondeos
+
+
+def test_json_por_bloques_pequenos(tmp_path, monkeypatch):
+    monkeypatch.setattr(inventario, 'TAMANO_BLOQUE', 7)
+    ruta = tmp_path / 'objetivos.json'
+    ruta.write_text(json.dumps({
+        'cantidad_pings': 20,
+        'otra': {'ips': [{'ip': 'no.se.lee'}]},
+        'ips': [{'ip': f'10.0.0.{i}', 'nombre': f'Nodo "{i}"', 'intervalo': 2.5} for i in range(1, 40)],
+    }), encoding='utf-8')
+
+    objetivos = list(leer_inventario(str(ruta)))
+
+    assert [objetivo['ip'] for objetivo in objetivos] == [f'10.0.0.{i}' for i in range(1, 40)]
+    assert objetivos[0]['nombre'] == 'Nodo "1"' and objetivos[0]['intervalo'] == 2.5
+
+
+def test_csv_con_grupos_y_etiquetas(tmp_path):
+    ruta = tmp_path / 'objetivos.csv'
+    ruta.write_text('ip,nombre,grupo,etiquetas\n10.0.0.1,,core,voz;critico\n,sin ip,,\n10.0.0.2,B,,\n',
+                    encoding='utf-8')
+
+    objetivos = list(leer_inventario(str(ruta)))
+
+    assert objetivos == [
+        {'ip': '10.0.0.1', 'nombre': '10.0.0.1', 'grupo': 'core', 'etiquetas': ('voz', 'critico')},
+        {'ip': '10.0.0.2', 'nombre': 'B', 'grupo': None, 'etiquetas': ()},
+    ]
+
+
+def test_ips_repetidas_se_conservan(tmp_path):
+    ruta_config = tmp_path / 'config.json'
+    config = {'ips': [{'ip': '10.0.0.1', 'nombre': 'A'}, {'ip': '10.0.0.2'},
+                      {'ip': '10.0.0.1', 'nombre': 'A bis'}]}
+
+    objetivos = cargar_objetivos(config, str(ruta_config))
+
+    assert [(objetivo['ip'], objetivo['nombre']) for objetivo in objetivos] == \
+        [('10.0.0.1', 'A'), ('10.0.0.2', '10.0.0.2'), ('10.0.0.1', 'A bis')]
+    assert ips_repetidas(objetivos) == {'10.0.0.1': 2}
+
+
+def test_inventario_inexistente(tmp_path):
+    with pytest.raises(ValueError):
+        cargar_objetivos({'inventario': 'falta.csv'}, str(tmp_path / 'config.json'))
+
+
+def test_vigilante_espera_a_que_el_archivo_se_estabilice(tmp_path):
+    ruta = tmp_path / 'objetivos.csv'
+    ruta.write_text('ip\n10.0.0.1\n', encoding='utf-8')
+    vigilante = VigilanteArchivos([str(ruta)], intervalo=0)
+
+    assert not vigilante.cambio()
+    ruta.write_text('ip\n10.0.0.1\n10.0.0.2\n', encoding='utf-8')
+    os.utime(ruta, ns=(1, 1))
+    # Primera revisión con el cambio: candidato; segunda sin cambios: se informa una vez
+    assert not vigilante.cambio()
+    assert vigilante.cambio()
+    assert not vigilante.cambio()
+
+
+def test_sincronizar_solo_toca_lo_que_cambio(motor_simulado):
+    monitor = MonitorObjetivos(lambda resultado: None, registrar=False,
+                               planificador=PlanificadorSondeos(motor=motor_simulado))
+    monitor.sincronizar([{'ip': '10.0.0.1'}, {'ip': '10.0.0.2'}, {'ip': '10.0.0.3'}])
+    ventana = monitor.ventanas['10.0.0.2']
+
+    cambios = monitor.sincronizar([{'ip': '10.0.0.2', 'intervalo': 5.0}, {'ip': '10.0.0.3'},
+                                   {'ip': '10.0.0.4'}, {'ip': '10.0.0.4', 'nombre': 'Último'}])
+
+    assert cambios == (1, 1, 1)
+    assert sorted(monitor.planificador.objetivos()) == ['10.0.0.2', '10.0.0.3', '10.0.0.4']
+    # El que cambió de intervalo conserva su ventana
+    assert monitor.ventanas['10.0.0.2'] is ventana
+    assert monitor._objetivos['10.0.0.4'][0] == 'Último'
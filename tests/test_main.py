@@ -0,0 +1,102 @@
+"""Tablero en vivo de la interfaz: cola entre el hilo de análisis y Tk"""
+
+import queue
+
+import pytest
+
+pytest.importorskip('tkinter')
+
+import main
+from main import MonitorMOS
+
+
+class _RaizFalsa:
+    def __init__(self):
+        self.programados = []
+
+    def after(self, demora, funcion, *args):
+        self.programados.append((funcion, args))
+
+
+def _aplicacion():
+    """MonitorMOS sin ventana: solo el estado que usan el análisis y el drenado"""
+    app = MonitorMOS.__new__(MonitorMOS)
+    app.root = _RaizFalsa()
+    app.config = {'ips': [{'ip': '10.0.0.1', 'nombre': 'Uno'}, {'ip': '10.0.0.2', 'nombre': 'Dos'}],
+                  'cantidad_pings': 6}
+    app.historial = None
+    app.resultados = []
+    app.vista = app.lbl_titulo = app.lbl_estado = app.progress = None
+    app._error_analisis = None
+    app._cola = queue.Queue()
+    return app
+
+
+def test_fallo_del_analisis_termina_el_tablero(monkeypatch):
+    app = _aplicacion()
+    parcial = {'ip': '10.0.0.1', 'nombre': 'Uno', 'mos': 4.2}
+
+    def analizar_ips_fallido(ips, cantidad, al_progreso=None, **kwargs):
+        al_progreso(ips[0], parcial, 1, len(ips))
+        raise RuntimeError('sin socket ICMP')
+
+    monkeypatch.setattr(main, 'analizar_ips', analizar_ips_fallido)
+
+    app.ejecutar_analisis(app._cola)
+    app._drenar_cola(app._cola)
+
+    assert app._error_analisis == 'sin socket ICMP'
+    assert app.resultados == [parcial]
+    # Con el fin recibido el drenado no se vuelve a programar
+    assert app.root.programados == []
+
+
+def test_barrido_completo(monkeypatch):
+    app = _aplicacion()
+    resultados = [{'ip': item['ip'], 'nombre': item['nombre'], 'mos': 4.0} for item in app.config['ips']]
+
+    def analizar_ips_simulado(ips, cantidad, al_progreso=None, **kwargs):
+        for completados, (item, resultado) in enumerate(zip(ips, resultados), 1):
+            al_progreso(item, resultado, completados, len(ips))
+        return resultados
+
+    monkeypatch.setattr(main, 'analizar_ips', analizar_ips_simulado)
+
+    app.ejecutar_analisis(app._cola)
+    app._drenar_cola(app._cola)
+
+    assert app._error_analisis is None
+    assert app.resultados == resultados
+    assert app.root.programados == []
+
+
+def test_drenado_por_lotes_acotados(monkeypatch):
+    app = _aplicacion()
+    lotes = []
+    app.actualizar_resultados = lambda lote: lotes.append([resultado['ip'] for resultado in lote])
+    monkeypatch.setattr(main, 'MAX_RESULTADOS_CUADRO', 2)
+    for i in range(5):
+        app._cola.put(('resultado', {'ip': f'10.0.0.{i}'}, i + 1, 5))
+
+    app._drenar_cola(app._cola)
+
+    # Un cuadro aplica como mucho MAX_RESULTADOS_CUADRO y se reprograma
+    assert lotes == [['10.0.0.0', '10.0.0.1']]
+    assert app.root.programados == [(app._drenar_cola, (app._cola,))]
+
+    app._cola.put(('fin', [], 5, 5))
+    while app.root.programados:
+        funcion, args = app.root.programados.pop()
+        funcion(*args)
+    assert lotes == [['10.0.0.0', '10.0.0.1'], ['10.0.0.2', '10.0.0.3'], ['10.0.0.4']]
+
+
+def test_cola_de_un_barrido_anterior_se_ignora():
+    app = _aplicacion()
+    anterior = queue.Queue()
+    anterior.put(('resultado', {'ip': '10.0.0.1'}, 1, 1))
+
+    app._drenar_cola(anterior)
+
+    assert anterior.qsize() == 1
+    assert app.root.programados == []
@@ -0,0 +1,95 @@
+"""Ventana deslizante de MOS y monitor continuo de objetivos"""
+
+import random
+import time
+
+import pytest
+
+from monitor_continuo import MonitorObjetivos, VentanaMOS
+from planificador import PlanificadorSondeos
+
+
+def _recalculo(muestras):
+    """Latencia, jitter y pérdida recorriendo la ventana completa"""
+    recibidas = [latencia for latencia in muestras if latencia is not None]
+    latencia = sum(recibidas) / len(recibidas) if recibidas else None
+    jitter = None
+    if len(recibidas) >= 2:
+        jitter = sum(abs(b - a) for a, b in zip(recibidas, recibidas[1:])) / (len(recibidas) - 1)
+    perdida = (len(muestras) - len(recibidas)) / len(muestras) * 100 if muestras else None
+    return latencia, jitter, perdida
+
+
+@pytest.mark.parametrize('tamano', [1, 5, 60])
+def test_ventana_coincide_con_el_recalculo(tamano):
+    aleatorio = random.Random(tamano)
+    ventana = VentanaMOS(tamano)
+    muestras = []
+
+    for _ in range(2000):
+        latencia = None if aleatorio.random() < 0.1 else aleatorio.lognormvariate(3, 0.5)
+        ventana.agregar(latencia)
+        muestras = (muestras + [latencia])[-tamano:]
+        latencia, jitter, perdida = _recalculo(muestras)
+        assert len(ventana) == len(muestras)
+        assert ventana.latencia == pytest.approx(latencia)
+        assert ventana.jitter == pytest.approx(jitter, abs=1e-9)
+        assert ventana.perdida == pytest.approx(perdida)
+
+
+def test_ventana_por_duracion():
+    ventana = VentanaMOS(tamano=None, duracion=10)
+
+    for segundo in range(30):
+        ventana.agregar(float(segundo), timestamp=segundo)
+
+    # Quedan las muestras de los segundos 19 a 29
+    assert len(ventana) == 11
+    assert ventana.latencia == pytest.approx(24.0)
+    assert ventana.jitter == pytest.approx(1.0)
+
+
+class _RegistroEspia:
+    def __init__(self, monitor):
+        self.monitor = monitor
+        self.muestras = []
+
+    def agregar(self, ip, secuencia, timestamp_ns, rtt_ms, perdido):
+        assert not self.monitor._lock.locked()
+        self.muestras.append((ip, secuencia, rtt_ms, perdido))
+
+
+def test_registro_fuera_del_lock_y_en_orden():
+    resultados = []
+    monitor = MonitorObjetivos(resultados.append, registrar=False,
+                               planificador=PlanificadorSondeos(pps_max=100))
+    monitor._registro = registro = _RegistroEspia(monitor)
+    monitor.agregar('10.0.0.1', 'Uno')
+    secuencia = monitor._secuencias['10.0.0.1']
+
+    for indice in (1, 0, 2, 4, 3, 5):
+        rtt = None if indice == 2 else 0.010 + indice / 1000
+        monitor._al_sondeo(secuencia, '10.0.0.1', indice, rtt, time.time(), indice)
+
+    assert [(secuencia, perdido) for _ip, secuencia, _rtt, perdido in registro.muestras] == \
+        [(1, False), (2, False), (3, True), (4, False), (5, False), (6, False)]
+    assert resultados[-1]['nombre'] == 'Uno' and resultados[-1]['muestras'] == 6
+
+
+def test_monitor_sobre_la_red_simulada(motor_simulado):
+    resultados = []
+    monitor = MonitorObjetivos(resultados.append, registrar=False,
+                               planificador=PlanificadorSondeos(motor=motor_simulado))
+    monitor.agregar_desde_config({'ips': [{'ip': '10.0.0.1', 'intervalo': 0.05, 'grupo': 'core'},
+                                          {'ip': '10.0.0.2', 'intervalo': 0.05}]})
+    monitor.iniciar()
+    try:
+        time.sleep(1.5)
+    finally:
+        monitor.detener()
+
+    assert {resultado['ip'] for resultado in resultados} == {'10.0.0.1', '10.0.0.2'}
+    validos = [resultado for resultado in resultados if not resultado.get('error')]
+    assert validos
+    assert all(1 <= resultado['mos'] <= 4.5 for resultado in validos)
+    assert all(resultado.get('grupo') == 'core' for resultado in validos if resultado['ip'] == '10.0.0.1')
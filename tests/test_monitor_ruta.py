@@ -0,0 +1,72 @@
+"""Monitoreo por salto: orden de las muestras y métricas sobre la red simulada"""
+
+import time
+
+import pytest
+
+from monitor_ruta import MonitorRutas
+from planificador import PlanificadorSondeos
+from red_simulada import objetivos_simulados
+
+SALTOS = [
+    {'hop': 1, 'ip': '192.168.0.1', 'latency_ms': 1.0, 'hostname': None},
+    {'hop': 2, 'ip': '*', 'latency_ms': None, 'hostname': None},
+    {'hop': 3, 'ip': '10.0.0.1', 'latency_ms': 10.0, 'hostname': None},
+]
+
+
+def _entregar(monitor, ip, llegadas):
+    secuencia = monitor._secuencias[ip]
+    for indice, rtt in llegadas:
+        monitor._al_sondeo(secuencia, ip, indice, rtt, time.time(), indice * 10 ** 9)
+
+
+def test_respuestas_desordenadas_se_agregan_en_secuencia():
+    monitor = MonitorRutas(planificador=PlanificadorSondeos(pps_max=100))
+    monitor.agregar('10.0.0.1', saltos=SALTOS)
+
+    # En orden: 10, 30, 10 -> jitter 20; sin reordenar (10, 10, 30) daría 10
+    _entregar(monitor, '10.0.0.1', [(2, 0.010), (0, 0.010)])
+    assert len(monitor.ventanas['10.0.0.1']) == 1
+    _entregar(monitor, '10.0.0.1', [(1, 0.030)])
+
+    assert monitor.ventanas['10.0.0.1'].jitter == pytest.approx(20.0)
+
+
+def test_reprogramar_descarta_la_secuencia_anterior():
+    monitor = MonitorRutas(pps_max=1, intervalo=0.1, planificador=PlanificadorSondeos(pps_max=100))
+    monitor.agregar('10.0.0.1', saltos=SALTOS[:1])
+    anterior = monitor._secuencias['192.168.0.1']
+
+    # Un salto más cambia el intervalo por presupuesto y reprograma todo
+    monitor.agregar('10.0.0.2', saltos=SALTOS[2:])
+
+    assert monitor._secuencias['192.168.0.1'] is not anterior
+    monitor._al_sondeo(anterior, '192.168.0.1', 0, 0.005, time.time(), 0)
+    assert len(monitor.ventanas['192.168.0.1']) == 0
+
+
+def test_quitar_ruta_libera_los_saltos():
+    monitor = MonitorRutas(planificador=PlanificadorSondeos(pps_max=100))
+    monitor.agregar('10.0.0.1', saltos=SALTOS)
+
+    assert monitor.quitar('10.0.0.1')
+    assert monitor.ventanas == {} and monitor._secuencias == {}
+
+
+def test_saltos_sobre_la_red_simulada(motor_simulado):
+    destinos = [objetivo['ip'] for objetivo in objetivos_simulados(3)]
+    monitor = MonitorRutas(intervalo=0.05, planificador=PlanificadorSondeos(pps_max=500, motor=motor_simulado))
+    for destino in destinos:
+        assert monitor.agregar(destino, saltos=motor_simulado.traceroute(destino, timeout=0.3))
+    monitor.iniciar()
+    try:
+        time.sleep(1.5)
+    finally:
+        monitor.detener()
+
+    resumen = monitor.resumen()
+    assert sorted(resumen) == sorted(destinos)
+    for destino in destinos:
+        saltos = [salto for salto in resumen[destino]['saltos'] if salto['ip'] != '*']
+        assert saltos and all(salto['muestras'] > 0 for salto in saltos)
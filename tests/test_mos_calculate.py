@@ -0,0 +1,90 @@
+"""Lectura en streaming de la salida de ping en mos-calculate.py"""
+
+import importlib.util
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+pytest.importorskip('tkinter')
+
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Ping de Linux que imprime una respuesta por vez; {final} decide si termina o se cuelga
+_PING = """
+import sys, time
+print('PING 192.0.2.1 (192.0.2.1) 56(84) bytes of data.', flush=True)
+for secuencia, rtt in ((1, 10.0), (2, 14.0), (4, 12.0)):
+    print(f'64 bytes from 192.0.2.1: icmp_seq={{secuencia}} ttl=57 time={{rtt}} ms', flush=True)
+    time.sleep(0.05)
+{final}
+"""
+
+_RESUMEN = """
+print()
+print('--- 192.0.2.1 ping statistics ---')
+print('4 packets transmitted, 3 received, 25% packet loss, time 3004ms')
+"""
+
+
+@pytest.fixture(scope='module')
+def mos_calculate():
+    spec = importlib.util.spec_from_file_location('mos_calculate', os.path.join(RAIZ, 'mos-calculate.py'))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+class _RootInmediato:
+    """Sustituto de Tk: after() ejecuta el callback en el momento"""
+
+    def __init__(self):
+        self.mensajes = []
+
+    def after(self, _demora, funcion, *args):
+        funcion(*args)
+
+
+def _calculadora(mos_calculate, monkeypatch, final):
+    """Calculadora sin ventana cuyo 'ping' es un script de Python"""
+    calculadora = mos_calculate.MOSCalculatorGUI.__new__(mos_calculate.MOSCalculatorGUI)
+    calculadora.root = _RootInmediato()
+    calculadora.log = calculadora.root.mensajes.append
+    popen = subprocess.Popen
+
+    def popen_simulado(comando, **kwargs):
+        return popen([sys.executable, '-c', _PING.format(final=final)], **kwargs)
+
+    monkeypatch.setattr(mos_calculate.subprocess, 'Popen', popen_simulado)
+    return calculadora
+
+
+def test_lineas_procesadas_a_medida_que_llegan(mos_calculate, monkeypatch, directorio_temporal):
+    calculadora = _calculadora(mos_calculate, monkeypatch, _RESUMEN)
+    progreso = []
+
+    archivo, estadisticas = calculadora.hacer_ping('192.0.2.1', 4,
+                                                   al_progreso=lambda e: progreso.append(e.recibidos))
+
+    assert progreso == [1, 2, 3]
+    assert (estadisticas.recibidos, estadisticas.perdidos) == (3, 1)
+    assert estadisticas.latencia == pytest.approx(12.0)
+    with open(archivo, encoding='utf-8') as f:
+        contenido = f.read()
+    assert contenido.startswith('Ping a 192.0.2.1') and '4 packets transmitted' in contenido
+
+
+def test_ping_colgado_se_termina_y_conserva_lo_recibido(mos_calculate, monkeypatch, directorio_temporal):
+    calculadora = _calculadora(mos_calculate, monkeypatch, 'time.sleep(60)')
+    inicio = time.monotonic()
+
+    archivo, estadisticas = calculadora.hacer_ping('192.0.2.1', 4, timeout_inactividad=0.5)
+
+    assert time.monotonic() - inicio < 10
+    assert archivo is not None
+    assert estadisticas.recibidos == 3
+    with open(archivo, encoding='utf-8') as f:
+        assert f.read().count('icmp_seq=') == 3
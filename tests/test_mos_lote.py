@@ -0,0 +1,40 @@
+"""Versiones vectorizadas de calcular_mos y clasificar_mos contra las escalares"""
+
+import random
+
+import pytest
+
+from mos_functions import calcular_mos, clasificar_mos, calcular_mos_lote, clasificar_mos_lote
+
+np = pytest.importorskip('numpy')
+
+
+def _mediciones():
+    aleatorio = random.Random(0)
+    latencias = [aleatorio.uniform(0, 600) for _ in range(5000)]
+    jitters = [aleatorio.uniform(0, 80) for _ in range(5000)]
+    perdidas = [aleatorio.choice((0.0, aleatorio.uniform(0, 100))) for _ in range(5000)]
+    # Bordes: quiebre de 160 ms de latencia efectiva, R limitado a 0 y sin pérdida
+    latencias += [140.0, 139.999999, 150.0, 0.0, 1000.0]
+    jitters += [5.0, 5.0, 0.0, 0.0, 200.0]
+    perdidas += [0.0, 0.0, 100.0, 0.0, 100.0]
+    return latencias, jitters, perdidas
+
+
+def test_calcular_mos_lote_identico_al_escalar():
+    latencias, jitters, perdidas = _mediciones()
+    mos, r_factor, latencia_efectiva = calcular_mos_lote(latencias, jitters, perdidas)
+
+    for i, medicion in enumerate(zip(latencias, jitters, perdidas)):
+        esperado = calcular_mos(*medicion)
+        # Igualdad exacta: el lote debe ser idéntico bit a bit
+        assert (mos[i], r_factor[i], latencia_efectiva[i]) == esperado, medicion
+
+
+def test_clasificar_mos_lote_identico_al_escalar():
+    valores = [1.0, 3.0999, 3.1, 3.5999, 3.6, 3.9999, 4.0, 4.2999, 4.3, 4.5, 5.0]
+    valores += list(calcular_mos_lote(*_mediciones())[0])
+
+    calidades = clasificar_mos_lote(valores)
+
+    assert list(calidades) == [clasificar_mos(mos) for mos in valores]
@@ -0,0 +1,70 @@
+"""Motor ICMP multiplexado: contrato de los sondeos y cierre con sondeos en vuelo"""
+
+import threading
+import time
+
+import pytest
+
+from motor_icmp import MotorICMP, SondeoICMP
+from red_simulada import RedSimulada, objetivos_simulados
+
+
+def _motor_real():
+    try:
+        return MotorICMP()
+    except OSError:
+        pytest.skip('el sistema no permite abrir un socket ICMP')
+
+
+def test_esperar_tiene_limite():
+    sondeo = SondeoICMP('10.0.0.1', 1, time.monotonic() + 0.1, None)
+
+    inicio = time.monotonic()
+    assert sondeo.esperar() is None
+    assert time.monotonic() - inicio < 3
+    assert sondeo.esperar(timeout=0) is None
+
+
+def test_cerrar_resuelve_los_pendientes_como_perdidos():
+    motor = _motor_real()
+    # Sin hilo receptor la respuesta nunca se procesa y el sondeo queda en vuelo
+    motor._activo = False
+    motor._hilo.join()
+    resueltos = []
+    sondeo = motor.enviar('127.0.0.1', timeout=30, callback=resueltos.append)
+
+    motor.cerrar()
+
+    assert sondeo.evento.is_set()
+    assert sondeo.rtt is None
+    assert resueltos == [sondeo]
+    assert not motor._pendientes
+
+
+def test_ping_lote_simulado_coincide_con_la_red(motor_simulado, semilla):
+    ips = [objetivo['ip'] for objetivo in objetivos_simulados(50)]
+
+    resultados = motor_simulado.ping_lote(ips, timeout=1.0)
+
+    red = RedSimulada(semilla)
+    for ip in ips:
+        rtt_ms = red.muestra(red.nodo(ip))
+        esperado = None if rtt_ms is None or rtt_ms > 1000 else rtt_ms / 1000
+        assert resultados[ip] == esperado
+
+
+def test_callback_por_sondeo(motor_simulado):
+    listos = threading.Event()
+    resueltos = []
+
+    def al_resolver(sondeo):
+        resueltos.append(sondeo.ip)
+        if len(resueltos) == 20:
+            listos.set()
+
+    ips = [objetivo['ip'] for objetivo in objetivos_simulados(20)]
+    for ip in ips:
+        motor_simulado.enviar(ip, timeout=0.5, callback=al_resolver)
+
+    assert listos.wait(5)
+    assert sorted(resueltos) == sorted(ips)
@@ -0,0 +1,85 @@
+"""Orden de los sondeos del planificador y reordenamiento de las respuestas"""
+
+import threading
+
+import pytest
+
+from mos_functions import hacer_ping_lote, latencia_valida
+from monitor_continuo import _Secuencia
+from planificador import PlanificadorSondeos
+from red_simulada import RedSimulada, objetivos_simulados
+
+
+def test_cantidad_no_positiva_se_rechaza(motor_simulado):
+    planificador = PlanificadorSondeos(motor=motor_simulado)
+
+    for cantidad in (0, -1):
+        with pytest.raises(ValueError):
+            planificador.agregar_objetivo('10.0.0.1', lambda *args: None, cantidad=cantidad)
+    assert len(planificador) == 0
+
+
+def test_sondeos_en_orden_y_espaciados(motor_simulado):
+    enviados = {}
+    terminados = []
+    lock = threading.Lock()
+
+    def al_resultado(ip, indice, rtt, timestamp, timestamp_ns):
+        with lock:
+            enviados.setdefault(ip, []).append((indice, timestamp_ns))
+
+    planificador = PlanificadorSondeos(motor=motor_simulado)
+    ips = [objetivo['ip'] for objetivo in objetivos_simulados(20)]
+    for ip in ips:
+        planificador.agregar_objetivo(ip, al_resultado, intervalo=0.2, cantidad=5,
+                                      al_terminar=terminados.append)
+    planificador.iniciar()
+    try:
+        assert planificador.esperar(timeout=10)
+    finally:
+        planificador.detener()
+
+    assert sorted(terminados) == sorted(ips)
+    for ip in ips:
+        # Cada índice una sola vez, enviados en orden y a un intervalo de distancia
+        por_indice = sorted(enviados[ip])
+        assert [indice for indice, _ in por_indice] == list(range(5))
+        instantes = [timestamp_ns for _, timestamp_ns in por_indice]
+        assert all(0.15e9 < b - a < 0.4e9 for a, b in zip(instantes, instantes[1:]))
+
+
+def test_hacer_ping_lote_respeta_la_secuencia(motor_simulado, semilla, directorio_temporal):
+    ips = [objetivo['ip'] for objetivo in objetivos_simulados(30)]
+    terminados = []
+
+    # Una serie necesita al menos 5 respuestas para ser válida
+    resultados = hacer_ping_lote(ips, cantidad=6, motor=motor_simulado, registrar=False,
+                                 al_terminar=lambda ip, resultado: terminados.append(ip))
+
+    # Cada nodo simulado tiene su propio generador: la secuencia esperada no
+    # depende del orden en que llegaron las respuestas
+    red = RedSimulada(semilla)
+    assert sorted(terminados) == sorted(ips)
+    assert sum(resultado is not None for resultado in resultados.values()) >= len(ips) // 2
+    for ip in ips:
+        nodo = red.nodo(ip)
+        esperadas = []
+        for _ in range(6):
+            rtt_ms = red.muestra(nodo)
+            esperadas.append(None if rtt_ms is None or rtt_ms > 1000 else latencia_valida(rtt_ms / 1000))
+        resultado = resultados[ip]
+        if resultado is None:
+            continue
+        assert resultado.secuencias == [1, 2, 3, 4, 5, 6]
+        assert resultado.latencias == esperadas
+
+
+def test_secuencia_reordena_respuestas():
+    secuencia = _Secuencia()
+    entregadas = []
+
+    for indice in (1, 0, 3, 2, 4):
+        entregadas.extend(numero for numero, _latencia, _ts in secuencia.ordenar(indice, float(indice), indice))
+
+    assert entregadas == [1, 2, 3, 4, 5]
+    assert secuencia.ordenar(6, 6.0, 6) == []
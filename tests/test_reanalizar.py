@@ -0,0 +1,51 @@
+"""Reanudación del reanálisis con registros binarios que siguen creciendo"""
+
+import json
+
+from registro_muestras import RegistroMuestras
+from reanalizar import reanalizar
+
+
+def _filas(ruta):
+    with open(ruta, encoding='utf-8') as f:
+        return [(fila['ip'], fila['muestras']) for fila in map(json.loads, f)]
+
+
+def _serie(registro, ip, cantidad, primera=1):
+    for secuencia in range(primera, primera + cantidad):
+        registro.agregar(ip, secuencia, secuencia, 10.0 + secuencia % 3, False)
+
+
+def test_registro_en_escritura_se_retoma(directorio_temporal):
+    (directorio_temporal / 'logs').mkdir()
+    registro = RegistroMuestras('logs/muestras-1.bin')
+    _serie(registro, '10.0.0.1', 10)
+    _serie(registro, '10.0.0.2', 5)
+    _serie(registro, '10.0.0.1', 4)
+    registro.sincronizar()
+
+    reanalizar('logs', 'salida.jsonl', procesos=1, checkpoint='salida.checkpoint')
+    assert _filas('salida.jsonl') == [('10.0.0.1', 10), ('10.0.0.2', 5), ('10.0.0.1', 4)]
+
+    # Sin registros nuevos no se emite nada
+    reanalizar('logs', 'salida.jsonl', procesos=1, checkpoint='salida.checkpoint')
+    assert len(_filas('salida.jsonl')) == 3
+
+    # La serie abierta de 10.0.0.1 sigue y 10.0.0.2 empieza otra: se emiten
+    # las que estaban abiertas (completas) y la nueva, no la ya cerrada
+    _serie(registro, '10.0.0.1', 4, primera=5)
+    _serie(registro, '10.0.0.2', 3)
+    registro.cerrar()
+    reanalizar('logs', 'salida.jsonl', procesos=1, checkpoint='salida.checkpoint')
+    assert sorted(_filas('salida.jsonl')[3:]) == [('10.0.0.1', 8), ('10.0.0.2', 3), ('10.0.0.2', 5)]
+
+
+def test_checkpoint_de_rutas_simples_sigue_valiendo(directorio_temporal):
+    (directorio_temporal / 'logs').mkdir()
+    registro = RegistroMuestras('logs/muestras-1.bin')
+    _serie(registro, '10.0.0.1', 5)
+    registro.cerrar()
+    with open('salida.checkpoint', 'w', encoding='utf-8') as f:
+        f.write('logs/muestras-1.bin\n')
+
+    assert reanalizar('logs', 'salida.jsonl', procesos=1, checkpoint='salida.checkpoint') == 0
@@ -0,0 +1,43 @@
+"""Red simulada determinista y motor de sondeo que la expone"""
+
+from red_simulada import MotorSimulado, RedSimulada, objetivos_simulados
+
+
+def test_misma_semilla_misma_red(semilla):
+    ips = [objetivo['ip'] for objetivo in objetivos_simulados(30)]
+    primera, segunda = RedSimulada(semilla), RedSimulada(semilla)
+
+    for ip in ips:
+        nodo_a, nodo_b = primera.nodo(ip), segunda.nodo(ip)
+        assert [elemento.ip for elemento in nodo_a.ruta] == [elemento.ip for elemento in nodo_b.ruta]
+        assert [primera.muestra(nodo_a) for _ in range(20)] == [segunda.muestra(nodo_b) for _ in range(20)]
+
+
+def test_orden_de_consulta_no_cambia_las_muestras(semilla):
+    ips = [objetivo['ip'] for objetivo in objetivos_simulados(10)]
+    adelante, atras = RedSimulada(semilla), RedSimulada(semilla)
+
+    muestras_adelante = {ip: adelante.muestra(adelante.nodo(ip)) for ip in ips}
+    muestras_atras = {ip: atras.muestra(atras.nodo(ip)) for ip in reversed(ips)}
+
+    assert muestras_adelante == muestras_atras
+
+
+def test_red_vacia_pasada_al_motor_se_conserva():
+    red = RedSimulada(1)
+    motor = MotorSimulado(red, escala_tiempo=0)
+
+    assert motor.red is red
+
+
+def test_cerrar_resuelve_las_entregas_pendientes():
+    red = RedSimulada(3)
+    motor = MotorSimulado(red, escala_tiempo=1000)
+    resueltos = []
+    sondeos = [motor.enviar(objetivo['ip'], timeout=1.0, callback=resueltos.append)
+               for objetivo in objetivos_simulados(5)]
+
+    motor.cerrar()
+
+    assert all(sondeo.evento.is_set() and sondeo.rtt is None for sondeo in sondeos)
+    assert len(resueltos) == 5
@@ -0,0 +1,190 @@
+"""Ida y vuelta del registro binario de muestras"""
+
+import struct
+import threading
+import time
+
+import pytest
+
+from registro_muestras import RegistroMuestras, LectorRegistro, ENCABEZADO, REGISTRO, MAGIA
+from mos_functions import leer_series_registro
+
+
+def _escribir(ruta, muestras):
+    registro = RegistroMuestras(str(ruta))
+    for muestra in muestras:
+        registro.agregar(*muestra)
+    registro.cerrar()
+
+
+def test_ida_y_vuelta(tmp_path):
+    ruta = tmp_path / 'muestras.bin'
+    inicio = time.monotonic_ns()
+    _escribir(ruta, [
+        ('10.0.0.1', 1, inicio, 12.5, False),
+        ('10.0.0.2', 1, inicio + 1000, None, True),
+        ('10.0.0.1', 2, inicio + 2000, 13.25, False),
+    ])
+
+    with LectorRegistro(str(ruta)) as lector:
+        assert len(lector) == 3
+        assert lector.objetivos == {0: '10.0.0.1', 1: '10.0.0.2'}
+        assert list(lector) == [
+            (0, 1, inicio, 12.5, 0),
+            (1, 1, inicio + 1000, 0.0, 1),
+            (0, 2, inicio + 2000, 13.25, 0),
+        ]
+        assert lector[-1] == (0, 2, inicio + 2000, 13.25, 0)
+        assert list(lector.registros(2)) == [(0, 2, inicio + 2000, 13.25, 0)]
+        assert [registro[1] for registro in lector.muestras('10.0.0.1')] == [1, 2]
+        assert abs(lector.fecha(inicio).timestamp() - time.time()) < 60
+
+
+def test_reabrir_conserva_los_ids(tmp_path):
+    ruta = tmp_path / 'muestras.bin'
+    _escribir(ruta, [('10.0.0.1', 1, 1, 1.0, False)])
+    _escribir(ruta, [('10.0.0.2', 1, 2, 2.0, False), ('10.0.0.1', 2, 3, 3.0, False)])
+
+    with LectorRegistro(str(ruta)) as lector:
+        assert lector.objetivos == {0: '10.0.0.1', 1: '10.0.0.2'}
+        assert [registro[0] for registro in lector] == [0, 1, 0]
+
+
+def test_archivo_vacio_o_sin_encabezado_completo(tmp_path):
+    vacio = tmp_path / 'vacio.bin'
+    vacio.write_bytes(b'')
+    cortado = tmp_path / 'cortado.bin'
+    cortado.write_bytes(b'MOSB\x01')
+
+    for ruta in (vacio, cortado):
+        with LectorRegistro(str(ruta)) as lector:
+            assert len(lector) == 0
+            assert list(lector) == []
+            assert list(lector.registros()) == []
+
+
+def test_encabezado_visible_antes_del_primer_fsync(tmp_path):
+    ruta = tmp_path / 'muestras.bin'
+    registro = RegistroMuestras(str(ruta))
+    try:
+        assert ruta.stat().st_size == ENCABEZADO.size
+        with LectorRegistro(str(ruta)) as lector:
+            assert len(lector) == 0
+            assert lector.ancla_pared_ns > 0
+    finally:
+        registro.cerrar()
+
+
+def test_registro_final_incompleto_se_ignora(tmp_path):
+    ruta = tmp_path / 'muestras.bin'
+    _escribir(ruta, [('10.0.0.1', 1, 1, 1.0, False), ('10.0.0.1', 2, 2, 2.0, False)])
+    with open(ruta, 'ab') as f:
+        f.write(b'\x00' * (REGISTRO.size - 1))
+
+    with LectorRegistro(str(ruta)) as lector:
+        assert len(lector) == 2
+
+
+def test_series_por_reinicio_de_secuencia(tmp_path):
+    ruta = tmp_path / 'muestras.bin'
+    _escribir(ruta, [('10.0.0.1', secuencia, secuencia, 10.0 + secuencia, False) for secuencia in (1, 2, 3)] +
+                    [('10.0.0.1', secuencia, 10 + secuencia, 20.0, secuencia == 2) for secuencia in (1, 2)])
+
+    series = leer_series_registro(str(ruta))
+
+    assert [serie.latencias for serie in series] == [[11.0, 12.0, 13.0], [20.0, None]]
+
+
+def test_como_array(tmp_path):
+    np = pytest.importorskip('numpy')
+    ruta = tmp_path / 'muestras.bin'
+    _escribir(ruta, [('10.0.0.1', secuencia, secuencia, float(secuencia), False) for secuencia in range(1, 101)])
+
+    with LectorRegistro(str(ruta)) as lector:
+        datos = lector.como_array()
+        assert datos['rtt_ms'].sum() == pytest.approx(5050.0)
+        assert np.array_equal(datos['secuencia'], np.arange(1, 101))
+        del datos
+
+
+def test_agregar_no_hace_fsync(tmp_path, monkeypatch):
+    import registro_muestras
+    hilos = []
+    fsync = registro_muestras.os.fsync
+
+    def fsync_espiado(descriptor):
+        hilos.append(threading.current_thread())
+        fsync(descriptor)
+
+    monkeypatch.setattr(registro_muestras.os, 'fsync', fsync_espiado)
+    registro = RegistroMuestras(str(tmp_path / 'muestras.bin'), lote_fsync=4, intervalo_fsync=60)
+    try:
+        for secuencia in range(1, 9):
+            registro.agregar('10.0.0.1', secuencia, secuencia, 1.0, False)
+        assert threading.current_thread() not in hilos
+        # El hilo de fondo vuelca los lotes completos sin esperar al intervalo
+        limite = time.monotonic() + 5
+        while not hilos and time.monotonic() < limite:
+            time.sleep(0.01)
+        assert hilos and all(hilo is registro._hilo for hilo in hilos)
+    finally:
+        registro.cerrar()
+    assert not registro._hilo.is_alive()
+    with LectorRegistro(str(tmp_path / 'muestras.bin')) as lector:
+        assert len(lector) == 8
+
+
+def _version_1(ruta, muestras):
+    """Archivo con el formato de la versión 1 (registros con 3 bytes de relleno)"""
+    formato = struct.Struct('<IIqfB3x')
+    with open(ruta, 'wb') as f:
+        f.write(ENCABEZADO.pack(MAGIA, 1, formato.size, time.time_ns(), time.monotonic_ns()))
+        for muestra in muestras:
+            f.write(formato.pack(*muestra))
+    with open(str(ruta) + '.objetivos', 'w', encoding='utf-8') as f:
+        f.write('0\t10.0.0.1\n')
+
+
+def test_registro_sin_relleno(tmp_path):
+    ruta = tmp_path / 'muestras.bin'
+    _escribir(ruta, [('10.0.0.1', secuencia, secuencia, 1.0, False) for secuencia in range(1, 11)])
+
+    assert REGISTRO.size == 21
+    assert ruta.stat().st_size == ENCABEZADO.size + 10 * REGISTRO.size
+
+
+def test_version_1_se_sigue_leyendo(tmp_path):
+    ruta = tmp_path / 'viejo.bin'
+    _version_1(ruta, [(0, 1, 1, 10.0, 0), (0, 2, 2, 0.0, 1)])
+
+    with LectorRegistro(str(ruta)) as lector:
+        assert list(lector) == [(0, 1, 1, 10.0, 0), (0, 2, 2, 0.0, 1)]
+        assert list(lector.registros(1)) == [(0, 2, 2, 0.0, 1)]
+        assert lector[0] == (0, 1, 1, 10.0, 0)
+
+
+def test_version_desconocida(tmp_path):
+    ruta = tmp_path / 'futuro.bin'
+    ruta.write_bytes(ENCABEZADO.pack(MAGIA, 99, REGISTRO.size, 0, 0))
+
+    with pytest.raises(ValueError):
+        LectorRegistro(str(ruta))
+
+
+def test_no_se_agrega_a_otra_version(tmp_path):
+    ruta = tmp_path / 'viejo.bin'
+    _version_1(ruta, [(0, 1, 1, 10.0, 0)])
+
+    with pytest.raises(ValueError):
+        RegistroMuestras(str(ruta))
+    assert ruta.stat().st_size == ENCABEZADO.size + 24
+
+
+def test_objetivo_nuevo_visible_sin_sincronizar(tmp_path):
+    ruta = tmp_path / 'muestras.bin'
+    registro = RegistroMuestras(str(ruta), intervalo_fsync=60)
+    try:
+        registro.agregar('10.0.0.7', 1, 1, 1.0, False)
+        assert (tmp_path / 'muestras.bin.objetivos').read_text(encoding='utf-8') == '0\t10.0.0.7\n'
+    finally:
+        registro.cerrar()
@@ -0,0 +1,203 @@
+"""Compactación de pings/ ante cortes a mitad de camino"""
+
+import os
+import shutil
+import sqlite3
+import time
+import zipfile
+
+import pytest
+
+import retencion
+from retencion import AlmacenRetencion
+from mos_functions import ResultadoPing, _escribir_archivo_ping
+from registro_muestras import RegistroMuestras
+
+
+class _Corte(Exception):
+    """Simula que el proceso muere en un punto de la compactación"""
+
+
+def _crudos(directorio, cantidad=3, primera=1):
+    """Archivos de ping de hace 10 días con 4 pings (1 perdido) cada uno"""
+    rutas = []
+    hace_diez_dias = time.time() - 10 * 86400
+    for i in range(primera, primera + cantidad):
+        muestras = ResultadoPing(f'10.0.0.{i}')
+        for latencia in (10.0, None, 14.0, 12.0):
+            muestras.agregar(latencia, 0)
+        fecha = time.strftime('%Y%m%d-%H%M%S', time.localtime(hace_diez_dias))
+        muestras.archivo = os.path.join(directorio, f'ping-{muestras.ip}-{fecha}.txt')
+        _escribir_archivo_ping(muestras)
+        os.utime(muestras.archivo, (hace_diez_dias, hace_diez_dias))
+        rutas.append(muestras.archivo)
+    return rutas
+
+
+def _estado(almacen):
+    conexion = almacen._conexion()
+    enviados = conexion.execute("SELECT COALESCE(SUM(enviados), 0) FROM agregados_minuto").fetchone()[0]
+    archivados = conexion.execute("SELECT COUNT(*) FROM archivados").fetchone()[0]
+    miembros = []
+    for contenedor in almacen._contenedores():
+        with zipfile.ZipFile(os.path.join(almacen.directorio_archivo, contenedor)) as zf:
+            miembros.extend(zf.namelist())
+    return enviados, archivados, miembros
+
+
+@pytest.fixture
+def almacen(directorio_temporal):
+    os.makedirs('pings')
+    almacen = AlmacenRetencion('pings')
+    yield almacen
+    almacen.cerrar()
+
+
+def test_compactar(almacen):
+    rutas = _crudos('pings')
+    assert almacen.agregar_pendientes() == 3
+
+    assert almacen.compactar(rutas) == 3
+
+    enviados, archivados, miembros = _estado(almacen)
+    assert (enviados, archivados) == (12, 3)
+    assert sorted(miembros) == sorted(os.path.basename(ruta) for ruta in rutas)
+    assert not any(os.path.exists(ruta) for ruta in rutas)
+
+
+def test_corte_despues_del_zip_antes_del_indice(almacen, monkeypatch):
+    rutas = _crudos('pings')
+    almacen.agregar_pendientes()
+
+    class ZipCortado(zipfile.ZipFile):
+        def __exit__(self, *args):
+            super().__exit__(*args)
+            raise _Corte()
+
+    with monkeypatch.context() as parche, pytest.raises(_Corte):
+        parche.setattr(retencion.zipfile, 'ZipFile', ZipCortado)
+        almacen.compactar(rutas)
+
+    # Los crudos siguen ahí y el índice no los registra
+    assert all(os.path.exists(ruta) for ruta in rutas)
+    assert _estado(almacen)[1] == 0
+
+    # La próxima pasada no los vuelve a sumar ni los duplica en el zip
+    assert almacen.agregar_pendientes() == 0
+    assert almacen.compactar(rutas) == 3
+    enviados, archivados, miembros = _estado(almacen)
+    assert (enviados, archivados) == (12, 3)
+    assert len(miembros) == len(set(miembros)) == 3
+    assert not any(os.path.exists(ruta) for ruta in rutas)
+
+
+def test_corte_despues_del_indice_antes_de_borrar(almacen, monkeypatch):
+    rutas = _crudos('pings')
+
+    def remove_cortado(ruta):
+        raise _Corte()
+
+    with monkeypatch.context() as parche, pytest.raises(_Corte):
+        parche.setattr(retencion.os, 'remove', remove_cortado)
+        almacen.compactar(rutas)
+
+    assert all(os.path.exists(ruta) for ruta in rutas)
+    assert _estado(almacen)[:2] == (12, 3)
+
+    # Ya archivados: no se agregan de nuevo y la compactación solo los borra
+    assert almacen.agregar_pendientes() == 0
+    assert almacen.compactar(rutas) == 3
+    enviados, archivados, miembros = _estado(almacen)
+    assert (enviados, archivados) == (12, 3)
+    assert len(miembros) == len(set(miembros)) == 3
+    assert not any(os.path.exists(ruta) for ruta in rutas)
+
+
+def test_aplicar_respeta_dias_crudos(almacen):
+    rutas = _crudos('pings')
+    reciente = _crudos('pings', 1, primera=9)[0]
+    os.utime(reciente, (time.time() - 2 * 3600, time.time() - 2 * 3600))
+
+    resumen = almacen.aplicar(dias_crudos=7)
+
+    assert resumen['compactados'] == 3
+    assert not any(os.path.exists(ruta) for ruta in rutas)
+    assert os.path.exists(reciente)
+
+
+def _jitter(almacen):
+    fila = almacen._conexion().execute(
+        "SELECT SUM(pares), SUM(suma_diferencias), SUM(enviados) FROM agregados_hora").fetchone()
+    return tuple(fila)
+
+
+def test_jitter_entre_pasadas_incrementales(almacen):
+    registro = RegistroMuestras('pings/muestras-1.bin')
+    latencias = [10.0, 20.0, None, 15.0, 30.0, 12.0, 18.0, None, 25.0, 11.0]
+    ahora = time.monotonic_ns()
+    for secuencia, latencia in enumerate(latencias, 1):
+        registro.agregar('10.0.0.1', secuencia, ahora + secuencia, latencia, latencia is None)
+        if secuencia in (2, 3, 6):
+            # Cortes justo después de una respuesta, de un perdido y a mitad de serie
+            registro.sincronizar()
+            assert almacen.agregar_pendientes() == 1
+    registro.cerrar()
+    assert almacen.agregar_pendientes() == 1
+
+    # El mismo registro agregado de una sola vez en otro directorio
+    os.makedirs('otro')
+    for nombre in ('muestras-1.bin', 'muestras-1.bin.objetivos'):
+        shutil.copy(os.path.join('pings', nombre), 'otro')
+    completo = AlmacenRetencion('otro')
+    try:
+        completo.agregar_pendientes()
+        assert _jitter(almacen) == _jitter(completo) == (7, 10 + 5 + 15 + 18 + 6 + 7 + 14, 10)
+    finally:
+        completo.cerrar()
+
+
+def test_base_anterior_se_migra(directorio_temporal):
+    os.makedirs('pings')
+    conexion = sqlite3.connect(os.path.join('pings', retencion.NOMBRE_BASE))
+    conexion.execute("CREATE TABLE procesados (ruta TEXT PRIMARY KEY, registros INTEGER NOT NULL DEFAULT 0, "
+                     "ip TEXT, inicio REAL, fin REAL)")
+    conexion.execute("INSERT INTO procesados (ruta, registros) VALUES ('muestras-1.bin', 4)")
+    conexion.commit()
+    conexion.close()
+
+    almacen = AlmacenRetencion('pings')
+    try:
+        fila = almacen._conexion().execute("SELECT * FROM procesados").fetchone()
+        assert (fila['ruta'], fila['registros'], fila['estado']) == ('muestras-1.bin', 4, None)
+    finally:
+        almacen.cerrar()
+
+
+def test_crudo_ilegible_se_archiva_tal_cual(almacen):
+    rutas = _crudos('pings', 1)
+    ilegible = os.path.join('pings', 'muestras-20000101-000000-1.bin')
+    with open(ilegible, 'wb') as f:
+        f.write(b'NOES' + b'\x00' * 60)
+    hace_diez_dias = time.time() - 10 * 86400
+    os.utime(ilegible, (hace_diez_dias, hace_diez_dias))
+
+    assert almacen.agregar_pendientes() == 1
+    # Marcado como fallido: las pasadas siguientes no lo reintentan
+    assert almacen.agregar_pendientes() == 0
+
+    resumen = almacen.aplicar(dias_crudos=7)
+
+    assert (resumen['fallidos'], resumen['compactados']) == (0, 2)
+    assert not os.path.exists(ilegible) and not any(os.path.exists(ruta) for ruta in rutas)
+    enviados, archivados, miembros = _estado(almacen)
+    assert (enviados, archivados) == (4, 2)
+    assert 'muestras-20000101-000000-1.bin' in miembros
+    assert almacen.leer_archivado('muestras-20000101-000000-1.bin').startswith(b'NOES')
+
+
+def test_aplicar_cuenta_los_fallidos(almacen):
+    with open(os.path.join('pings', 'muestras-20000101-000000-1.bin'), 'wb') as f:
+        f.write(b'NOES' + b'\x00' * 60)
+
+    assert almacen.aplicar(dias_crudos=7)['fallidos'] == 1
+    assert almacen.aplicar(dias_crudos=7)['fallidos'] == 0
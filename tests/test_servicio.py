@@ -0,0 +1,76 @@
+"""Servicio sin interfaz gráfica: configuración y barridos sobre la red simulada"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from servicio import ServicioMOS, politica_retencion, INTERVALO_RETENCION
+
+
+def _config(directorio, **extra):
+    config = {'ips': [{'ip': '10.0.0.1', 'nombre': 'Uno'}], 'cantidad_pings': 6, 'historial': None}
+    config.update(extra)
+    ruta = directorio / 'config.json'
+    ruta.write_text(json.dumps(config), encoding='utf-8')
+    return str(ruta)
+
+
+# Un barrido con la red simulada en un intérprete donde tkinter no se puede importar
+_SIN_TKINTER = """
+import runpy, sys
+sys.modules['tkinter'] = None
+sys.path.insert(0, {raiz!r})
+sys.argv = ['servicio.py', '--config', 'config.json', '--una-vez', '--simular', '3',
+            '--sin-vigilancia', '--salida', 'salida.jsonl']
+runpy.run_path({servicio!r}, run_name='__main__')
+"""
+
+
+def test_barrido_sin_tkinter(directorio_temporal):
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    _config(directorio_temporal)
+    codigo = _SIN_TKINTER.format(raiz=raiz, servicio=os.path.join(raiz, 'servicio.py'))
+
+    proceso = subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True, timeout=60)
+
+    assert proceso.returncode == 0, proceso.stderr
+    with open('salida.jsonl', encoding='utf-8') as f:
+        resultados = [json.loads(linea) for linea in f]
+    assert sorted(resultado['ip'] for resultado in resultados) == ['10.0.0.1', '10.0.0.2', '10.0.0.3']
+    assert all('mos' in resultado for resultado in resultados)
+
+
+def test_politica_retencion_valida():
+    intervalo, politica = politica_retencion({'retencion': {'intervalo': 60, 'dias_crudos': 2, 'max_mb': None}})
+
+    assert intervalo == 60
+    assert politica == {'dias_crudos': 2, 'max_mb': None}
+    assert politica_retencion({}) == (INTERVALO_RETENCION, {})
+
+
+@pytest.mark.parametrize('retencion', [{'dias_crudo': 2}, {'dias_crudos': '2'}, {'max_mb': -1},
+                                       {'intervalo': True}])
+def test_politica_retencion_invalida(retencion):
+    with pytest.raises(ValueError):
+        politica_retencion({'retencion': retencion})
+
+
+def test_politica_invalida_impide_arrancar(directorio_temporal):
+    servicio = ServicioMOS(_config(directorio_temporal, retencion={'dias': 3}), retencion=True)
+
+    with pytest.raises(ValueError):
+        servicio.cargar_configuracion()
+
+
+def test_politica_invalida_al_recargar_conserva_la_anterior(directorio_temporal):
+    ruta = _config(directorio_temporal, retencion={'dias_crudos': 3})
+    servicio = ServicioMOS(ruta, retencion=True, vigilar=False)
+    servicio.cargar_configuracion()
+
+    _config(directorio_temporal, retencion={'dias_crudos': 'tres'})
+    servicio.cargar_configuracion()
+
+    assert servicio.config['retencion'] == {'dias_crudos': 3}
@@ -0,0 +1,52 @@
+"""Traceroute paralelo: emparejamiento de respuestas por TTL y corte en el destino"""
+
+import pytest
+
+scapy_all = pytest.importorskip('scapy.all')
+
+from mos_functions import _traceroute_paralelo
+
+
+DESTINO = '192.0.2.50'
+# Router que contesta cada TTL; el 2 no responde y el destino está en el 4
+SALTOS = {1: '192.0.2.1', 3: '192.0.2.3', 4: DESTINO, 5: DESTINO, 6: DESTINO}
+
+
+@pytest.fixture
+def sr_simulado(monkeypatch):
+    """Reemplaza scapy sr: contesta en orden inverso y registra cada ventana enviada"""
+    ventanas = []
+
+    def sr(sondas, verbose=0, timeout=None):
+        ventanas.append([sonda[scapy_all.IP].ttl for sonda in sondas])
+        contestadas = []
+        for sonda in reversed(sondas):
+            ttl = sonda[scapy_all.IP].ttl
+            if ttl not in SALTOS:
+                continue
+            sonda.sent_time = 100.0
+            tipo = 0 if SALTOS[ttl] == DESTINO else 11
+            respuesta = scapy_all.IP(src=SALTOS[ttl], dst='192.0.2.200') / scapy_all.ICMP(type=tipo)
+            respuesta.time = 100.0 + ttl / 1000
+            contestadas.append((sonda, respuesta))
+        return contestadas, []
+
+    monkeypatch.setattr(scapy_all, 'sr', sr)
+    return ventanas
+
+
+def test_respuestas_asociadas_a_su_ttl(sr_simulado):
+    saltos = _traceroute_paralelo(DESTINO, 10, 1, None, [])
+
+    assert sr_simulado == [list(range(1, 11))]
+    assert [(salto['hop'], salto['ip']) for salto in saltos] == [
+        (1, '192.0.2.1'), (2, '*'), (3, '192.0.2.3'), (4, DESTINO)]
+    assert [salto['latency_ms'] for salto in saltos] == [1.0, None, 3.0, 4.0]
+
+
+def test_ventanas_se_detienen_al_llegar(sr_simulado):
+    saltos = _traceroute_paralelo(DESTINO, 10, 1, 3, [])
+
+    assert sr_simulado == [[1, 2, 3], [4, 5, 6]]
+    assert [(salto['hop'], salto['ip']) for salto in saltos][-1] == (4, DESTINO)
+    assert len(saltos) == 4
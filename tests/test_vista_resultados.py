@@ -0,0 +1,119 @@
+"""Virtualización de las tarjetas de VistaResultados (con un canvas simulado, sin display)"""
+
+import itertools
+
+import pytest
+
+pytest.importorskip('tkinter')
+
+from vista_resultados import VistaResultados, color_mos, PASO, SEPARACION
+
+
+class _CanvasSimulado:
+    """Lo mínimo de tk.Canvas que usa la vista: ítems con texto, coordenadas y estado"""
+
+    def __init__(self, ancho):
+        self.ancho = ancho
+        self.desplazamiento = 0
+        self.items = {}
+        self.etiquetas = {}
+        self.creados = 0
+        self._ids = itertools.count(1)
+
+    def _crear(self, *args, **opciones):
+        item = next(self._ids)
+        self.items[item] = dict(opciones, coords=args)
+        self.creados += 1
+        return item
+
+    create_rectangle = create_text = create_line = _crear
+
+    def coords(self, item, *args):
+        self.items[item]['coords'] = args
+
+    def itemconfigure(self, item, **opciones):
+        for destino in self.etiquetas.get(item, [item]):
+            self.items[destino].update(opciones)
+
+    def addtag_withtag(self, etiqueta, item):
+        self.etiquetas.setdefault(etiqueta, []).append(item)
+
+    def canvasx(self, x):
+        return self.desplazamiento + x
+
+    def winfo_width(self):
+        return self.ancho
+
+    def configure(self, **opciones):
+        pass
+
+    def xview(self, *args):
+        pass
+
+    def textos(self):
+        """Títulos de las tarjetas visibles, de izquierda a derecha"""
+        titulos = [item for item in self.items.values()
+                   if item.get('text', '').startswith('Objetivo') and item.get('state') != 'hidden']
+        return [item['text'].split('\n')[0] for item in sorted(titulos, key=lambda item: item['coords'])]
+
+
+def _vista(ancho):
+    vista = VistaResultados.__new__(VistaResultados)
+    vista.canvas = _CanvasSimulado(ancho)
+    vista._resultados = []
+    vista._indices = {}
+    vista._ranuras = []
+    vista._visibles = {}
+    vista._margen = SEPARACION
+    return vista
+
+
+def _resultado(i, mos=4.4):
+    return {'ip': f'10.0.{i // 250}.{i % 250}', 'nombre': f'Objetivo {i}', 'latencia': 20.0,
+            'jitter': 1.0, 'perdida': 0.0, 'mos': mos, 'calidad': 'Excelente', 'latencia_efectiva': 22.0}
+
+
+def test_color_mos():
+    assert [color_mos(mos) for mos in (4.4, 4.1, 3.7, 3.2, 2.0)] == [
+        'green', 'blue', 'orange', 'dark orange', 'red']
+
+
+def test_ranuras_acotadas_por_el_ancho():
+    vista = _vista(ancho=3 * PASO)
+    vista.establecer([_resultado(i) for i in range(5000)])
+
+    assert len(vista) == 5000
+    assert len(vista._ranuras) <= 6
+    assert vista.canvas.textos()[:3] == ['Objetivo 0', 'Objetivo 1', 'Objetivo 2']
+
+    # Al desplazarse se reutilizan las mismas ranuras con otro texto
+    vista.canvas.desplazamiento = 1000 * PASO
+    vista._asignar()
+    creados = vista.canvas.creados
+    assert 'Objetivo 1000' in vista.canvas.textos()
+    assert 'Objetivo 0' not in vista.canvas.textos()
+    vista.canvas.desplazamiento = 4000 * PASO
+    vista._asignar()
+    assert vista.canvas.creados == creados
+    assert len(vista._ranuras) <= 6
+    assert 'Objetivo 4000' in vista.canvas.textos()
+
+
+def test_actualizar_en_el_lugar():
+    vista = _vista(ancho=3 * PASO)
+    vista.establecer([_resultado(i) for i in range(10)])
+    ranura = vista._visibles[1]
+    creados = vista.canvas.creados
+
+    vista.actualizar([_resultado(1, mos=2.0)])
+
+    assert vista._visibles[1] is ranura and vista.canvas.creados == creados
+    assert vista.canvas.items[ranura.mos]['text'] == 'MOS: 2.00'
+    assert vista.canvas.items[ranura.mos]['fill'] == 'red'
+    assert len(vista) == 10
+
+    # Un objetivo nuevo se agrega al final; uno con error muestra el mensaje
+    vista.actualizar([{'ip': '10.9.9.9', 'nombre': 'Objetivo nuevo', 'error': True, 'mensaje': 'sin respuesta'}])
+    assert len(vista) == 11
+    vista.actualizar([{'ip': '10.0.0.2', 'nombre': 'Objetivo 2', 'error': True, 'mensaje': 'sin respuesta'}])
+    assert vista.canvas.items[vista._visibles[2].error]['text'] == '❌ sin respuesta'
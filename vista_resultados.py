@@ -0,0 +1,243 @@
+"""
+vista_resultados.py
+Vista virtualizada de tarjetas de resultados para MonitorMOS
+
+Las tarjetas se dibujan directamente en un Canvas y solo existen ítems para
+las que entran en la parte visible (más una de margen a cada lado): al
+desplazarse, los mismos ítems se reubican y se les cambia el texto. Con
+cientos o miles de objetivos el costo de armar la vista y la memoria
+dependen del ancho de la ventana, no de la cantidad de resultados.
+
+Un resultado nuevo de un objetivo ya mostrado actualiza su tarjeta en el
+lugar (itemconfig), sin reconstruir nada. Un resultado con 'pendiente'
+se muestra como tarjeta en espera.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+
+# Geometría de cada tarjeta en píxeles
+ANCHO_TARJETA = 300
+ALTO_TARJETA = 330
+SEPARACION = 20
+PASO = ANCHO_TARJETA + SEPARACION
+
+FUENTE_TITULO = ('Arial', 10, 'bold')
+FUENTE_METRICA = ('Arial', 10)
+FUENTE_MOS = ('Arial', 14, 'bold')
+FUENTE_CALIDAD = ('Arial', 11)
+FUENTE_DETALLE = ('Arial', 9)
+
+
+def color_mos(mos):
+    """Color de la tarjeta según la calidad del MOS"""
+    if mos >= 4.3:
+        return "green"
+    elif mos >= 4.0:
+        return "blue"
+    elif mos >= 3.6:
+        return "orange"
+    elif mos >= 3.1:
+        return "dark orange"
+    return "red"
+
+
+class _Ranura:
+    """Ítems del canvas de una tarjeta visible; se reutilizan al desplazarse"""
+
+    def __init__(self, canvas):
+        self.indice = None
+        self.borde = canvas.create_rectangle(0, 0, 0, 0, outline='#b0b0b0')
+        self.titulo = canvas.create_text(0, 0, font=FUENTE_TITULO, justify=tk.CENTER, anchor=tk.N)
+        self.metricas = [canvas.create_text(0, 0, font=FUENTE_METRICA, anchor=tk.NW)
+                         for _ in range(3)]
+        self.separador = canvas.create_line(0, 0, 0, 0, fill='#d0d0d0')
+        self.mos = canvas.create_text(0, 0, font=FUENTE_MOS, anchor=tk.N)
+        self.calidad = canvas.create_text(0, 0, font=FUENTE_CALIDAD, anchor=tk.N)
+        self.detalle = canvas.create_text(0, 0, font=FUENTE_DETALLE, fill='gray',
+                                          justify=tk.CENTER, anchor=tk.N)
+        self.error = canvas.create_text(0, 0, font=FUENTE_DETALLE, fill='red',
+                                        width=ANCHO_TARJETA - 40, justify=tk.CENTER, anchor=tk.N)
+
+    def ubicar(self, canvas, x, y):
+        centro = x + ANCHO_TARJETA / 2
+        canvas.coords(self.borde, x, y, x + ANCHO_TARJETA, y + ALTO_TARJETA)
+        canvas.coords(self.titulo, centro, y + 10)
+        for i, item in enumerate(self.metricas):
+            canvas.coords(item, x + 20, y + 60 + i * 24)
+        canvas.coords(self.separador, x + 15, y + 142, x + ANCHO_TARJETA - 15, y + 142)
+        canvas.coords(self.mos, centro, y + 160)
+        canvas.coords(self.calidad, centro, y + 190)
+        canvas.coords(self.detalle, centro, y + 220)
+        canvas.coords(self.error, centro, y + 80)
+
+    def mostrar(self, canvas, resultado):
+        canvas.itemconfigure(self.titulo, text=f"{resultado.get('nombre', '')}\n({resultado.get('ip', '')})")
+        if resultado.get('pendiente'):
+            for item in (*self.metricas, self.mos, self.calidad, self.error):
+                canvas.itemconfigure(item, text='')
+            canvas.itemconfigure(self.separador, state=tk.HIDDEN)
+            canvas.itemconfigure(self.detalle, text="⏳ Analizando...")
+            return
+        if resultado.get('error'):
+            for item in self.metricas:
+                canvas.itemconfigure(item, text='')
+            for item in (self.mos, self.calidad, self.detalle):
+                canvas.itemconfigure(item, text='')
+            canvas.itemconfigure(self.separador, state=tk.HIDDEN)
+            canvas.itemconfigure(self.error, text=f"❌ {resultado.get('mensaje', 'Error desconocido')}")
+            return
+
+        canvas.itemconfigure(self.error, text='')
+        canvas.itemconfigure(self.separador, state=tk.NORMAL)
+        textos = (f"Latencia:  {resultado['latencia']:.2f} ms",
+                  f"Jitter:  {resultado['jitter']:.2f} ms",
+                  f"Pérdida:  {resultado['perdida']:.2f}%")
+        for item, texto in zip(self.metricas, textos):
+            canvas.itemconfigure(item, text=texto)
+        color = color_mos(resultado['mos'])
+        canvas.itemconfigure(self.mos, text=f"MOS: {resultado['mos']:.2f}", fill=color)
+        canvas.itemconfigure(self.calidad, text=f"Calidad: {resultado['calidad']}", fill=color)
+        canvas.itemconfigure(self.detalle, text=f"Lat. Efectiva:\n{resultado['latencia_efectiva']:.2f} ms")
+
+    def ocultar(self, canvas):
+        self.indice = None
+        canvas.itemconfigure(self.etiqueta, state=tk.HIDDEN)
+
+    @property
+    def etiqueta(self):
+        return f"ranura{self.borde}"
+
+
+class VistaResultados(ttk.Frame):
+    """
+    Fila horizontal de tarjetas de resultados con desplazamiento, dibujada
+    en un Canvas y virtualizada.
+
+        vista = VistaResultados(parent, resultados)
+        vista.pack(fill=tk.BOTH, expand=True)
+        vista.actualizar([resultado])   # reemplaza o agrega por IP y nombre
+    """
+
+    def __init__(self, parent, resultados=None, **kwargs):
+        super().__init__(parent, **kwargs)
+        # Cada unidad de desplazamiento avanza una tarjeta
+        self.canvas = tk.Canvas(self, height=ALTO_TARJETA + 2 * SEPARACION, highlightthickness=0,
+                                xscrollincrement=PASO)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self._desplazar)
+        self.canvas.configure(xscrollcommand=self.scrollbar.set)
+        self.canvas.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+
+        self._resultados = []
+        self._indices = {}
+        self._ranuras = []
+        self._visibles = {}
+        self._margen = SEPARACION
+
+        self.canvas.bind('<Configure>', lambda e: self._redibujar())
+        for evento in ('<MouseWheel>', '<Shift-MouseWheel>'):
+            self.canvas.bind(evento, self._rueda)
+        self.canvas.bind('<Button-4>', lambda e: self._desplazar('scroll', -1, 'units'))
+        self.canvas.bind('<Button-5>', lambda e: self._desplazar('scroll', 1, 'units'))
+
+        if resultados:
+            self.establecer(resultados)
+
+    def __len__(self):
+        return len(self._resultados)
+
+    @staticmethod
+    def _clave(resultado):
+        # El nombre distingue objetivos repetidos con la misma IP
+        return (resultado.get('ip'), resultado.get('nombre'))
+
+    def establecer(self, resultados):
+        """Reemplazar todos los resultados (mantiene el orden recibido)"""
+        self._resultados = list(resultados)
+        self._indices = {self._clave(resultado): i for i, resultado in enumerate(self._resultados)}
+        for ranura in self._visibles.values():
+            ranura.indice = None
+        self._visibles = {}
+        self._redibujar()
+
+    def actualizar(self, resultados):
+        """
+        Incorporar resultados nuevos: los de un objetivo ya presente
+        actualizan su tarjeta en el lugar, los demás se agregan al final.
+        """
+        agregados = False
+        for resultado in resultados:
+            clave = self._clave(resultado)
+            indice = self._indices.get(clave)
+            if indice is None:
+                self._indices[clave] = len(self._resultados)
+                self._resultados.append(resultado)
+                agregados = True
+                continue
+            self._resultados[indice] = resultado
+            ranura = self._visibles.get(indice)
+            if ranura is not None:
+                ranura.mostrar(self.canvas, resultado)
+        if agregados:
+            self._redibujar()
+
+    def _ancho_total(self):
+        return len(self._resultados) * PASO - SEPARACION if self._resultados else 0
+
+    def _redibujar(self):
+        """Ajustar la región desplazable y asignar ranuras a las tarjetas visibles"""
+        ancho_canvas = max(self.canvas.winfo_width(), 1)
+        ancho_total = self._ancho_total()
+        # Centrar si todas las tarjetas entran en la ventana
+        self._margen = max(SEPARACION, (ancho_canvas - ancho_total) // 2)
+        self.canvas.configure(scrollregion=(0, 0, ancho_total + 2 * self._margen,
+                                            ALTO_TARJETA + 2 * SEPARACION))
+        self._asignar()
+
+    def _asignar(self):
+        izquierda = self.canvas.canvasx(0)
+        derecha = izquierda + self.canvas.winfo_width()
+        primero = max(0, int((izquierda - self._margen) // PASO) - 1)
+        ultimo = min(len(self._resultados) - 1, int((derecha - self._margen) // PASO) + 1)
+        necesarios = set(range(primero, ultimo + 1))
+
+        # Liberar las ranuras que quedaron fuera y reutilizarlas
+        libres = []
+        for indice in list(self._visibles):
+            if indice not in necesarios:
+                libres.append(self._visibles.pop(indice))
+        for ranura in self._ranuras:
+            if ranura.indice is None and ranura not in libres:
+                libres.append(ranura)
+
+        for indice in sorted(necesarios - self._visibles.keys()):
+            if libres:
+                ranura = libres.pop()
+            else:
+                ranura = _Ranura(self.canvas)
+                for item in self._items(ranura):
+                    self.canvas.addtag_withtag(ranura.etiqueta, item)
+                self._ranuras.append(ranura)
+            ranura.indice = indice
+            self._visibles[indice] = ranura
+            self.canvas.itemconfigure(ranura.etiqueta, state=tk.NORMAL)
+            ranura.mostrar(self.canvas, self._resultados[indice])
+
+        for indice, ranura in self._visibles.items():
+            ranura.ubicar(self.canvas, self._margen + indice * PASO, SEPARACION)
+        for ranura in libres:
+            ranura.ocultar(self.canvas)
+
+    @staticmethod
+    def _items(ranura):
+        return [ranura.borde, ranura.titulo, *ranura.metricas, ranura.separador,
+                ranura.mos, ranura.calidad, ranura.detalle, ranura.error]
+
+    def _desplazar(self, *args):
+        self.canvas.xview(*args)
+        self._asignar()
+
+    def _rueda(self, evento):
+        self._desplazar('scroll', -1 if evento.delta > 0 else 1, 'units')